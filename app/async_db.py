@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""
+Focus Ring - 非同期データアクセス層
+同期のSQLite処理を専用スレッドプールで実行し、async ハンドラーから await できるようにする
+"""
+
+import asyncio
+import functools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+from . import db, llm_cache, llm_client, summarizer, suggestions, write_buffer
+from .write_buffer import flushed, get_write_buffer_stats, flush_pending_writes
+
+
+# 専用スレッド数（既定は接続プールと同じ数: スレッドが接続待ちにならない）
+DB_EXECUTOR_WORKERS = int(os.getenv('FOCUS_RING_DB_EXECUTOR_WORKERS', str(db.DB_POOL_SIZE)))
+
+T = TypeVar('T')
+
+
+# === DB専用エグゼキューター ===
+
+class DBExecutor:
+    """
+    DB処理専用のスレッドプール（キュー滞留メトリクス付き）
+    
+    queue_depth は投入済みで未開始のタスク数、running は実行中のタスク数。
+    """
+    
+    def __init__(self, max_workers: int = DB_EXECUTOR_WORKERS):
+        self.max_workers = max(1, max_workers)
+        self.pid = os.getpid()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                            thread_name_prefix="focus-ring-db")
+        self._lock = threading.Lock()
+        
+        # 統計カウンタ
+        self._submitted = 0
+        self._started = 0
+        self._completed = 0
+        self._failed = 0
+        self._max_queue_depth = 0
+        self._queue_wait = 0.0
+        self._run_time = 0.0
+    
+    async def run(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """同期関数をプール上で実行して結果を待つ"""
+        submitted_at = time.perf_counter()
+        with self._lock:
+            self._submitted += 1
+            self._max_queue_depth = max(self._max_queue_depth, self._submitted - self._started)
+        
+        def task():
+            started_at = time.perf_counter()
+            with self._lock:
+                self._started += 1
+                self._queue_wait += started_at - submitted_at
+            failed = False
+            try:
+                return func(*args, **kwargs)
+            except BaseException:
+                failed = True
+                raise
+            finally:
+                with self._lock:
+                    self._run_time += time.perf_counter() - started_at
+                    if failed:
+                        self._failed += 1
+                    else:
+                        self._completed += 1
+        
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, task)
+    
+    def shutdown(self, wait: bool = True):
+        """スレッドプールを停止"""
+        self._executor.shutdown(wait=wait)
+    
+    def stats(self) -> Dict[str, Any]:
+        """キュー滞留・実行時間の統計情報を取得"""
+        with self._lock:
+            finished = self._completed + self._failed
+            return {
+                'max_workers': self.max_workers,
+                'queue_depth': self._submitted - self._started,
+                'running': self._started - finished,
+                'max_queue_depth': self._max_queue_depth,
+                'submitted': self._submitted,
+                'completed': self._completed,
+                'failed': self._failed,
+                'avg_queue_wait_ms': round(self._queue_wait / max(self._started, 1) * 1000, 2),
+                'avg_run_ms': round(self._run_time / max(finished, 1) * 1000, 2)
+            }
+
+
+_executor: Optional[DBExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_db_executor() -> DBExecutor:
+    """プロセス共通のDBエグゼキューターを取得（fork後のプロセスでは作り直す）"""
+    global _executor
+    executor = _executor
+    if executor is not None and executor.pid == os.getpid():
+        return executor
+    
+    with _executor_lock:
+        if _executor is None or _executor.pid != os.getpid():
+            _executor = DBExecutor()
+        return _executor
+
+
+def shutdown_db_executor():
+    """DBエグゼキューターを停止（アプリケーション終了時に呼ぶ）"""
+    global _executor
+    with _executor_lock:
+        if _executor is not None and _executor.pid == os.getpid():
+            _executor.shutdown()
+        _executor = None
+
+
+def get_executor_stats() -> Dict[str, Any]:
+    """DBエグゼキューターの統計情報を取得"""
+    return get_db_executor().stats()
+
+
+async def run_db(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """同期のDB処理を専用スレッドプールで実行"""
+    return await get_db_executor().run(func, *args, **kwargs)
+
+
+def awaitable(func: Callable[..., T]) -> Callable[..., Awaitable[T]]:
+    """同期のDB関数を専用スレッドプールで実行する async 関数に変換"""
+    @functools.wraps(func)
+    async def wrapper(*args: Any, **kwargs: Any) -> T:
+        return await run_db(func, *args, **kwargs)
+    return wrapper
+
+
+# === 非同期API（app.db / app.summarizer の同名関数を await 可能にしたもの） ===
+# 書き込みバッファ有効時、単一ブロック更新はバッファ経由、日次サマリを読む処理と
+# 一括・範囲更新は未反映の書き込みを先に反映してから実行する
+
+init_database = awaitable(db.init_database)
+reset_database = awaitable(flushed(db.reset_database))
+get_day_blocks = awaitable(write_buffer.get_day_blocks)
+get_day_slot_rows = awaitable(write_buffer.get_day_slot_rows)
+get_range_day_slots = awaitable(flushed(db.get_range_day_slots))
+upsert_block = awaitable(write_buffer.upsert_block)
+bulk_upsert_blocks = awaitable(flushed(db.bulk_upsert_blocks))
+upsert_block_range = awaitable(flushed(db.upsert_block_range))
+clear_block_range = awaitable(flushed(db.clear_block_range))
+get_all_categories = awaitable(db.get_all_categories)
+get_data_versions = awaitable(write_buffer.get_data_versions)
+get_database_stats = awaitable(flushed(db.get_database_stats))
+get_llm_cache_stats = awaitable(llm_cache.get_llm_cache_stats)
+get_llm_client_stats = llm_client.get_llm_client_stats
+
+calculate_daily_summary = awaitable(flushed(summarizer.calculate_daily_summary))
+calculate_trend_data = awaitable(flushed(summarizer.calculate_trend_data))
+calculate_rolling_data = awaitable(flushed(summarizer.calculate_rolling_data))
+calculate_rollups = awaitable(flushed(summarizer.calculate_rollups))
+flush_writes = awaitable(flush_pending_writes)
+
+
+async def get_daily_suggestions(date: str):
+    """
+    改善提案を取得
+    DB処理は未反映の書き込みを反映してからDB専用プールで実行し、LLM呼び出しは非同期クライアントで待つ
+    """
+    return await suggestions.get_daily_suggestions_async(date, run_sync=_run_flushed)
+
+
+def stream_daily_suggestions(date: str):
+    """改善提案を (イベント名, データ) の async イテレータで取得（DB処理の実行先は get_daily_suggestions と同じ）"""
+    return suggestions.stream_daily_suggestions(date, run_sync=_run_flushed)
+
+
+async def _run_flushed(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """未反映の書き込みを反映してからDB専用プールで実行"""
+    return await run_db(flushed(func), *args, **kwargs)
+
+
+if __name__ == "__main__":
+    # テスト実行: 同時実行がスレッドプール上で重なることを確認
+    print("=== Async DB Test ===")
+    
+    async def main():
+        await init_database()
+        start = time.perf_counter()
+        await asyncio.gather(*(run_db(time.sleep, 0.1) for _ in range(DB_EXECUTOR_WORKERS)))
+        print(f"{DB_EXECUTOR_WORKERS} 件の 0.1秒タスク: {time.perf_counter() - start:.2f}秒")
+        print(f"統計: {get_executor_stats()}")
+    
+    asyncio.run(main())
+    shutdown_db_executor()
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""
+Focus Ring - /api/day の高速応答
+DBのタプル行から BlockResponse と同じ形のJSON、または列指向の圧縮形式を直接組み立てる
+（Pydanticモデルを経由しない）
+"""
+
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Sequence, Tuple
+
+try:
+    import orjson
+except ImportError:  # orjson はオプション依存（未インストール時は標準の json を使用）
+    orjson = None
+
+from .utils import slot_index_to_time
+
+
+SLOTS_PER_DAY = 80
+
+# (slot_index, category, focus, memo, created_at, updated_at)
+SlotRow = Tuple[int, Optional[str], Optional[int], Optional[str], Any, Any]
+
+START_TIMES = tuple(slot_index_to_time(slot_index) for slot_index in range(SLOTS_PER_DAY))
+
+# 未入力スロットのJSON（"date" 以降の部分、スロットごとに固定）
+EMPTY_SLOT_SUFFIXES = tuple(
+    f',"slot_index":{slot_index},"start_time":"{start_time}","category":null,"focus":null,'
+    f'"memo":null,"created_at":null,"updated_at":null}}'
+    for slot_index, start_time in enumerate(START_TIMES)
+)
+
+
+def is_orjson_available() -> bool:
+    """orjson が利用可能か"""
+    return orjson is not None
+
+
+def _dumps(value: Any) -> str:
+    """JSON文字列に変換（orjson があれば使う）"""
+    if orjson is not None:
+        return orjson.dumps(value).decode()
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+
+
+def _timestamp(value: Any) -> Optional[str]:
+    """SQLiteのタイムスタンプ（文字列または datetime）をISO形式に変換"""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value).replace(' ', 'T', 1)
+
+
+def encode_day_blocks(date: str, rows: Sequence[SlotRow]) -> bytes:
+    """
+    1日分（80スロット）の BlockResponse 配列をJSONにエンコード
+    
+    Args:
+        date: 対象日 (YYYY-MM-DD)
+        rows: db.get_day_slot_rows の結果（行のないスロットは未入力として出力）
+    
+    Returns:
+        JSON配列のバイト列（slot_index順）
+    """
+    prefix = '{"date":' + _dumps(date)
+    parts: List[str] = [prefix + suffix for suffix in EMPTY_SLOT_SUFFIXES]
+    
+    for slot_index, category, focus, memo, created_at, updated_at in rows:
+        parts[slot_index] = _dumps({
+            'date': date,
+            'slot_index': slot_index,
+            'start_time': START_TIMES[slot_index],
+            'category': category,
+            'focus': focus,
+            'memo': memo,
+            'created_at': _timestamp(created_at),
+            'updated_at': _timestamp(updated_at)
+        })
+    
+    return ('[' + ','.join(parts) + ']').encode()
+
+
+def encode_day_columnar(date: str, rows: Sequence[SlotRow]) -> bytes:
+    """
+    1日分を列指向の圧縮形式にエンコード（?format=columnar 用）
+    
+    開始時刻・タイムスタンプは含まない（開始時刻は slot_index から算出できる）。
+    
+    Args:
+        date: 対象日 (YYYY-MM-DD)
+        rows: db.get_day_slot_rows の結果
+    
+    Returns:
+        {"date", "format": "columnar", "categories": [80], "focus": [80], "memos": {スロット番号: メモ}}
+        のJSONバイト列
+    """
+    categories: List[Optional[str]] = [None] * SLOTS_PER_DAY
+    focus_values: List[Optional[int]] = [None] * SLOTS_PER_DAY
+    memos = {}
+    for slot_index, category, focus, memo, _, _ in rows:
+        categories[slot_index] = category
+        focus_values[slot_index] = focus
+        if memo is not None:
+            memos[str(slot_index)] = memo
+    
+    return _dumps({
+        'date': date,
+        'format': 'columnar',
+        'categories': categories,
+        'focus': focus_values,
+        'memos': memos
+    }).encode()
+
+
+if __name__ == "__main__":
+    # ベンチマーク: 従来の応答経路（DBBlock -> BlockResponse -> response_model 検証）との比較
+    import os
+    import tempfile
+    import time
+    
+    from fastapi.encoders import jsonable_encoder
+    from pydantic import TypeAdapter
+    
+    from . import db
+    from .models import BlockResponse
+    
+    print("=== Day Payload Benchmark ===")
+    
+    # 一時DBで計測する（既存データに触れない）
+    db.DB_PATH = os.path.join(tempfile.mkdtemp(), "benchmark.db")
+    db.init_database()
+    date = "2024-01-15"
+    db.bulk_upsert_blocks([
+        {'date': date, 'slot_index': slot_index, 'category': 'STUDY', 'focus': 4,
+         'memo': "数学" if slot_index % 8 == 0 else None}
+        for slot_index in range(0, SLOTS_PER_DAY, 2)
+    ])
+    
+    response_adapter = TypeAdapter(List[BlockResponse])
+    
+    def legacy_path() -> bytes:
+        blocks = db.get_day_blocks(date)
+        response_blocks = [BlockResponse(
+            date=block.date, slot_index=block.slot_index, start_time=block.start_time,
+            category=block.category, focus=block.focus, memo=block.memo,
+            created_at=block.created_at, updated_at=block.updated_at
+        ) for block in blocks]
+        # FastAPI の response_model 処理（再検証 + jsonable_encoder + json.dumps）相当
+        validated = response_adapter.validate_python(response_blocks, from_attributes=True)
+        return json.dumps(jsonable_encoder(validated), ensure_ascii=False).encode()
+    
+    def fast_path() -> bytes:
+        return encode_day_blocks(date, db.get_day_slot_rows(date))
+    
+    legacy = json.loads(legacy_path())
+    fast = json.loads(fast_path())
+    assert [{k: v for k, v in b.items() if not k.endswith('_at')} for b in legacy] == \
+           [{k: v for k, v in b.items() if not k.endswith('_at')} for b in fast]
+    
+    iterations = 2000
+    results = {}
+    for name, func in (("従来", legacy_path), ("高速", fast_path)):
+        func()
+        start = time.process_time()
+        for _ in range(iterations):
+            func()
+        results[name] = (time.process_time() - start) / iterations * 1000
+        print(f"{name}: {results[name]:.3f} ms CPU/リクエスト")
+    
+    print(f"orjson: {'有効' if is_orjson_available() else '未インストール（標準json）'}")
+    
+    columnar = encode_day_columnar(date, db.get_day_slot_rows(date))
+    print(f"ペイロード: 通常 {len(fast_path())} bytes / columnar {len(columnar)} bytes")
+    print(f"削減率: {(1 - results['高速'] / results['従来']) * 100:.1f}%")
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+Focus Ring - 日次ベクトル形式
+1日80スロットを1行（カテゴリIDブロブ・集中度ブロブ・メモの疎マップ）で保持する圧縮ストレージ形式
+"""
+
+import json
+from typing import List, Tuple, Dict, Optional, Sequence, Any
+
+
+SLOTS_PER_DAY = 80
+MAX_CATEGORY_ID = 255  # 1スロット1バイトで保持できる最大ID
+
+
+class DayVector:
+    """
+    1日分のスロット配列
+    
+    categories: スロットごとのカテゴリID（categories.id, 0=未入力）
+    focus: スロットごとの集中度（0=未設定）
+    memos: スロット番号 -> メモ（メモのあるスロットのみ）
+    """
+    
+    __slots__ = ('categories', 'focus', 'memos')
+    
+    def __init__(self, categories: Optional[bytes] = None, focus: Optional[bytes] = None,
+                 memos: Optional[Dict[int, str]] = None):
+        self.categories = bytearray(categories if categories is not None else SLOTS_PER_DAY)
+        self.focus = bytearray(focus if focus is not None else SLOTS_PER_DAY)
+        self.memos = dict(memos) if memos else {}
+        
+        if len(self.categories) != SLOTS_PER_DAY or len(self.focus) != SLOTS_PER_DAY:
+            raise ValueError(f"日次ベクトルの長さが不正です: "
+                             f"categories={len(self.categories)}, focus={len(self.focus)}")
+    
+    @classmethod
+    def from_row(cls, categories: bytes, focus: bytes, memos: Optional[str]) -> "DayVector":
+        """day_vectors テーブルの行から復元"""
+        memo_map = {int(slot): memo for slot, memo in json.loads(memos).items()} if memos else {}
+        return cls(categories, focus, memo_map)
+    
+    def to_row(self) -> Tuple[bytes, bytes, Optional[str]]:
+        """day_vectors テーブルに保存する (categories, focus, memos) に変換"""
+        memos = None
+        if self.memos:
+            memos = json.dumps({str(slot): memo for slot, memo in sorted(self.memos.items())},
+                               ensure_ascii=False)
+        return bytes(self.categories), bytes(self.focus), memos
+    
+    def get_slot(self, slot_index: int) -> Tuple[int, Optional[int], Optional[str]]:
+        """スロットの (category_id, focus, memo) を取得（未入力のカテゴリIDは0）"""
+        return self.categories[slot_index], self.focus[slot_index] or None, self.memos.get(slot_index)
+    
+    def set_slot(self, slot_index: int, category_id: int, focus: Optional[int], memo: Optional[str]):
+        """
+        スロットの値を設定
+        
+        Args:
+            slot_index: スロット番号 (0-79)
+            category_id: カテゴリID（未入力は0）
+            focus: 集中度 (1-5 または None)
+            memo: メモ（None で削除）
+        """
+        if not 0 <= category_id <= MAX_CATEGORY_ID:
+            raise ValueError(f"日次ベクトル形式で保存できないカテゴリIDです: {category_id}")
+        
+        self.categories[slot_index] = category_id
+        self.focus[slot_index] = focus or 0
+        if memo is None:
+            self.memos.pop(slot_index, None)
+        else:
+            self.memos[slot_index] = memo
+    
+    def has_slot(self, slot_index: int) -> bool:
+        """スロットに何らかの値（カテゴリ・集中度・メモ）があるか"""
+        return bool(self.categories[slot_index] or self.focus[slot_index] or slot_index in self.memos)
+    
+    def filled_slots(self) -> List[Tuple[int, int, Optional[int]]]:
+        """入力済みスロットの (slot_index, category_id, focus) リスト（スロット順）"""
+        focus = self.focus
+        return [(slot, category_id, focus[slot] or None)
+                for slot, category_id in enumerate(self.categories) if category_id]
+
+
+def decode_filled_blocks(categories: bytes, focus: bytes,
+                         category_codes: Optional[Sequence[Optional[str]]] = None
+                         ) -> List[Tuple[int, Any, Optional[int]]]:
+    """
+    ブロブから入力済みブロックを直接復元（DayVector を作らない高速パス）
+    
+    Args:
+        categories: カテゴリIDブロブ
+        focus: 集中度ブロブ
+        category_codes: カテゴリIDを添字とするコードの参照表（None ならIDのまま返す）
+        
+    Returns:
+        (slot_index, category, focus) のタプルリスト（スロット順）
+    """
+    if category_codes is None:
+        return [(slot, category_id, focus[slot] or None)
+                for slot, category_id in enumerate(categories) if category_id]
+    return [(slot, category_codes[category_id], focus[slot] or None)
+            for slot, category_id in enumerate(categories) if category_id]
+
+
+if __name__ == "__main__":
+    # テスト実行
+    print("=== Day Vector Test ===")
+    
+    vector = DayVector()
+    vector.set_slot(0, 1, 4, "朝の勉強")
+    vector.set_slot(1, 1, None, None)
+    vector.set_slot(79, 16, 2, None)
+    
+    row = vector.to_row()
+    restored = DayVector.from_row(*row)
+    print(f"保存サイズ: {len(row[0]) + len(row[1]) + len(row[2] or '')} bytes")
+    print(f"入力済み: {restored.filled_slots()}")
+    print(f"メモ: {restored.memos}")
+    assert restored.filled_slots() == vector.filled_slots()
+    assert restored.memos == vector.memos
@@ -6,30 +6,303 @@ SQLiteを使用した永続化層の実装
 
 import sqlite3
 import os
-from datetime import datetime
-from typing import Optional, List, Dict, Any, Tuple
+import json
+import queue
+import secrets
+import threading
+import time
+from bisect import bisect_right
+from datetime import datetime, timedelta
+from typing import Optional, List, Dict, Any, Tuple, Callable
 from contextlib import contextmanager
 
-from .models import DBBlock, DBCategory, INITIAL_CATEGORIES
-from .utils import slot_index_to_time, validate_slot_index, validate_focus_level
+from .models import DBBlock, DBCategory, INITIAL_CATEGORIES, MEMO_MAX_LENGTH
+from .utils import (slot_index_to_time, validate_slot_index, validate_focus_level, validate_date_format,
+                    validate_weight, get_date_range, get_period_bounds, get_today, parse_date, format_date)
+from .day_vector import DayVector, decode_filled_blocks, SLOTS_PER_DAY
+from . import sql_scoring
 
 
 # === データベース設定 ===
 
 DB_PATH = os.path.join(os.path.dirname(__file__), "..", "focus_ring.db")
 
+# 接続プール設定（環境変数で上書き可能）
+DB_POOL_SIZE = int(os.getenv('FOCUS_RING_DB_POOL_SIZE', '8'))
+DB_POOL_TIMEOUT = float(os.getenv('FOCUS_RING_DB_POOL_TIMEOUT', '30'))
+DB_BUSY_TIMEOUT_MS = int(os.getenv('FOCUS_RING_DB_BUSY_TIMEOUT_MS', '5000'))
+
+# ブロックの保存形式
+#   rows:   1スロット1行（blocks テーブル）
+#   vector: 1日1行の圧縮形式（day_vectors テーブル、app/day_vector.py）
+STORAGE_MODES = ('rows', 'vector')
+STORAGE_MODE = os.getenv('FOCUS_RING_STORAGE', 'rows')
+
+# 一括更新の1トランザクションあたりの行数
+BULK_CHUNK_SIZE = int(os.getenv('FOCUS_RING_BULK_CHUNK_SIZE', '500'))
+
+# 一括更新の行ごとの結果
+BULK_ACCEPTED = 'accepted'      # 書き込んだ
+BULK_REJECTED = 'rejected'      # 検証エラー・書き込みエラー（reason に理由）
+BULK_UNCHANGED = 'unchanged'    # 保存済みの値と同じため書き込まなかった
+BULK_STATUSES = (BULK_ACCEPTED, BULK_REJECTED, BULK_UNCHANGED)
+
+# daily_summaries テーブルに保持する集計カウンタ
+# （スコア・時間・割合などの派生値は読み出し時に算出する）
+DAILY_SUMMARY_COLUMNS = (
+    'raw_score',
+    'deep_streak_max',
+    'context_switches',
+    'productive_blocks',
+    'distract_blocks',
+    'neutral_blocks',
+    'total_filled',
+    'focus_sum_productive',
+    'focus_count_productive',
+)
+
+# summary_prefix テーブルに累積和を保持する指標（DailySummary の数値項目）
+SUMMARY_PREFIX_METRICS = (
+    'focus_score',
+    'raw_score',
+    'deep_streak_max',
+    'context_switches',
+    'penalty',
+    'productive_blocks',
+    'distract_blocks',
+    'neutral_blocks',
+    'total_filled',
+    'productive_hours',
+    'distract_hours',
+    'distract_ratio',
+    'avg_focus_productive',
+)
+
+# summary_rollups テーブルの集計期間（ISO週・月・年）
+ROLLUP_GRANULARITIES = ('week', 'month', 'year')
+
+# category_weights の最初の適用開始日（カテゴリ登録時の重み）
+WEIGHT_EPOCH = '0001-01-01'
+
+# data_versions のスコープ（日付ごとのスコープは "date:YYYY-MM-DD"）
+EPOCH_SCOPE = 'epoch'
+CATEGORIES_VERSION_SCOPE = 'categories'
+DATE_VERSION_PREFIX = 'date:'
+
+# 夜間事前計算の実行・日ごとの状態
+PRECOMPUTE_PENDING = 'pending'
+PRECOMPUTE_RUNNING = 'running'
+PRECOMPUTE_DONE = 'done'
+PRECOMPUTE_FAILED = 'failed'
+
+# 全履歴の並列再計算（python -m app.rebuild）の実行状態
+REBUILD_RUNNING = 'running'
+REBUILD_DONE = 'done'
+REBUILD_FAILED = 'failed'
+
+# 重み変更後の再計算で、1回のスコアリングにまとめる日数
+RESCORE_CHUNK_DAYS = 200
+
+# 接続作成時に一度だけ適用するPRAGMA
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",      # 読み取りと書き込みを並行可能にする
+    "PRAGMA synchronous = NORMAL",    # WALではNORMALで十分な耐久性
+    "PRAGMA foreign_keys = ON",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -8000",      # 約8MBのページキャッシュ
+)
+
 
 # === データベース接続管理 ===
 
+class ConnectionPool:
+    """
+    SQLite接続プール（有界キュー方式）
+    
+    接続は初回利用時に作成してPRAGMAを適用し、以後は使い回す。
+    最大接続数に達している場合は返却されるまで待機する。
+    """
+    
+    def __init__(self, db_path: str, max_size: int = DB_POOL_SIZE,
+                 timeout: float = DB_POOL_TIMEOUT):
+        self.db_path = db_path
+        self.max_size = max(1, max_size)
+        self.timeout = timeout
+        self.pid = os.getpid()
+        
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._closed = False
+        
+        # 統計カウンタ
+        self._created = 0       # 現在プールが管理している接続数
+        self._in_use = 0
+        self._total_created = 0
+        self._acquired = 0
+        self._reused = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._discarded = 0
+    
+    def _create_connection(self) -> sqlite3.Connection:
+        """新しい接続を作成してPRAGMAを適用"""
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=DB_BUSY_TIMEOUT_MS / 1000,
+            check_same_thread=False  # プール経由でスレッド間を移動するため
+        )
+        conn.row_factory = sqlite3.Row  # 辞書ライクなアクセスを可能にする
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        conn.execute(f"PRAGMA busy_timeout = {DB_BUSY_TIMEOUT_MS}")
+        return conn
+    
+    def acquire(self) -> sqlite3.Connection:
+        """接続を取得（空きがなければ作成、上限到達時は待機）"""
+        if self._closed:
+            raise sqlite3.OperationalError("接続プールは既にクローズされています")
+        
+        try:
+            conn = self._idle.get_nowait()
+            with self._lock:
+                self._acquired += 1
+                self._reused += 1
+                self._in_use += 1
+            return conn
+        except queue.Empty:
+            pass
+        
+        with self._lock:
+            can_create = self._created < self.max_size
+            if can_create:
+                self._created += 1
+        
+        if can_create:
+            try:
+                conn = self._create_connection()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+            with self._lock:
+                self._total_created += 1
+                self._acquired += 1
+                self._in_use += 1
+            return conn
+        
+        # 上限到達: 返却を待つ
+        wait_start = time.perf_counter()
+        try:
+            conn = self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise sqlite3.OperationalError(
+                f"接続プールが枯渇しました（{self.max_size} 接続, {self.timeout}秒待機）"
+            )
+        with self._lock:
+            self._waits += 1
+            self._wait_time += time.perf_counter() - wait_start
+            self._acquired += 1
+            self._reused += 1
+            self._in_use += 1
+        return conn
+    
+    def release(self, conn: sqlite3.Connection):
+        """接続を返却（未完了トランザクションはロールバック）"""
+        discard = self._closed
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            discard = True  # 壊れた接続は再利用しない
+        
+        with self._lock:
+            self._in_use -= 1
+            if discard:
+                self._created -= 1
+                self._discarded += 1
+        
+        if discard:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        else:
+            self._idle.put(conn)
+    
+    def close_all(self):
+        """待機中の接続を全てクローズ（使用中の接続は返却時にクローズ）"""
+        self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            with self._lock:
+                self._created -= 1
+            conn.close()
+    
+    def stats(self) -> Dict[str, Any]:
+        """プール統計情報を取得"""
+        with self._lock:
+            return {
+                'max_size': self.max_size,
+                'open_connections': self._created,
+                'in_use': self._in_use,
+                'idle': self._idle.qsize(),
+                'total_created': self._total_created,
+                'acquired': self._acquired,
+                'reuse_ratio': round(self._reused / max(self._acquired, 1), 3),
+                'waits': self._waits,
+                'avg_wait_ms': round(self._wait_time / max(self._waits, 1) * 1000, 2),
+                'discarded': self._discarded
+            }
+
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_connection_pool() -> ConnectionPool:
+    """
+    プロセス共通の接続プールを取得
+    DB_PATHの変更やfork後のプロセスでは新しいプールを作り直す
+    """
+    global _pool
+    pool = _pool
+    if pool is not None and pool.db_path == DB_PATH and pool.pid == os.getpid():
+        return pool
+    
+    with _pool_lock:
+        if _pool is None or _pool.db_path != DB_PATH or _pool.pid != os.getpid():
+            if _pool is not None and _pool.pid == os.getpid():
+                _pool.close_all()
+            _pool = ConnectionPool(DB_PATH)
+        return _pool
+
+
+def close_connection_pool():
+    """接続プールを破棄（DBファイル削除前などに使用）"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None and _pool.pid == os.getpid():
+            _pool.close_all()
+        _pool = None
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    """接続プールの統計情報を取得"""
+    return get_connection_pool().stats()
+
+
 @contextmanager
 def get_db_connection():
-    """データベース接続のコンテキストマネージャー"""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row  # 辞書ライクなアクセスを可能にする
+    """データベース接続のコンテキストマネージャー（プールから貸し出し）"""
+    pool = get_connection_pool()
+    conn = pool.acquire()
     try:
         yield conn
     finally:
-        conn.close()
+        pool.release(conn)
 
 
 # === データベース初期化 ===
@@ -39,13 +312,27 @@ def init_database():
     データベースとテーブルを初期化
     
     初期化内容:
-    - blocks テーブル作成
+    - blocks テーブル作成（旧形式の category TEXT カラムは category_id に移行）
     - categories テーブル作成
+    - daily_summaries テーブル作成（新規作成時は既存ブロックからバックフィル）
+    - summary_prefix テーブル作成（日次サマリの累積和、読み出し時に不足分を延長）
+    - summary_rollups テーブル作成（週・月・年の集計、日次サマリの変更から増分更新）
+    - day_vectors テーブル作成（日次ベクトル形式用）
+    - data_versions テーブル作成（日付ごと・カテゴリのバージョンカウンタ）
+    - llm_responses テーブル作成（LLM応答の永続キャッシュ）
+    - precompute_runs / precompute_items テーブル作成（夜間事前計算の進捗）
+    - rebuild_runs / rebuild_batches テーブル作成（全履歴の並列再計算の進捗）
+    - category_weights テーブル作成（カテゴリの重みの適用開始日ごとの履歴）
     - 初期カテゴリデータ投入
     """
     with get_db_connection() as conn:
         cursor = conn.cursor()
         
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'daily_summaries'")
+        summaries_existed = cursor.fetchone() is not None
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'summary_rollups'")
+        rollups_existed = cursor.fetchone() is not None
+        
         # blocks テーブル作成
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS blocks (
@@ -53,7 +340,7 @@ def init_database():
                 date TEXT NOT NULL,
                 slot_index INTEGER NOT NULL,
                 start_time TEXT NOT NULL,
-                category TEXT,
+                category_id INTEGER REFERENCES categories(id),
                 focus INTEGER,
                 memo TEXT,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
@@ -62,6 +349,9 @@ def init_database():
             )
         """)
         
+        cursor.execute("PRAGMA table_info(blocks)")
+        legacy_blocks = 'category' in {row['name'] for row in cursor.fetchall()}
+        
         # categories テーブル作成
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS categories (
@@ -74,15 +364,284 @@ def init_database():
             )
         """)
         
+        # daily_summaries テーブル作成（日次集計のマテリアライズ）
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS daily_summaries (
+                date TEXT PRIMARY KEY,
+                raw_score INTEGER NOT NULL,
+                deep_streak_max INTEGER NOT NULL,
+                context_switches INTEGER NOT NULL,
+                productive_blocks INTEGER NOT NULL,
+                distract_blocks INTEGER NOT NULL,
+                neutral_blocks INTEGER NOT NULL,
+                total_filled INTEGER NOT NULL,
+                focus_sum_productive INTEGER NOT NULL,
+                focus_count_productive INTEGER NOT NULL,
+                streak_runs TEXT,
+                category_blocks TEXT,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        
+        # summary_rollups テーブル作成（日次サマリの週・月・年集計、deep_streak_max のみ最大値）
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS summary_rollups (
+                granularity TEXT NOT NULL,
+                period TEXT NOT NULL,
+                start_date TEXT NOT NULL,
+                end_date TEXT NOT NULL,
+                days INTEGER NOT NULL,
+                raw_score INTEGER NOT NULL,
+                deep_streak_max INTEGER NOT NULL,
+                context_switches INTEGER NOT NULL,
+                productive_blocks INTEGER NOT NULL,
+                distract_blocks INTEGER NOT NULL,
+                neutral_blocks INTEGER NOT NULL,
+                total_filled INTEGER NOT NULL,
+                focus_sum_productive INTEGER NOT NULL,
+                focus_count_productive INTEGER NOT NULL,
+                focus_score_sum REAL NOT NULL,
+                category_blocks TEXT NOT NULL,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (granularity, period)
+            ) WITHOUT ROWID
+        """)
+        
+        # summary_prefix テーブル作成（日次サマリ指標の日付順の累積和、移動窓の集計用）
+        # 行は先頭から連続して有効で、日次サマリが変わった日以降の行は削除される
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS summary_prefix (
+                date TEXT PRIMARY KEY,
+                days INTEGER NOT NULL,
+                avg_focus_days INTEGER NOT NULL,
+                focus_score REAL NOT NULL,
+                raw_score REAL NOT NULL,
+                deep_streak_max REAL NOT NULL,
+                context_switches REAL NOT NULL,
+                penalty REAL NOT NULL,
+                productive_blocks REAL NOT NULL,
+                distract_blocks REAL NOT NULL,
+                neutral_blocks REAL NOT NULL,
+                total_filled REAL NOT NULL,
+                productive_hours REAL NOT NULL,
+                distract_hours REAL NOT NULL,
+                distract_ratio REAL NOT NULL,
+                avg_focus_productive REAL NOT NULL
+            ) WITHOUT ROWID
+        """)
+        
+        # day_vectors テーブル作成（日次ベクトル形式: 1日1行）
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS day_vectors (
+                date TEXT PRIMARY KEY,
+                categories BLOB NOT NULL,
+                focus BLOB NOT NULL,
+                memos TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            ) WITHOUT ROWID
+        """)
+        
+        # data_versions テーブル作成（ETag用のバージョンカウンタ）
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS data_versions (
+                scope TEXT PRIMARY KEY,
+                version INTEGER NOT NULL
+            ) WITHOUT ROWID
+        """)
+        # DBを作り直した後に古いETagと衝突しないよう、DBごとに乱数のエポックを持つ
+        cursor.execute("""
+            INSERT OR IGNORE INTO data_versions (scope, version) VALUES (?, ?)
+        """, (EPOCH_SCOPE, secrets.randbits(31)))
+        
+        # llm_responses テーブル作成（プロンプトの指紋 -> LLM応答）
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS llm_responses (
+                cache_key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used_at REAL NOT NULL
+            ) WITHOUT ROWID
+        """)
+        
+        # precompute_runs / precompute_items テーブル作成（夜間事前計算の実行単位と日ごとの進捗）
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS precompute_runs (
+                anchor_date TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                owner TEXT NOT NULL,
+                started_at REAL NOT NULL,
+                heartbeat_at REAL NOT NULL,
+                finished_at REAL,
+                attempts INTEGER NOT NULL DEFAULT 1
+            ) WITHOUT ROWID
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS precompute_items (
+                anchor_date TEXT NOT NULL,
+                date TEXT NOT NULL,
+                status TEXT NOT NULL,
+                error TEXT,
+                updated_at REAL,
+                PRIMARY KEY (anchor_date, date)
+            ) WITHOUT ROWID
+        """)
+        
+        # rebuild_runs / rebuild_batches テーブル作成（全履歴の並列再計算の実行単位と書き込み済みのバッチ）
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS rebuild_runs (
+                run_key TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                categories_version INTEGER NOT NULL,
+                started_at REAL NOT NULL,
+                finished_at REAL
+            ) WITHOUT ROWID
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS rebuild_batches (
+                run_key TEXT NOT NULL,
+                first_date TEXT NOT NULL,
+                last_date TEXT NOT NULL,
+                days INTEGER NOT NULL,
+                skipped INTEGER NOT NULL,
+                finished_at REAL NOT NULL,
+                PRIMARY KEY (run_key, first_date)
+            ) WITHOUT ROWID
+        """)
+        
+        # category_weights テーブル作成（適用開始日ごとの重み、version は変更ごとに増える通し番号）
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS category_weights (
+                category_id INTEGER NOT NULL REFERENCES categories(id),
+                effective_from TEXT NOT NULL,
+                weight INTEGER NOT NULL,
+                version INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (category_id, effective_from)
+            ) WITHOUT ROWID
+        """)
+        _ensure_base_category_weights(cursor)
+        
+        # 既存テーブルへのカラム追加（マイグレーション）
+        _ensure_column(cursor, 'daily_summaries', 'streak_runs', 'TEXT')
+        _ensure_column(cursor, 'daily_summaries', 'category_blocks', 'TEXT')
+        _ensure_column(cursor, 'daily_summaries', 'weight_version', 'INTEGER NOT NULL DEFAULT 0')
+        
+        # カテゴリ別ブロック数を持たない旧形式の日次サマリ（再構築して週・月・年集計を作り直す）
+        cursor.execute("SELECT 1 FROM daily_summaries WHERE category_blocks IS NULL LIMIT 1")
+        legacy_summaries = cursor.fetchone() is not None
+        
         # インデックス作成
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_blocks_date ON blocks(date)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_blocks_date_slot ON blocks(date, slot_index)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_categories_order ON categories(order_index)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_llm_responses_used ON llm_responses(last_used_at)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_summary_rollups_start ON summary_rollups(granularity, start_date)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_daily_summaries_weight_version ON daily_summaries(weight_version)")
         
         conn.commit()
+    
+    # 初期カテゴリデータ投入（存在しない場合のみ）
+    insert_initial_categories()
+    
+    # blocks.category (TEXT) -> blocks.category_id (INTEGER) の移行
+    if legacy_blocks:
+        migrated = migrate_block_category_ids()
+        print(f"blocks テーブル {migrated} 行をカテゴリID形式に移行しました。")
+    
+    # 既存データベースに daily_summaries を追加した場合・旧形式の場合はバックフィル
+    if not summaries_existed or legacy_summaries:
+        rebuilt = rebuild_daily_summaries()
+        if rebuilt:
+            print(f"日次サマリ {rebuilt} 日分をバックフィルしました。")
+    
+    if not rollups_existed or legacy_summaries:
+        periods = rebuild_summary_rollups()
+        if periods:
+            print(f"週・月・年集計 {periods} 期間分をバックフィルしました。")
+
+
+def _ensure_column(cursor: sqlite3.Cursor, table: str, column: str, definition: str):
+    """カラムが存在しなければ追加"""
+    cursor.execute(f"PRAGMA table_info({table})")
+    if column not in {row['name'] for row in cursor.fetchall()}:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+
+def _ensure_base_category_weights(cursor: sqlite3.Cursor):
+    """重みの履歴を持たないカテゴリに、登録時の重みを最初の履歴として追加（コミットしない）"""
+    cursor.execute("""
+        INSERT OR IGNORE INTO category_weights (category_id, effective_from, weight, version, created_at)
+        SELECT id, ?, weight, 0, ? FROM categories
+    """, (WEIGHT_EPOCH, time.time()))
+
+
+def migrate_block_category_ids() -> int:
+    """
+    旧形式の blocks.category (TEXT) を categories.id への外部キー category_id に移行
+    未登録のカテゴリコードは重み0のカテゴリとして登録してから移行する
+    
+    Returns:
+        移行した行数
+    """
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        
+        # 未登録コードを重み0のカテゴリとして登録
+        cursor.execute("""
+            SELECT DISTINCT category FROM blocks
+            WHERE category IS NOT NULL AND category NOT IN (SELECT code FROM categories)
+            ORDER BY category
+        """)
+        unknown_codes = [row['category'] for row in cursor.fetchall()]
+        if unknown_codes:
+            cursor.execute("SELECT COALESCE(MAX(order_index), -1) FROM categories")
+            next_order = cursor.fetchone()[0] + 1
+            for i, code in enumerate(unknown_codes):
+                cursor.execute("""
+                    INSERT INTO categories (code, label, weight, color, order_index)
+                    VALUES (?, ?, 0, '#9E9E9E', ?)
+                """, (code, code, next_order + i))
+            _ensure_base_category_weights(cursor)
+            print(f"未登録カテゴリ {len(unknown_codes)} 件を重み0で登録しました: {', '.join(unknown_codes)}")
+        
+        # テーブルを作り直して category をIDに置き換える
+        cursor.execute("""
+            CREATE TABLE blocks_migrated (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                date TEXT NOT NULL,
+                slot_index INTEGER NOT NULL,
+                start_time TEXT NOT NULL,
+                category_id INTEGER REFERENCES categories(id),
+                focus INTEGER,
+                memo TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE(date, slot_index)
+            )
+        """)
+        cursor.execute("""
+            INSERT INTO blocks_migrated
+                (id, date, slot_index, start_time, category_id, focus, memo, created_at, updated_at)
+            SELECT b.id, b.date, b.slot_index, b.start_time, c.id, b.focus, b.memo, b.created_at, b.updated_at
+            FROM blocks b
+            LEFT JOIN categories c ON c.code = b.category
+        """)
+        migrated = cursor.rowcount
+        
+        cursor.execute("DROP TABLE blocks")
+        cursor.execute("ALTER TABLE blocks_migrated RENAME TO blocks")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_blocks_date ON blocks(date)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_blocks_date_slot ON blocks(date, slot_index)")
+        if unknown_codes:
+            _bump_categories_version(cursor)
         
-        # 初期カテゴリデータ投入（存在しない場合のみ）
-        insert_initial_categories()
+        conn.commit()
+    
+    invalidate_category_registry()
+    return migrated
 
 
 def insert_initial_categories():
@@ -104,9 +663,13 @@ def insert_initial_categories():
                 INSERT INTO categories (code, label, weight, color, order_index)
                 VALUES (?, ?, ?, ?, ?)
             """, (category.code, category.label, category.weight, category.color, category.order_index))
+        _ensure_base_category_weights(cursor)
+        _bump_categories_version(cursor)
         
         conn.commit()
         print(f"初期カテゴリ {len(INITIAL_CATEGORIES)} 件を投入しました。")
+    
+    invalidate_category_registry()
 
 
 # === ブロック操作 ===
@@ -125,26 +688,31 @@ def get_day_blocks(date: str) -> List[DBBlock]:
     with get_db_connection() as conn:
         cursor = conn.cursor()
         
-        # 既存ブロックを取得
-        cursor.execute("""
-            SELECT date, slot_index, start_time, category, focus, memo, created_at, updated_at
-            FROM blocks
-            WHERE date = ?
-            ORDER BY slot_index
-        """, (date,))
-        
-        existing_blocks = {}
-        for row in cursor.fetchall():
-            existing_blocks[row['slot_index']] = DBBlock(
-                date=row['date'],
-                slot_index=row['slot_index'],
-                start_time=row['start_time'],
-                category=row['category'],
-                focus=row['focus'],
-                memo=row['memo'],
-                created_at=row['created_at'],
-                updated_at=row['updated_at']
-            )
+        if _use_day_vectors():
+            existing_blocks = _get_day_vector_blocks(cursor, date)
+        else:
+            # 既存ブロックを取得
+            cursor.execute("""
+                SELECT date, slot_index, start_time, category_id, focus, memo, created_at, updated_at
+                FROM blocks
+                WHERE date = ?
+                ORDER BY slot_index
+            """, (date,))
+            rows = cursor.fetchall()
+            registry = get_category_registry(cursor)
+            
+            existing_blocks = {}
+            for row in rows:
+                existing_blocks[row['slot_index']] = DBBlock(
+                    date=row['date'],
+                    slot_index=row['slot_index'],
+                    start_time=row['start_time'],
+                    category=registry.code(row['category_id']),
+                    focus=row['focus'],
+                    memo=row['memo'],
+                    created_at=row['created_at'],
+                    updated_at=row['updated_at']
+                )
         
         # 80スロット全てを埋める（未入力は category=None）
         all_blocks = []
@@ -167,6 +735,96 @@ def get_day_blocks(date: str) -> List[DBBlock]:
         return all_blocks
 
 
+def get_day_slot_rows(date: str) -> List[Tuple[int, Optional[str], Optional[int], Optional[str], Any, Any]]:
+    """
+    指定日の保存済みスロットをタプルのまま取得（/api/day の高速応答用、DBBlock を作らない）
+    
+    Args:
+        date: 対象日 (YYYY-MM-DD)
+        
+    Returns:
+        (slot_index, category, focus, memo, created_at, updated_at) のタプルリスト（スロット順、
+        行のないスロットは含まない）
+    """
+    with get_db_connection() as conn:
+        codes = get_category_registry(conn.cursor()).codes
+        cursor = conn.cursor()
+        cursor.row_factory = None  # Row オブジェクトを作らずタプルで受け取る
+        
+        if _use_day_vectors():
+            cursor.execute("""
+                SELECT categories, focus, memos, created_at, updated_at
+                FROM day_vectors
+                WHERE date = ?
+            """, (date,))
+            row = cursor.fetchone()
+            if row is None:
+                return []
+            
+            vector = DayVector.from_row(row[0], row[1], row[2])
+            return [(slot_index, codes[category_id] if category_id else None, focus, memo, row[3], row[4])
+                    for slot_index in range(SLOTS_PER_DAY) if vector.has_slot(slot_index)
+                    for category_id, focus, memo in (vector.get_slot(slot_index),)]
+        
+        cursor.execute("""
+            SELECT slot_index, category_id, focus, memo, created_at, updated_at
+            FROM blocks
+            WHERE date = ?
+            ORDER BY slot_index
+        """, (date,))
+        return [(slot_index, codes[category_id] if category_id else None, focus, memo, created_at, updated_at)
+                for slot_index, category_id, focus, memo, created_at, updated_at in cursor]
+
+
+def get_range_day_slots(start_date: str, end_date: str) -> Dict[str, Dict[str, Any]]:
+    """
+    日付範囲の全日分のスロットを1回の範囲読み出しで取得（複数日表示用の圧縮形式）
+    
+    Args:
+        start_date: 開始日 (YYYY-MM-DD)
+        end_date: 終了日 (YYYY-MM-DD)
+        
+    Returns:
+        日付 -> {'category': [80個のコード], 'focus': [80個の集中度], 'memo': {スロット番号: メモ}}
+        のマッピング（範囲内の全日付を日付順に含み、未入力は None）
+    """
+    days = {date: {'category': [None] * SLOTS_PER_DAY, 'focus': [None] * SLOTS_PER_DAY, 'memo': {}}
+            for date in get_date_range(start_date, end_date)}
+    
+    with get_db_connection() as conn:
+        codes = get_category_registry(conn.cursor()).codes
+        cursor = conn.cursor()
+        cursor.row_factory = None  # Row オブジェクトを作らずタプルで受け取る
+        
+        if _use_day_vectors():
+            cursor.execute("""
+                SELECT date, categories, focus, memos
+                FROM day_vectors
+                WHERE date BETWEEN ? AND ?
+            """, (start_date, end_date))
+            for date, categories, focus, memos in cursor:
+                vector = DayVector.from_row(categories, focus, memos)
+                day = days[date]
+                day['category'] = [codes[category_id] if category_id else None
+                                   for category_id in vector.categories]
+                day['focus'] = [value or None for value in vector.focus]
+                day['memo'] = vector.memos
+        else:
+            cursor.execute("""
+                SELECT date, slot_index, category_id, focus, memo
+                FROM blocks
+                WHERE date BETWEEN ? AND ?
+            """, (start_date, end_date))
+            for date, slot_index, category_id, focus, memo in cursor:
+                day = days[date]
+                day['category'][slot_index] = codes[category_id] if category_id else None
+                day['focus'][slot_index] = focus
+                if memo is not None:
+                    day['memo'][slot_index] = memo
+    
+    return days
+
+
 def upsert_block(date: str, slot_index: int, category: Optional[str] = None, 
                 focus: Optional[int] = None, memo: Optional[str] = None) -> bool:
     """
@@ -195,179 +853,2063 @@ def upsert_block(date: str, slot_index: int, category: Optional[str] = None,
     with get_db_connection() as conn:
         cursor = conn.cursor()
         
-        cursor.execute("""
-            INSERT INTO blocks (date, slot_index, start_time, category, focus, memo, created_at, updated_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ON CONFLICT(date, slot_index) DO UPDATE SET
-                category = excluded.category,
-                focus = excluded.focus,
-                memo = excluded.memo,
-                updated_at = excluded.updated_at
-        """, (date, slot_index, start_time, category, focus, memo, now, now))
+        # 変更前の値の読み出しからコミットまで他の書き込みを締め出す
+        cursor.execute("BEGIN IMMEDIATE")
+        
+        # 日次サマリの増分更新はカテゴリIDのまま行う
+        category_id = _resolve_category_id(cursor, category)
+        new_block = (slot_index, category_id, focus) if category_id is not None else None
+        
+        if _use_day_vectors():
+            vector = _load_day_vector(cursor, date)
+            old_category_id, old_focus, _ = vector.get_slot(slot_index)
+            old_block = (slot_index, old_category_id, old_focus) if old_category_id else None
+            
+            vector.set_slot(slot_index, category_id or 0, focus, memo)
+            _save_day_vector(cursor, date, vector, now)
+            day_blocks = vector.filled_slots()
+        else:
+            # 変更前の値（日次サマリの増分更新用）
+            cursor.execute("""
+                SELECT category_id, focus FROM blocks
+                WHERE date = ? AND slot_index = ?
+            """, (date, slot_index))
+            row = cursor.fetchone()
+            old_block = (slot_index, row['category_id'], row['focus']) if row and row['category_id'] is not None else None
+            
+            cursor.execute("""
+                INSERT INTO blocks (date, slot_index, start_time, category_id, focus, memo, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(date, slot_index) DO UPDATE SET
+                    category_id = excluded.category_id,
+                    focus = excluded.focus,
+                    memo = excluded.memo,
+                    updated_at = excluded.updated_at
+            """, (date, slot_index, start_time, category_id, focus, memo, now, now))
+            day_blocks = None
+        
+        # 同一トランザクション内で日次サマリを増分更新
+        _patch_daily_summary(cursor, date, slot_index, old_block, new_block, day_blocks)
+        _bump_date_versions(cursor, [date])
         
         conn.commit()
-        return True
+    
+    _notify_date_writes([date])
+    return True
 
 
-def bulk_upsert_blocks(blocks_data: List[Dict[str, Any]]) -> int:
+def bulk_upsert_blocks(blocks_data: List[Dict[str, Any]],
+                       chunk_size: int = BULK_CHUNK_SIZE, raise_write_errors: bool = False) -> Dict[str, Any]:
     """
     複数ブロックを一括Upsert
     
+    全行を先に検証し、有効な行を (date, slot_index) 順に chunk_size 行ずつ
+    1トランザクションで executemany により書き込む。保存済みの値と同じ行は書き込まない。
+    同じスロットが複数回指定された場合は後の行が優先される。
+    書き込みに失敗したチャンクはロールバックし、その行を rejected として報告する
+    （それ以前のチャンクはコミット済み）。
+    
     Args:
         blocks_data: ブロックデータのリスト
+        chunk_size: 1トランザクションあたりの行数
+        raise_write_errors: チャンクの書き込みに失敗したら rejected とせずに sqlite3.Error を送出する
+            （ロールバック済み、再試行する呼び出し元用）
         
     Returns:
-        処理件数
+        結果レポート（accepted / rejected / unchanged の件数、チャンク数、
+        リクエスト順の行ごとの結果 results）
     """
+    chunk_size = max(1, chunk_size)
+    results: List[Dict[str, Any]] = []
+    valid_rows: List[Tuple[int, str, int, Optional[int], Optional[int], Optional[str]]] = []
+    chunks = 0
+    
     with get_db_connection() as conn:
         cursor = conn.cursor()
+        
+        # 書き込み前に全行を検証
+        for index, block_data in enumerate(blocks_data):
+            results.append({
+                'index': index,
+                'date': block_data.get('date'),
+                'slot_index': block_data.get('slot_index'),
+                'status': BULK_ACCEPTED,
+                'reason': None
+            })
+            try:
+                valid_rows.append((index, *_validate_bulk_row(cursor, block_data)))
+            except ValueError as e:
+                results[index].update(status=BULK_REJECTED, reason=str(e))
+        
+        # 同じ日のスロットが同じチャンクに集まるよう並べる（安定ソートのため後勝ちは保たれる）
+        valid_rows.sort(key=lambda row: (row[1], row[2]))
         now = datetime.now()
         
-        processed = 0
-        for block_data in blocks_data:
-            date = block_data['date']
-            slot_index = block_data['slot_index']
-            category = block_data.get('category')
-            focus = block_data.get('focus')
-            memo = block_data.get('memo')
-            
-            # バリデーション
-            if not validate_slot_index(slot_index):
+        for i in range(0, len(valid_rows), chunk_size):
+            chunk = valid_rows[i:i + chunk_size]
+            chunks += 1
+            try:
+                # 読み出しを伴う書き込みのため最初に書き込みロックを取得
+                cursor.execute("BEGIN IMMEDIATE")
+                if _use_day_vectors():
+                    unchanged, changed_dates = _write_bulk_chunk_vectors(cursor, chunk, now)
+                else:
+                    unchanged, changed_dates = _write_bulk_chunk_rows(cursor, chunk, now)
+                conn.commit()
+            except (sqlite3.Error, ValueError) as e:
+                conn.rollback()
+                if raise_write_errors and isinstance(e, sqlite3.Error):
+                    raise
+                for index, *_ in chunk:
+                    results[index].update(status=BULK_REJECTED, reason=f"書き込みエラー: {e}")
                 continue
-            if not validate_focus_level(focus):
-                continue
-            
-            start_time = slot_index_to_time(slot_index)
             
+            for index in unchanged:
+                results[index]['status'] = BULK_UNCHANGED
+            _notify_date_writes(changed_dates)
+    
+    counts = {status: 0 for status in BULK_STATUSES}
+    for result in results:
+        counts[result['status']] += 1
+    
+    return {**counts, 'chunks': chunks, 'results': results}
+
+
+def _validate_bulk_row(cursor: sqlite3.Cursor, block_data: Dict[str, Any]
+                       ) -> Tuple[str, int, Optional[int], Optional[int], Optional[str]]:
+    """
+    一括更新の1行を検証して書き込み用の値に変換
+    
+    Returns:
+        (date, slot_index, category_id, focus, memo)
+        
+    Raises:
+        ValueError: 不正な行（メッセージが rejected の理由になる）
+    """
+    date = block_data.get('date')
+    slot_index = block_data.get('slot_index')
+    focus = block_data.get('focus')
+    memo = block_data.get('memo')
+    
+    if not isinstance(date, str) or not validate_date_format(date):
+        raise ValueError(f"日付形式が正しくありません: {date}")
+    if not isinstance(slot_index, int) or not validate_slot_index(slot_index):
+        raise ValueError(f"無効なスロットインデックス: {slot_index}")
+    if (focus is not None and not isinstance(focus, int)) or not validate_focus_level(focus):
+        raise ValueError(f"無効な集中度: {focus}")
+    if memo is not None and len(memo) > MEMO_MAX_LENGTH:
+        raise ValueError(f"メモは{MEMO_MAX_LENGTH}文字以内で入力してください")
+    
+    category_id = _resolve_category_id(cursor, block_data.get('category'))
+    return date, slot_index, category_id, focus, memo
+
+
+def _write_bulk_chunk_rows(cursor: sqlite3.Cursor,
+                           chunk: List[Tuple[int, str, int, Optional[int], Optional[int], Optional[str]]],
+                           now: datetime) -> Tuple[List[int], List[str]]:
+    """
+    一括更新の1チャンクを blocks テーブルに書き込み（コミットしない）
+    
+    Returns:
+        (保存済みの値と同じだった行のインデックス, 書き込んだ日付)
+    """
+    # チャンクは日付順のため範囲読み出しで済む
+    cursor.execute("""
+        SELECT date, slot_index, category_id, focus, memo FROM blocks
+        WHERE date BETWEEN ? AND ?
+    """, (chunk[0][1], chunk[-1][1]))
+    stored = {(row['date'], row['slot_index']): (row['category_id'], row['focus'], row['memo'])
+              for row in cursor.fetchall()}
+    
+    unchanged = []
+    changed: Dict[Tuple[str, int], Tuple[Optional[int], Optional[int], Optional[str]]] = {}
+    for index, date, slot_index, category_id, focus, memo in chunk:
+        key = (date, slot_index)
+        value = (category_id, focus, memo)
+        if stored.get(key, (None, None, None)) == value:
+            unchanged.append(index)
+            continue
+        stored[key] = changed[key] = value
+    
+    cursor.executemany("""
+        INSERT INTO blocks (date, slot_index, start_time, category_id, focus, memo, created_at, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(date, slot_index) DO UPDATE SET
+            category_id = excluded.category_id,
+            focus = excluded.focus,
+            memo = excluded.memo,
+            updated_at = excluded.updated_at
+    """, [(date, slot_index, slot_index_to_time(slot_index), category_id, focus, memo, now, now)
+          for (date, slot_index), (category_id, focus, memo) in changed.items()])
+    
+    # 同一トランザクション内で影響を受けた日の日次サマリを更新
+    changed_dates = sorted({date for date, _ in changed})
+    _refresh_daily_summaries(cursor, changed_dates)
+    _bump_date_versions(cursor, changed_dates)
+    return unchanged, changed_dates
+
+
+def _write_bulk_chunk_vectors(cursor: sqlite3.Cursor,
+                              chunk: List[Tuple[int, str, int, Optional[int], Optional[int], Optional[str]]],
+                              now: datetime) -> Tuple[List[int], List[str]]:
+    """
+    一括更新の1チャンクを日次ベクトル形式で書き込み（1日1回の読み書きにまとめる、コミットしない）
+    
+    Returns:
+        (保存済みの値と同じだった行のインデックス, 書き込んだ日付)
+    """
+    unchanged = []
+    vectors: Dict[str, DayVector] = {}
+    changed_dates = set()
+    for index, date, slot_index, category_id, focus, memo in chunk:
+        if date not in vectors:
+            vectors[date] = _load_day_vector(cursor, date)
+        vector = vectors[date]
+        if vector.get_slot(slot_index) == (category_id or 0, focus, memo):
+            unchanged.append(index)
+            continue
+        vector.set_slot(slot_index, category_id or 0, focus, memo)
+        changed_dates.add(date)
+    
+    for date in sorted(changed_dates):
+        _save_day_vector(cursor, date, vectors[date], now)
+    
+    # 同一トランザクション内で影響を受けた日の日次サマリを更新
+    changed_dates = sorted(changed_dates)
+    _refresh_daily_summaries(cursor, changed_dates)
+    _bump_date_versions(cursor, changed_dates)
+    return unchanged, changed_dates
+
+
+def upsert_block_range(date: str, first_slot: int, last_slot: int, category: Optional[str] = None,
+                       focus: Optional[int] = None, memo: Optional[str] = None) -> int:
+    """
+    連続するスロット範囲を同じ値で一括Upsert（1文の集合演算で書き込む）
+    
+    Args:
+        date: 日付 (YYYY-MM-DD)
+        first_slot: 最初のスロット番号 (0-79)
+        last_slot: 最後のスロット番号 (0-79, 含む)
+        category: カテゴリコード
+        focus: 集中度 (1-5)
+        memo: メモ
+        
+    Returns:
+        書き込んだスロット数
+    """
+    _validate_slot_range(first_slot, last_slot)
+    
+    if not validate_focus_level(focus):
+        raise ValueError(f"無効な集中度: {focus}")
+    
+    now = datetime.now()
+    
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        
+        category_id = _resolve_category_id(cursor, category)
+        
+        if _use_day_vectors():
+            vector = _load_day_vector(cursor, date)
+            for slot_index in range(first_slot, last_slot + 1):
+                vector.set_slot(slot_index, category_id or 0, focus, memo)
+            _save_day_vector(cursor, date, vector, now)
+        else:
+            # 再帰CTEでスロット番号を生成し、開始時刻もSQL側で算出する
             cursor.execute("""
-                INSERT INTO blocks (date, slot_index, start_time, category, focus, memo, created_at, updated_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                WITH RECURSIVE slots(slot_index) AS (
+                    SELECT ? UNION ALL SELECT slot_index + 1 FROM slots WHERE slot_index < ?
+                )
+                INSERT INTO blocks (date, slot_index, start_time, category_id, focus, memo, created_at, updated_at)
+                SELECT ?, slot_index, printf('%02d:%02d', 4 + slot_index / 4, (slot_index % 4) * 15),
+                       ?, ?, ?, ?, ?
+                FROM slots WHERE true
                 ON CONFLICT(date, slot_index) DO UPDATE SET
-                    category = excluded.category,
+                    category_id = excluded.category_id,
                     focus = excluded.focus,
                     memo = excluded.memo,
                     updated_at = excluded.updated_at
-            """, (date, slot_index, start_time, category, focus, memo, now, now))
-            
-            processed += 1
+            """, (first_slot, last_slot, date, category_id, focus, memo, now, now))
+        
+        # 同一トランザクション内で日次サマリを更新
+        _refresh_daily_summaries(cursor, [date])
+        _bump_date_versions(cursor, [date])
         
         conn.commit()
-        return processed
-
+    
+    _notify_date_writes([date])
+    return last_slot - first_slot + 1
 
-# === カテゴリ操作 ===
 
-def get_all_categories() -> List[DBCategory]:
-    """全カテゴリを順序付きで取得"""
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
+def clear_block_range(date: str, first_slot: int, last_slot: int) -> int:
+    """
+    連続するスロット範囲を未入力に戻す（カテゴリ・集中度・メモを削除）
+    
+    Args:
+        date: 日付 (YYYY-MM-DD)
+        first_slot: 最初のスロット番号 (0-79)
+        last_slot: 最後のスロット番号 (0-79, 含む)
+        
+    Returns:
+        値が入っていたスロット数
+    """
+    _validate_slot_range(first_slot, last_slot)
+    
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        
+        if _use_day_vectors():
+            vector = _load_day_vector(cursor, date)
+            cleared = 0
+            for slot_index in range(first_slot, last_slot + 1):
+                if vector.has_slot(slot_index):
+                    vector.set_slot(slot_index, 0, None, None)
+                    cleared += 1
+            if cleared:
+                _save_day_vector(cursor, date, vector, datetime.now())
+        else:
+            cursor.execute("""
+                DELETE FROM blocks
+                WHERE date = ? AND slot_index BETWEEN ? AND ?
+            """, (date, first_slot, last_slot))
+            cleared = cursor.rowcount
+        
+        if cleared:
+            _refresh_daily_summaries(cursor, [date])
+            _bump_date_versions(cursor, [date])
+        
+        conn.commit()
+    
+    if cleared:
+        _notify_date_writes([date])
+    return cleared
+
+
+def _validate_slot_range(first_slot: int, last_slot: int):
+    """スロット範囲の妥当性チェック"""
+    if not validate_slot_index(first_slot):
+        raise ValueError(f"無効なスロットインデックス: {first_slot}")
+    if not validate_slot_index(last_slot):
+        raise ValueError(f"無効なスロットインデックス: {last_slot}")
+    if last_slot < first_slot:
+        raise ValueError(f"スロット範囲が正しくありません: {first_slot}-{last_slot}")
+
+
+# === 日次ベクトル形式 ===
+
+def _use_day_vectors() -> bool:
+    """日次ベクトル形式で保存しているか"""
+    if STORAGE_MODE not in STORAGE_MODES:
+        raise ValueError(f"不明な保存形式です: {STORAGE_MODE} (FOCUS_RING_STORAGE は {'/'.join(STORAGE_MODES)})")
+    return STORAGE_MODE == 'vector'
+
+
+def _load_day_vector(cursor: sqlite3.Cursor, date: str) -> DayVector:
+    """指定日の日次ベクトルを読み込み（行がなければ空のベクトル）"""
+    cursor.execute("SELECT categories, focus, memos FROM day_vectors WHERE date = ?", (date,))
+    row = cursor.fetchone()
+    if row is None:
+        return DayVector()
+    return DayVector.from_row(row['categories'], row['focus'], row['memos'])
+
+
+def _save_day_vector(cursor: sqlite3.Cursor, date: str, vector: DayVector, now: datetime):
+    """日次ベクトルを保存（コミットしない）"""
+    categories, focus, memos = vector.to_row()
+    cursor.execute("""
+        INSERT INTO day_vectors (date, categories, focus, memos, created_at, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT(date) DO UPDATE SET
+            categories = excluded.categories,
+            focus = excluded.focus,
+            memos = excluded.memos,
+            updated_at = excluded.updated_at
+    """, (date, categories, focus, memos, now, now))
+
+
+def _get_day_vector_blocks(cursor: sqlite3.Cursor, date: str) -> Dict[int, DBBlock]:
+    """日次ベクトルから値のあるスロットの DBBlock を復元（スロット番号 -> DBBlock）"""
+    cursor.execute("""
+        SELECT categories, focus, memos, created_at, updated_at
+        FROM day_vectors
+        WHERE date = ?
+    """, (date,))
+    row = cursor.fetchone()
+    if row is None:
+        return {}
+    
+    vector = DayVector.from_row(row['categories'], row['focus'], row['memos'])
+    registry = get_category_registry(cursor)
+    
+    blocks = {}
+    for slot_index in range(SLOTS_PER_DAY):
+        if not vector.has_slot(slot_index):
+            continue
+        category_id, focus, memo = vector.get_slot(slot_index)
+        blocks[slot_index] = DBBlock(
+            date=date,
+            slot_index=slot_index,
+            start_time=slot_index_to_time(slot_index),
+            category=registry.code(category_id),
+            focus=focus,
+            memo=memo,
+            created_at=row['created_at'],
+            updated_at=row['updated_at']
+        )
+    return blocks
+
+
+def convert_storage(target_mode: str) -> int:
+    """
+    既存のブロックデータを指定の保存形式に移し替える（移行元のデータは削除）
+    変換後は FOCUS_RING_STORAGE を target_mode に合わせて起動すること
+    
+    Args:
+        target_mode: 変換先の保存形式 ('rows' / 'vector')
+        
+    Returns:
+        変換した日数
+    """
+    if target_mode not in STORAGE_MODES:
+        raise ValueError(f"不明な保存形式です: {target_mode}")
+    
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        
+        if target_mode == 'vector':
+            cursor.execute("""
+                SELECT date, slot_index, category_id, focus, memo
+                FROM blocks
+                ORDER BY date, slot_index
+            """)
+            rows = cursor.fetchall()
+            
+            vectors: Dict[str, DayVector] = {}
+            for row in rows:
+                date = row['date']
+                if date not in vectors:
+                    vectors[date] = _load_day_vector(cursor, date)
+                vectors[date].set_slot(row['slot_index'], row['category_id'] or 0,
+                                       row['focus'], row['memo'])
+            
+            now = datetime.now()
+            for date, vector in vectors.items():
+                _save_day_vector(cursor, date, vector, now)
+            cursor.execute("DELETE FROM blocks")
+            converted = len(vectors)
+        else:
+            cursor.execute("SELECT date, categories, focus, memos, created_at, updated_at FROM day_vectors")
+            
+            converted = 0
+            for row in cursor.fetchall():
+                vector = DayVector.from_row(row['categories'], row['focus'], row['memos'])
+                for slot_index in range(SLOTS_PER_DAY):
+                    if not vector.has_slot(slot_index):
+                        continue
+                    category_id, focus, memo = vector.get_slot(slot_index)
+                    cursor.execute("""
+                        INSERT INTO blocks (date, slot_index, start_time, category_id, focus, memo, created_at, updated_at)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                        ON CONFLICT(date, slot_index) DO UPDATE SET
+                            category_id = excluded.category_id,
+                            focus = excluded.focus,
+                            memo = excluded.memo,
+                            updated_at = excluded.updated_at
+                    """, (row['date'], slot_index, slot_index_to_time(slot_index),
+                          category_id or None, focus, memo, row['created_at'], row['updated_at']))
+                converted += 1
+            cursor.execute("DELETE FROM day_vectors")
+        
+        # 保存内容は変わらないため日次サマリはそのまま使える
+        conn.commit()
+        return converted
+
+
+# === カテゴリ参照表 ===
+
+class CategoryRegistry:
+    """
+    カテゴリの ID -> (コード, 重み) 参照表（プロセス内で共有する読み取り専用データ）
+    
+    codes / weights は categories.id をそのまま添字に使う配列で、
+    集計ループは文字列のハッシュなしに重みを引ける。
+    weights は最新の重みで、日次サマリの計算には weights_on(date) でその日に適用される重みを使う。
+    """
+    
+    def __init__(self, db_path: str, rows: List[Tuple[int, str, int]],
+                 weight_rows: List[Tuple[int, str, int, int]] = (), categories_version: int = 0):
+        self.db_path = db_path
+        self.pid = os.getpid()
+        self.categories_version = categories_version
+        
+        size = max((category_id for category_id, _, _ in rows), default=0) + 1
+        codes: List[Optional[str]] = [None] * size
+        weights = [0] * size
+        for category_id, code, weight in rows:
+            codes[category_id] = code
+            weights[category_id] = weight
+        
+        self.codes = tuple(codes)       # ID -> コード（未使用IDは None）
+        self.weights = tuple(weights)   # ID -> 重み（未使用IDは 0）
+        self.ids = {code: category_id for category_id, code, _ in rows}
+        self.weight_by_id = {category_id: weight for category_id, _, weight in rows}
+        self.weight_map = {code: weight for _, code, weight in rows}
+        
+        # 重みの履歴を適用開始日で区切った区間ごとの重みと、その区間に効く最新の変更の通し番号
+        starts: List[str] = []
+        segment_weights: List[Dict[int, int]] = []
+        segment_versions: List[int] = []
+        current: Dict[int, int] = {}
+        max_version = 0
+        for category_id, effective_from, weight, version in sorted(weight_rows, key=lambda row: row[1]):
+            if not starts or starts[-1] != effective_from:
+                starts.append(effective_from)
+                segment_weights.append({})
+                segment_versions.append(0)
+            current[category_id] = weight
+            max_version = max(max_version, version)
+            segment_weights[-1] = dict(current)
+            segment_versions[-1] = max_version
+        
+        self._weight_starts = tuple(starts)
+        self._segment_weights = tuple(segment_weights)
+        self._segment_weight_maps = tuple({self.codes[category_id]: weight
+                                           for category_id, weight in weights.items()}
+                                          for weights in segment_weights)
+        self._segment_versions = tuple(segment_versions)
+        self.weight_version = max_version   # 最新の重み変更の通し番号（変更がなければ 0）
+    
+    def code(self, category_id: Optional[int]) -> Optional[str]:
+        """カテゴリIDをコードに変換（未入力は None）"""
+        return self.codes[category_id] if category_id else None
+    
+    def _segment(self, date: str) -> int:
+        """日付に適用される重みの区間の添字（履歴がなければ -1）"""
+        return bisect_right(self._weight_starts, date) - 1
+    
+    def weights_on(self, date: str) -> Dict[int, int]:
+        """指定日に適用されるカテゴリID -> 重み"""
+        segment = self._segment(date)
+        return self._segment_weights[segment] if segment >= 0 else self.weight_by_id
+    
+    def weight_map_on(self, date: str) -> Dict[str, int]:
+        """指定日に適用されるカテゴリコード -> 重み"""
+        segment = self._segment(date)
+        return self._segment_weight_maps[segment] if segment >= 0 else self.weight_map
+    
+    def weight_periods(self, start_date: str, end_date: str) -> List[Tuple[str, str, Dict[int, int]]]:
+        """日付範囲を同じ重みが適用される区間に分割した (最初の日付, 最後の日付, カテゴリID -> 重み) のリスト"""
+        periods = []
+        first = start_date
+        segment = self._segment(start_date)
+        while segment + 1 < len(self._weight_starts) and self._weight_starts[segment + 1] <= end_date:
+            next_start = self._weight_starts[segment + 1]
+            last = format_date(parse_date(next_start) - timedelta(days=1))
+            periods.append((first, last, self.weights_on(first)))
+            first = next_start
+            segment += 1
+        periods.append((first, end_date, self.weights_on(first)))
+        return periods
+    
+    def is_stale(self, date: str, weight_version: int) -> bool:
+        """weight_version の重みで計算した指定日のサマリが、その後の重み変更で古くなっているか"""
+        segment = self._segment(date)
+        return segment >= 0 and self._segment_versions[segment] > weight_version
+
+
+_category_registry: Optional[CategoryRegistry] = None
+
+
+def get_category_registry(cursor: Optional[sqlite3.Cursor] = None) -> CategoryRegistry:
+    """
+    プロセス共通のカテゴリ参照表を取得（初回またはDB切替時に読み込み）
+    
+    Args:
+        cursor: 読み込みに使うカーソル（トランザクション中の呼び出し元はプール枯渇を避けるため渡す）
+        
+    Returns:
+        CategoryRegistry
+    """
+    registry = _category_registry
+    if registry is not None and registry.db_path == DB_PATH and registry.pid == os.getpid():
+        return registry
+    return _load_category_registry(cursor)
+
+
+def _load_category_registry(cursor: Optional[sqlite3.Cursor] = None) -> CategoryRegistry:
+    """categories テーブルから参照表を読み込み直す"""
+    global _category_registry
+    if cursor is None:
+        with get_db_connection() as conn:
+            return _load_category_registry(conn.cursor())
+    
+    cursor.execute("SELECT id, code, weight FROM categories")
+    rows = [(row['id'], row['code'], row['weight']) for row in cursor.fetchall()]
+    cursor.execute("SELECT category_id, effective_from, weight, version FROM category_weights")
+    weight_rows = [(row['category_id'], row['effective_from'], row['weight'], row['version'])
+                   for row in cursor.fetchall()]
+    registry = CategoryRegistry(DB_PATH, rows, weight_rows, _fetch_categories_version(cursor))
+    _category_registry = registry
+    return registry
+
+
+def _current_category_registry(cursor: sqlite3.Cursor) -> CategoryRegistry:
+    """
+    カテゴリのバージョンを確かめてから参照表を取得（他プロセスでの重み変更を反映する）
+    重みでスコアを計算・保存する処理はこちらを使う
+    """
+    registry = get_category_registry(cursor)
+    if registry.categories_version != _fetch_categories_version(cursor):
+        registry = _load_category_registry(cursor)
+    return registry
+
+
+def _fetch_categories_version(cursor: sqlite3.Cursor) -> int:
+    """カテゴリのバージョンを読み出す（一度も更新されていなければ 0）"""
+    cursor.execute("SELECT version FROM data_versions WHERE scope = ?", (CATEGORIES_VERSION_SCOPE,))
+    row = cursor.fetchone()
+    return row['version'] if row else 0
+
+
+def invalidate_category_registry():
+    """カテゴリ参照表を破棄（カテゴリ更新後に呼ぶ）"""
+    global _category_registry
+    _category_registry = None
+
+
+def category_exists(code: str) -> bool:
+    """カテゴリコードが登録済みか（参照表に無ければ一度だけ読み直す）"""
+    if code in get_category_registry().ids:
+        return True
+    return code in _load_category_registry().ids
+
+
+def _resolve_category_id(cursor: sqlite3.Cursor, code: Optional[str]) -> Optional[int]:
+    """
+    書き込み用にカテゴリコードをIDに変換
+    
+    Args:
+        cursor: 書き込み中の接続のカーソル
+        code: カテゴリコード（None は未入力）
+        
+    Returns:
+        カテゴリID（未入力は None）
+        
+    Raises:
+        ValueError: 未登録のカテゴリコード
+    """
+    if code is None:
+        return None
+    
+    category_id = get_category_registry(cursor).ids.get(code)
+    if category_id is None:
+        # 他プロセスで追加された可能性があるため一度だけ読み直す
+        category_id = _load_category_registry(cursor).ids.get(code)
+    if category_id is None:
+        raise ValueError(f"未登録のカテゴリです: {code}")
+    return category_id
+
+
+# === カテゴリ操作 ===
+
+def get_all_categories() -> List[DBCategory]:
+    """全カテゴリを順序付きで取得"""
+    with get_db_connection() as conn:
+        return _fetch_all_categories(conn.cursor())
+
+
+def _fetch_all_categories(cursor: sqlite3.Cursor) -> List[DBCategory]:
+    """指定カーソルで全カテゴリを順序付きで取得"""
+    cursor.execute("""
+        SELECT code, label, weight, color, order_index
+        FROM categories
+        ORDER BY order_index
+    """)
+    
+    categories = []
+    for row in cursor.fetchall():
+        categories.append(DBCategory(
+            code=row['code'],
+            label=row['label'],
+            weight=row['weight'],
+            color=row['color'],
+            order_index=row['order_index']
+        ))
+    
+    return categories
+
+
+def get_category_by_code(code: str) -> Optional[DBCategory]:
+    """コードでカテゴリを取得"""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            SELECT code, label, weight, color, order_index
+            FROM categories
+            WHERE code = ?
+        """, (code,))
+        
+        row = cursor.fetchone()
+        if row:
+            return DBCategory(
+                code=row['code'],
+                label=row['label'],
+                weight=row['weight'],
+                color=row['color'],
+                order_index=row['order_index']
+            )
+        return None
+
+
+def get_categories_weight_map(date: Optional[str] = None) -> Dict[str, int]:
+    """
+    カテゴリコード -> 重みのマッピングを取得（カテゴリ参照表から返す）
+    
+    Args:
+        date: 対象日 (YYYY-MM-DD, 指定時はその日に適用される重み、省略時は最新の重み)
+    """
+    registry = get_category_registry()
+    return dict(registry.weight_map_on(date) if date is not None else registry.weight_map)
+
+
+# === サマリ用データ取得 ===
+
+def get_filled_blocks_for_date(date: str) -> List[Tuple[int, str, Optional[int]]]:
+    """
+    指定日の入力済みブロック情報を取得
+    
+    Args:
+        date: 対象日 (YYYY-MM-DD)
+        
+    Returns:
+        (slot_index, category, focus) のタプルリスト
+    """
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        codes = get_category_registry(cursor).codes
+        return [(slot_index, codes[category_id], focus)
+                for slot_index, category_id, focus in _fetch_filled_blocks(cursor, date)]
+
+
+def get_day_context_data(date: str) -> Tuple[List[Tuple[int, str, Optional[int]]], List[DBCategory]]:
+    """
+    集計・提案用に1日分の入力済みブロックと全カテゴリを1回の接続でまとめて取得
+    
+    Args:
+        date: 対象日 (YYYY-MM-DD)
+        
+    Returns:
+        ((slot_index, category, focus) のタプルリスト, 全カテゴリ)
+    """
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        codes = get_category_registry(cursor).codes
+        filled_blocks = [(slot_index, codes[category_id], focus)
+                         for slot_index, category_id, focus in _fetch_filled_blocks(cursor, date)]
+        return filled_blocks, _fetch_all_categories(cursor)
+
+
+def _fetch_filled_blocks(cursor: sqlite3.Cursor, date: str) -> List[Tuple[int, int, Optional[int]]]:
+    """指定カーソルで1日分の入力済みブロックをカテゴリIDのまま取得（保存形式に応じて読み分け）"""
+    if _use_day_vectors():
+        cursor.execute("SELECT categories, focus FROM day_vectors WHERE date = ?", (date,))
+        row = cursor.fetchone()
+        if row is None:
+            return []
+        return decode_filled_blocks(row['categories'], row['focus'])
+    
+    cursor.execute("""
+        SELECT slot_index, category_id, focus
+        FROM blocks
+        WHERE date = ? AND category_id IS NOT NULL
+        ORDER BY slot_index
+    """, (date,))
+    
+    return [(row['slot_index'], row['category_id'], row['focus']) 
+            for row in cursor.fetchall()]
+
+
+def get_date_range_block_rows(start_date: str, end_date: str) -> List[Tuple[str, int, str, Optional[int]]]:
+    """
+    日付範囲の入力済みブロックをフラットな行として取得（一括スコア計算用）
+    
+    Args:
+        start_date: 開始日 (YYYY-MM-DD)
+        end_date: 終了日 (YYYY-MM-DD)
+        
+    Returns:
+        (date, slot_index, category, focus) のタプルリスト（日付・スロット順）
+    """
+    with get_db_connection() as conn:
+        return _fetch_block_rows(conn, start_date, end_date)
+
+
+def _fetch_block_rows(conn: sqlite3.Connection, start_date: str, end_date: str,
+                      category_ids: bool = False) -> List[Tuple[str, int, Any, Optional[int]]]:
+    """
+    指定接続で日付範囲の入力済みブロックをタプルのまま取得（保存形式に応じて読み分け）
+    category_ids=True ならカテゴリをコードに変換せずIDのまま返す
+    """
+    if _use_day_vectors():
+        category_codes = None if category_ids else get_category_registry(conn.cursor()).codes
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        cursor.execute("""
+            SELECT date, categories, focus
+            FROM day_vectors
+            WHERE date BETWEEN ? AND ?
+            ORDER BY date
+        """, (start_date, end_date))
+        
+        rows = []
+        for date, categories, focus in cursor:
+            rows.extend((date, slot_index, category, slot_focus)
+                        for slot_index, category, slot_focus
+                        in decode_filled_blocks(categories, focus, category_codes))
+        return rows
+    
+    cursor = conn.cursor()
+    cursor.row_factory = None  # Row オブジェクトを作らずタプルで受け取る
+    if category_ids:
+        cursor.execute("""
+            SELECT date, slot_index, category_id, focus
+            FROM blocks
+            WHERE date BETWEEN ? AND ? AND category_id IS NOT NULL
+            ORDER BY date, slot_index
+        """, (start_date, end_date))
+    else:
+        cursor.execute("""
+            SELECT b.date, b.slot_index, c.code, b.focus
+            FROM blocks b
+            JOIN categories c ON c.id = b.category_id
+            WHERE b.date BETWEEN ? AND ?
+            ORDER BY b.date, b.slot_index
+        """, (start_date, end_date))
+    return cursor.fetchall()
+
+
+def get_date_range_summary_data(start_date: str, end_date: str) -> Dict[str, List[Tuple[int, str, Optional[int]]]]:
+    """
+    日付範囲の入力済みブロック情報を取得
+    
+    Args:
+        start_date: 開始日 (YYYY-MM-DD)
+        end_date: 終了日 (YYYY-MM-DD)
+        
+    Returns:
+        日付 -> [(slot_index, category, focus)] のマッピング
+    """
+    with get_db_connection() as conn:
+        result = {}
+        for date, slot_index, category, focus in _fetch_block_rows(conn, start_date, end_date):
+            if date not in result:
+                result[date] = []
+            result[date].append((slot_index, category, focus))
+        
+        return result
+
+
+# === 日次サマリ（マテリアライズ） ===
+
+def _refresh_daily_summaries(cursor: sqlite3.Cursor, dates: List[str]):
+    """
+    指定日の日次サマリを保存済みブロックから再計算して保存
+    呼び出し元のトランザクション内で実行される（コミットしない）
+    集計はカテゴリIDのまま行い、重みは参照表からその日に適用されるものを引く
+    
+    Args:
+        cursor: 書き込み中の接続のカーソル
+        dates: 対象日のリスト
+    """
+    # 循環インポートを避けるため遅延インポート
+    from .summarizer import calculate_summary_counters, calculate_streak_runs
+    
+    if not dates:
+        return
+    
+    registry = _current_category_registry(cursor)
+    
+    for date in dates:
+        weight_map = registry.weights_on(date)
+        filled_blocks = _fetch_filled_blocks(cursor, date)
+        
+        if not filled_blocks:
+            # 未入力日は行を持たない
+            _delete_daily_summary(cursor, date)
+            continue
+        
+        _save_summary_counters(cursor, date,
+                               calculate_summary_counters(filled_blocks, weight_map),
+                               calculate_streak_runs(filled_blocks, weight_map),
+                               _count_category_blocks(filled_blocks))
+
+
+def _count_category_blocks(filled_blocks: List[Tuple[int, int, Optional[int]]]) -> Dict[int, int]:
+    """入力済みブロックのカテゴリID別ブロック数"""
+    counts: Dict[int, int] = {}
+    for _, category_id, _ in filled_blocks:
+        counts[category_id] = counts.get(category_id, 0) + 1
+    return counts
+
+
+def _decode_category_blocks(value: Optional[str]) -> Optional[Dict[int, int]]:
+    """保存形式(JSON)のカテゴリID別ブロック数を復元"""
+    if value is None:
+        return None
+    return {int(category_id): count for category_id, count in json.loads(value).items()}
+
+
+def _decode_streak_runs(value: Optional[str]) -> Optional[Dict[int, int]]:
+    """保存形式(JSON)のストリーク値ヒストグラムを復元"""
+    if value is None:
+        return None
+    return {int(streak): count for streak, count in json.loads(value).items()}
+
+
+def _patch_daily_summary(cursor: sqlite3.Cursor, date: str, slot_index: int,
+                         old_block: Optional[Tuple[int, int, Optional[int]]],
+                         new_block: Optional[Tuple[int, int, Optional[int]]],
+                         day_blocks: Optional[List[Tuple[int, int, Optional[int]]]] = None):
+    """
+    1スロットの変更を日次サマリに増分反映（コミットしない）
+    前後の入力済みブロックは影響範囲に達するまでだけ読み出す
+    
+    Args:
+        cursor: 書き込み中の接続のカーソル
+        date: 対象日 (YYYY-MM-DD)
+        slot_index: 変更スロット
+        old_block: 変更前の (slot_index, category_id, focus)（未入力なら None）
+        new_block: 変更後の (slot_index, category_id, focus)（未入力なら None）
+        day_blocks: 読み込み済みの同日の入力済みブロック（日次ベクトル形式用、None なら blocks から読む）
+    """
+    from .summarizer import patch_summary_counters, take_left_context, take_right_context
+    
+    if old_block == new_block:
+        return
+    
+    cursor.execute(f"""
+        SELECT {", ".join(DAILY_SUMMARY_COLUMNS)}, streak_runs, category_blocks, weight_version
+        FROM daily_summaries
+        WHERE date = ?
+    """, (date,))
+    row = cursor.fetchone()
+    registry = _current_category_registry(cursor)
+    
+    if (row is None or row['streak_runs'] is None or row['category_blocks'] is None
+            or registry.is_stale(date, row['weight_version'])):
+        # 初回書き込みの日・旧形式の行・重みの変更前に計算した行はフル再計算
+        _refresh_daily_summaries(cursor, [date])
+        return
+    
+    counters = {col: row[col] for col in DAILY_SUMMARY_COLUMNS}
+    streak_runs = _decode_streak_runs(row['streak_runs'])
+    category_blocks = _decode_category_blocks(row['category_blocks'])
+    weight_map = registry.weights_on(date)
+    
+    # 前後の入力済みブロックを近い順に遅延読み出し
+    if day_blocks is not None:
+        left_blocks = (block for block in reversed(day_blocks) if block[0] < slot_index)
+        right_blocks = (block for block in day_blocks if block[0] > slot_index)
+    else:
+        conn = cursor.connection
+        left_blocks = ((r['slot_index'], r['category_id'], r['focus']) for r in conn.execute("""
+            SELECT slot_index, category_id, focus FROM blocks
+            WHERE date = ? AND slot_index < ? AND category_id IS NOT NULL
+            ORDER BY slot_index DESC
+        """, (date, slot_index)))
+        right_blocks = ((r['slot_index'], r['category_id'], r['focus']) for r in conn.execute("""
+            SELECT slot_index, category_id, focus FROM blocks
+            WHERE date = ? AND slot_index > ? AND category_id IS NOT NULL
+            ORDER BY slot_index
+        """, (date, slot_index)))
+    
+    before = take_left_context(left_blocks, weight_map)
+    after = take_right_context(right_blocks, weight_map)
+    
+    try:
+        counters, streak_runs = patch_summary_counters(
+            counters, streak_runs, before, old_block, new_block, after, weight_map
+        )
+    except ValueError:
+        # 保存済みの状態が矛盾している場合はフル再計算で修復
+        _refresh_daily_summaries(cursor, [date])
+        return
+    
+    if counters['total_filled'] == 0:
+        _delete_daily_summary(cursor, date)
+        return
+    
+    for block, delta in ((old_block, -1), (new_block, 1)):
+        if block is not None:
+            category_blocks[block[1]] = category_blocks.get(block[1], 0) + delta
+            if category_blocks[block[1]] == 0:
+                del category_blocks[block[1]]
+    _save_summary_counters(cursor, date, counters, streak_runs, category_blocks)
+
+
+def _save_summary_counters(cursor: sqlite3.Cursor, date: str, counters: Dict[str, int],
+                           streak_runs: Dict[int, int], category_blocks: Dict[int, int]) -> bool:
+    """
+    集計カウンタ・ストリーク値ヒストグラム・カテゴリ別ブロック数を daily_summaries に保存（コミットしない）
+    計算に使った重みの通し番号として、参照表の weight_version を記録する
+    
+    Returns:
+        集計カウンタ・カテゴリ別ブロック数が保存前から変わったか
+    """
+    old_day = _fetch_rollup_day(cursor, date)
+    
+    columns = ", ".join(DAILY_SUMMARY_COLUMNS)
+    placeholders = ", ".join("?" for _ in DAILY_SUMMARY_COLUMNS)
+    cursor.execute(f"""
+        INSERT OR REPLACE INTO daily_summaries
+            (date, {columns}, streak_runs, category_blocks, weight_version, updated_at)
+        VALUES (?, {placeholders}, ?, ?, ?, ?)
+    """, (date, *(counters[col] for col in DAILY_SUMMARY_COLUMNS),
+          json.dumps(streak_runs, sort_keys=True), json.dumps(category_blocks, sort_keys=True),
+          get_category_registry(cursor).weight_version, datetime.now()))
+    _invalidate_summary_prefix(cursor, date)
+    
+    new_day = {col: counters[col] for col in DAILY_SUMMARY_COLUMNS}
+    new_day['category_blocks'] = category_blocks
+    _apply_rollup_delta(cursor, date, old_day, new_day)
+    return old_day != new_day
+
+
+def _delete_daily_summary(cursor: sqlite3.Cursor, date: str) -> bool:
+    """未入力になった日の日次サマリを削除（コミットしない、削除した行があれば True）"""
+    old_day = _fetch_rollup_day(cursor, date)
+    cursor.execute("DELETE FROM daily_summaries WHERE date = ?", (date,))
+    _invalidate_summary_prefix(cursor, date)
+    _apply_rollup_delta(cursor, date, old_day, None)
+    return old_day is not None
+
+
+def _rewrite_daily_summaries(cursor: sqlite3.Cursor, dates: List[str],
+                             scored: Dict[str, Dict[str, Any]]) -> List[str]:
+    """
+    再計算した集計カウンタで日次サマリを書き換え、値が変わった日のバージョンを進める（コミットしない）
+    
+    Args:
+        cursor: 書き込み中の接続のカーソル
+        dates: 対象日（scored に含まれない日はサマリを削除する）
+        scored: 日付 -> 集計カウンタ（streak_runs・category_blocks を含む）
+        
+    Returns:
+        値が変わった日付のリスト（コミット後に _notify_date_writes へ渡す）
+    """
+    changed = []
+    for date in dates:
+        if date in scored:
+            if _save_summary_counters(cursor, date, scored[date], scored[date]['streak_runs'],
+                                      scored[date]['category_blocks']):
+                changed.append(date)
+        elif _delete_daily_summary(cursor, date):
+            changed.append(date)
+    
+    # ETag・結果キャッシュのキーが変わるように、値が変わった日だけバージョンを進める
+    _bump_date_versions(cursor, changed)
+    return changed
+
+
+def get_summary_counters(date: str) -> Optional[Dict[str, int]]:
+    """
+    指定日のマテリアライズ済み集計カウンタを取得
+    
+    Args:
+        date: 対象日 (YYYY-MM-DD)
+        
+    Returns:
+        カラム名 -> 値 の辞書（未入力日は None）
+    """
+    refresh_stale_summaries(date, date)
+    
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        
+        cursor.execute(f"""
+            SELECT {", ".join(DAILY_SUMMARY_COLUMNS)}
+            FROM daily_summaries
+            WHERE date = ?
+        """, (date,))
+        
+        row = cursor.fetchone()
+        return dict(row) if row else None
+
+
+def get_summary_counters_range(start_date: str, end_date: str,
+                               include_streak_runs: bool = False) -> Dict[str, Dict[str, Any]]:
+    """
+    日付範囲のマテリアライズ済み集計カウンタを取得
+    
+    Args:
+        start_date: 開始日 (YYYY-MM-DD)
+        end_date: 終了日 (YYYY-MM-DD)
+        include_streak_runs: ストリーク値ヒストグラムも含めるか
+        
+    Returns:
+        日付 -> 集計カウンタ のマッピング（日付順）
+    """
+    refresh_stale_summaries(start_date, end_date)
+    
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        
+        cursor.execute(f"""
+            SELECT date, {", ".join(DAILY_SUMMARY_COLUMNS)}, streak_runs
+            FROM daily_summaries
+            WHERE date BETWEEN ? AND ?
+            ORDER BY date
+        """, (start_date, end_date))
+        
+        result = {}
+        for row in cursor.fetchall():
+            counters = dict(row)
+            streak_runs = counters.pop('streak_runs')
+            if include_streak_runs:
+                counters['streak_runs'] = _decode_streak_runs(streak_runs)
+            result[counters.pop('date')] = counters
+        return result
+
+
+def get_summary_dates(start_date: Optional[str] = None, end_date: Optional[str] = None) -> List[str]:
+    """
+    入力済みブロックまたは日次サマリが存在する日付を取得
+    
+    Args:
+        start_date: 開始日 (省略時は制限なし)
+        end_date: 終了日 (省略時は制限なし)
+        
+    Returns:
+        日付文字列のリスト（昇順）
+    """
+    start_date = start_date or "0000-00-00"
+    end_date = end_date or "9999-99-99"
+    
+    if _use_day_vectors():
+        # 全スロット未入力（ゼロ埋め）の日は除く
+        block_dates_sql = f"""
+            SELECT date FROM day_vectors
+            WHERE date BETWEEN ? AND ? AND categories != zeroblob({SLOTS_PER_DAY})
+        """
+    else:
+        block_dates_sql = """
+            SELECT date FROM blocks
+            WHERE date BETWEEN ? AND ? AND category_id IS NOT NULL
+        """
+    
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        
+        cursor.execute(f"""
+            {block_dates_sql}
+            UNION
+            SELECT date FROM daily_summaries
+            WHERE date BETWEEN ? AND ?
+            ORDER BY date
+        """, (start_date, end_date, start_date, end_date))
+        
+        return [row['date'] for row in cursor.fetchall()]
+
+
+def rebuild_daily_summaries(start_date: Optional[str] = None, end_date: Optional[str] = None,
+                            batch_size: int = 200, engine: str = 'auto') -> int:
+    """
+    日次サマリを保存済みブロックから再構築（バックフィル）
+    
+    Args:
+        start_date: 開始日 (省略時は全期間)
+        end_date: 終了日 (省略時は全期間)
+        batch_size: 1トランザクションあたりの日数
+        engine: スコアリングエンジン ('auto' / 'python' / 'numpy' / 'sql')
+        
+    Returns:
+        再構築した日数
+    """
+    dates = get_summary_dates(start_date, end_date)
+    
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        
+        for i in range(0, len(dates), batch_size):
+            batch = dates[i:i + batch_size]
+            
+            # 読み出しから書き込みまで他の書き込みを締め出す
+            cursor.execute("BEGIN IMMEDIATE")
+            scored = _score_date_range(conn, batch[0], batch[-1], engine)
+            changed = _rewrite_daily_summaries(cursor, batch, scored)
+            conn.commit()
+            _notify_date_writes(changed)
+    
+    return len(dates)
+
+
+def score_date_range(start_date: str, end_date: str, engine: str = 'auto') -> Dict[str, Dict[str, Any]]:
+    """
+    期間内の日次集計カウンタを保存済みブロックから計算（マテリアライズを使わない）
+    
+    Args:
+        start_date: 開始日 (YYYY-MM-DD)
+        end_date: 終了日 (YYYY-MM-DD)
+        engine: 'auto' / 'python' / 'numpy' / 'sql'（sql はスロット単位の行を読み出さずSQLite内で計算）
+        
+    Returns:
+        日付 -> 集計カウンタ（streak_runs・category_blocks を含む）のマッピング（入力済みの日のみ）
+    """
+    with get_db_connection() as conn:
+        return _score_date_range(conn, start_date, end_date, engine)
+
+
+def _score_date_range(conn: sqlite3.Connection, start_date: str, end_date: str,
+                      engine: str) -> Dict[str, Dict[str, Any]]:
+    """
+    指定接続で期間内の日次集計カウンタを計算（カテゴリはIDで集計する）
+    重みの変更日をまたぐ期間は、同じ重みが適用される区間ごとに計算する
+    """
+    from .summarizer import score_block_rows
+    
+    scored = {}
+    for first, last, weight_map in _current_category_registry(conn.cursor()).weight_periods(start_date, end_date):
+        if engine == 'sql':
+            scored.update(sql_scoring.score_date_range(conn, first, last, _use_day_vectors(), weight_map))
+            continue
+        
+        rows = _fetch_block_rows(conn, first, last, category_ids=True)
+        period_scored = score_block_rows(rows, weight_map, engine)
+        for date, _, category_id, _ in rows:
+            counts = period_scored[date].setdefault('category_blocks', {})
+            counts[category_id] = counts.get(category_id, 0) + 1
+        scored.update(period_scored)
+    return scored
+
+
+# === 日次サマリの累積和（移動窓集計用） ===
+
+def _invalidate_summary_prefix(cursor: sqlite3.Cursor, date: str):
+    """日次サマリが変わった日以降の累積和を削除（次回の読み出し時に延長し直す、コミットしない）"""
+    cursor.execute("DELETE FROM summary_prefix WHERE date >= ?", (date,))
+
+
+def _extend_summary_prefix(cursor: sqlite3.Cursor, end_date: str) -> int:
+    """
+    最後の累積和の行から end_date までを日次サマリで延長（呼び出し元のトランザクション内、コミットしない）
+    
+    Returns:
+        追加した行数
+    """
+    # 循環インポートを避けるため遅延インポート
+    from .summarizer import summary_from_counters
+    
+    cursor.execute(f"""
+        SELECT date, days, avg_focus_days, {", ".join(SUMMARY_PREFIX_METRICS)}
+        FROM summary_prefix
+        ORDER BY date DESC
+        LIMIT 1
+    """)
+    last = cursor.fetchone()
+    if last is not None:
+        last_date = last['date']
+        totals = {col: last[col] for col in ('days', 'avg_focus_days') + SUMMARY_PREFIX_METRICS}
+    else:
+        last_date = "0000-00-00"
+        totals = dict.fromkeys(('days', 'avg_focus_days') + SUMMARY_PREFIX_METRICS, 0)
+    
+    cursor.execute(f"""
+        SELECT date, {", ".join(DAILY_SUMMARY_COLUMNS)}
+        FROM daily_summaries
+        WHERE date > ? AND date <= ?
+        ORDER BY date
+    """, (last_date, end_date))
+    
+    rows = []
+    for row in cursor.fetchall():
+        counters = dict(row)
+        summary = summary_from_counters(counters.pop('date'), counters)
+        
+        totals['days'] += 1
+        if summary.avg_focus_productive is not None:
+            totals['avg_focus_days'] += 1
+        for metric in SUMMARY_PREFIX_METRICS:
+            totals[metric] += getattr(summary, metric) or 0
+        rows.append((summary.date, *totals.values()))
+    
+    if rows:
+        columns = ('days', 'avg_focus_days') + SUMMARY_PREFIX_METRICS
+        cursor.executemany(f"""
+            INSERT OR REPLACE INTO summary_prefix (date, {", ".join(columns)})
+            VALUES (?, {", ".join("?" for _ in columns)})
+        """, rows)
+    return len(rows)
+
+
+def get_summary_prefix_range(start_date: str, end_date: str) -> Tuple[Optional[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    日付範囲の累積和を取得（未作成・削除済みの行は日次サマリから延長してから読む）
+    
+    Args:
+        start_date: 開始日 (YYYY-MM-DD)
+        end_date: 終了日 (YYYY-MM-DD)
         
+    Returns:
+        (開始日より前の最後の行（なければ None）, 範囲内の行のリスト（日付順）)
+        各行は {date, days, avg_focus_days, 各指標の累積和}（日次サマリのある日のみ行を持つ）
+    """
+    # 累積和は終了日までの全ての日次サマリに依存する
+    refresh_stale_summaries(None, end_date)
+    
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        
+        cursor.execute("SELECT MAX(date) FROM summary_prefix")
+        last_date = cursor.fetchone()[0] or "0000-00-00"
+        cursor.execute("SELECT 1 FROM daily_summaries WHERE date > ? AND date <= ? LIMIT 1",
+                       (last_date, end_date))
+        if cursor.fetchone() is not None:
+            # 延長中に日次サマリが書き換わらないよう書き込みを締め出す
+            cursor.execute("BEGIN IMMEDIATE")
+            _extend_summary_prefix(cursor, end_date)
+            conn.commit()
+        
+        columns = f"date, days, avg_focus_days, {', '.join(SUMMARY_PREFIX_METRICS)}"
+        cursor.execute(f"""
+            SELECT {columns} FROM summary_prefix
+            WHERE date < ?
+            ORDER BY date DESC
+            LIMIT 1
+        """, (start_date,))
+        base = cursor.fetchone()
+        
+        cursor.execute(f"""
+            SELECT {columns} FROM summary_prefix
+            WHERE date BETWEEN ? AND ?
+            ORDER BY date
+        """, (start_date, end_date))
+        
+        return (dict(base) if base else None), [dict(row) for row in cursor.fetchall()]
+
+
+# === 週・月・年集計（ロールアップ） ===
+
+# 期間ごとに合計する日次サマリのカウンタ（deep_streak_max は最大値）
+_ROLLUP_SUM_COLUMNS = tuple(col for col in DAILY_SUMMARY_COLUMNS if col != 'deep_streak_max')
+
+
+def _fetch_rollup_day(cursor: sqlite3.Cursor, date: str) -> Optional[Dict[str, Any]]:
+    """集計に反映済みの1日分の日次サマリ（行がなければ None）"""
+    cursor.execute(f"""
+        SELECT {", ".join(DAILY_SUMMARY_COLUMNS)}, category_blocks
+        FROM daily_summaries
+        WHERE date = ?
+    """, (date,))
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    
+    day = dict(row)
+    day['category_blocks'] = _decode_category_blocks(day['category_blocks']) or {}
+    return day
+
+
+def _rollup_focus_score(day: Optional[Dict[str, Any]]) -> float:
+    """1日分のフォーカススコア（行がなければ 0）"""
+    from .summarizer import summary_from_counters
+    
+    return summary_from_counters('', day).focus_score if day is not None else 0.0
+
+
+def _apply_rollup_delta(cursor: sqlite3.Cursor, date: str,
+                        old_day: Optional[Dict[str, Any]], new_day: Optional[Dict[str, Any]]):
+    """
+    1日分の日次サマリの変更を、その日を含む週・月・年の集計に差分で反映（コミットしない）
+    
+    Args:
+        cursor: 書き込み中の接続のカーソル（daily_summaries は変更後の状態）
+        date: 変更日 (YYYY-MM-DD)
+        old_day: 変更前の日次サマリ（_fetch_rollup_day の形式、なければ None）
+        new_day: 変更後の日次サマリ（同上、削除なら None）
+    """
+    if old_day is None and new_day is None:
+        return
+    
+    focus_score_delta = _rollup_focus_score(new_day) - _rollup_focus_score(old_day)
+    now = datetime.now()
+    
+    for granularity in ROLLUP_GRANULARITIES:
+        period, start_date, end_date = get_period_bounds(granularity, date)
         cursor.execute("""
-            SELECT code, label, weight, color, order_index
-            FROM categories
-            ORDER BY order_index
-        """)
+            SELECT * FROM summary_rollups WHERE granularity = ? AND period = ?
+        """, (granularity, period))
+        row = cursor.fetchone()
+        
+        if row is not None:
+            rollup = dict(row)
+            rollup['category_blocks'] = _decode_category_blocks(rollup['category_blocks'])
+        else:
+            rollup = dict.fromkeys(('days', 'deep_streak_max', 'focus_score_sum') + _ROLLUP_SUM_COLUMNS, 0)
+            rollup['category_blocks'] = {}
+        
+        rollup['days'] += (new_day is not None) - (old_day is not None)
+        if rollup['days'] <= 0:
+            cursor.execute("DELETE FROM summary_rollups WHERE granularity = ? AND period = ?",
+                           (granularity, period))
+            continue
+        
+        for col in _ROLLUP_SUM_COLUMNS:
+            rollup[col] += (new_day[col] if new_day else 0) - (old_day[col] if old_day else 0)
+        rollup['focus_score_sum'] += focus_score_delta
+        
+        for day, sign in ((old_day, -1), (new_day, 1)):
+            for category_id, blocks in (day['category_blocks'] if day else {}).items():
+                count = rollup['category_blocks'].get(category_id, 0) + sign * blocks
+                if count:
+                    rollup['category_blocks'][category_id] = count
+                else:
+                    rollup['category_blocks'].pop(category_id, None)
+        
+        # 最大連続ブロック数は増えた分だけ反映し、最大の日が減った場合のみ期間内を引き直す
+        if new_day is not None and new_day['deep_streak_max'] >= rollup['deep_streak_max']:
+            rollup['deep_streak_max'] = new_day['deep_streak_max']
+        elif old_day is not None and old_day['deep_streak_max'] >= rollup['deep_streak_max']:
+            cursor.execute("""
+                SELECT COALESCE(MAX(deep_streak_max), 0) FROM daily_summaries
+                WHERE date BETWEEN ? AND ?
+            """, (start_date, end_date))
+            rollup['deep_streak_max'] = cursor.fetchone()[0]
+        
+        _save_rollup(cursor, granularity, period, start_date, end_date, rollup, now)
+
+
+def _save_rollup(cursor: sqlite3.Cursor, granularity: str, period: str, start_date: str, end_date: str,
+                 rollup: Dict[str, Any], now: datetime):
+    """1期間分の集計を保存（コミットしない）"""
+    columns = ('days', 'deep_streak_max', 'focus_score_sum') + _ROLLUP_SUM_COLUMNS
+    cursor.execute(f"""
+        INSERT OR REPLACE INTO summary_rollups
+            (granularity, period, start_date, end_date, {", ".join(columns)}, category_blocks, updated_at)
+        VALUES (?, ?, ?, ?, {", ".join("?" for _ in columns)}, ?, ?)
+    """, (granularity, period, start_date, end_date, *(rollup[col] for col in columns),
+          json.dumps(rollup['category_blocks'], sort_keys=True), now))
+
+
+def rebuild_summary_rollups() -> int:
+    """
+    週・月・年の集計を日次サマリから作り直す（バックフィル・修復用）
+    
+    Returns:
+        作成した期間の数
+    """
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute("DELETE FROM summary_rollups")
         
-        categories = []
+        rollups: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        cursor.execute(f"""
+            SELECT date, {", ".join(DAILY_SUMMARY_COLUMNS)}, category_blocks
+            FROM daily_summaries
+            ORDER BY date
+        """)
         for row in cursor.fetchall():
-            categories.append(DBCategory(
-                code=row['code'],
-                label=row['label'],
-                weight=row['weight'],
-                color=row['color'],
-                order_index=row['order_index']
-            ))
+            day = dict(row)
+            date = day.pop('date')
+            focus_score = _rollup_focus_score(day)
+            category_blocks = _decode_category_blocks(day['category_blocks']) or {}
+            
+            for granularity in ROLLUP_GRANULARITIES:
+                period, start_date, end_date = get_period_bounds(granularity, date)
+                rollup = rollups.get((granularity, period))
+                if rollup is None:
+                    rollup = dict.fromkeys(('days', 'deep_streak_max', 'focus_score_sum') + _ROLLUP_SUM_COLUMNS, 0)
+                    rollup.update(start_date=start_date, end_date=end_date, category_blocks={})
+                    rollups[(granularity, period)] = rollup
+                
+                rollup['days'] += 1
+                for col in _ROLLUP_SUM_COLUMNS:
+                    rollup[col] += day[col]
+                rollup['focus_score_sum'] += focus_score
+                rollup['deep_streak_max'] = max(rollup['deep_streak_max'], day['deep_streak_max'])
+                for category_id, blocks in category_blocks.items():
+                    rollup['category_blocks'][category_id] = rollup['category_blocks'].get(category_id, 0) + blocks
         
-        return categories
+        now = datetime.now()
+        for (granularity, period), rollup in rollups.items():
+            _save_rollup(cursor, granularity, period, rollup['start_date'], rollup['end_date'], rollup, now)
+        
+        conn.commit()
+        return len(rollups)
 
 
-def get_category_by_code(code: str) -> Optional[DBCategory]:
-    """コードでカテゴリを取得"""
+def get_summary_rollups(granularity: str, start_date: str, end_date: str) -> List[Dict[str, Any]]:
+    """
+    期間が日付範囲と重なる週・月・年の集計を取得
+    
+    Args:
+        granularity: 'week' / 'month' / 'year'
+        start_date: 開始日 (YYYY-MM-DD)
+        end_date: 終了日 (YYYY-MM-DD)
+        
+    Returns:
+        集計の辞書のリスト（期間順、category_blocks はカテゴリコード -> ブロック数）
+        入力のない期間は行を持たない
+    """
+    if granularity not in ROLLUP_GRANULARITIES:
+        raise ValueError(f"無効な集計期間: {granularity}")
+    
+    refresh_stale_summaries(get_period_bounds(granularity, start_date)[1],
+                            get_period_bounds(granularity, end_date)[2])
+    
     with get_db_connection() as conn:
         cursor = conn.cursor()
+        codes = get_category_registry(cursor).codes
         
         cursor.execute("""
-            SELECT code, label, weight, color, order_index
-            FROM categories
-            WHERE code = ?
-        """, (code,))
+            SELECT * FROM summary_rollups
+            WHERE granularity = ? AND start_date <= ? AND end_date >= ?
+            ORDER BY start_date
+        """, (granularity, end_date, start_date))
+        
+        rollups = []
+        for row in cursor.fetchall():
+            rollup = dict(row)
+            rollup['category_blocks'] = {codes[category_id]: blocks for category_id, blocks
+                                         in _decode_category_blocks(rollup['category_blocks']).items()}
+            rollups.append(rollup)
+        return rollups
+
+
+# === バージョンカウンタ（ETag用） ===
+
+# ブロック書き込み後に通知するコールバック（プロセス内キャッシュの無効化用）
+_date_write_listeners: List[Callable[[List[str]], None]] = []
+
+
+def _bump_date_versions(cursor: sqlite3.Cursor, dates: List[str]):
+    """指定日のバージョンを1つ進める（ブロック書き込みと同じトランザクション内で呼ぶ、コミットしない）"""
+    cursor.executemany("""
+        INSERT INTO data_versions (scope, version) VALUES (?, 1)
+        ON CONFLICT(scope) DO UPDATE SET version = version + 1
+    """, [(DATE_VERSION_PREFIX + date,) for date in dates])
+
+
+def _bump_categories_version(cursor: sqlite3.Cursor):
+    """カテゴリのバージョンを1つ進める（カテゴリ更新と同じトランザクション内で呼ぶ、コミットしない）"""
+    cursor.execute("""
+        INSERT INTO data_versions (scope, version) VALUES (?, 1)
+        ON CONFLICT(scope) DO UPDATE SET version = version + 1
+    """, (CATEGORIES_VERSION_SCOPE,))
+
+
+def add_date_write_listener(listener: Callable[[List[str]], None]):
+    """ブロック書き込みのコミット後に、書き込んだ日付のリストを受け取るコールバックを登録"""
+    _date_write_listeners.append(listener)
+
+
+def _notify_date_writes(dates: List[str]):
+    """登録済みのコールバックに書き込んだ日付を通知（コミット後に呼ぶ）"""
+    if not dates:
+        return
+    for listener in _date_write_listeners:
+        listener(dates)
+
+
+def get_data_versions(date: Optional[str] = None) -> Dict[str, int]:
+    """
+    ETag用のバージョンを1回の読み出しで取得
+    
+    Args:
+        date: 対象日 (YYYY-MM-DD, 省略時は日付のバージョンを含めない)
+        
+    Returns:
+        {'epoch': DBごとの乱数, 'categories': カテゴリのバージョン, 'date': 指定日のバージョン}
+        （一度も書き込まれていないものは 0）
+    """
+    scopes = [EPOCH_SCOPE, CATEGORIES_VERSION_SCOPE]
+    if date is not None:
+        scopes.append(DATE_VERSION_PREFIX + date)
+    
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT scope, version FROM data_versions
+            WHERE scope IN ({", ".join("?" for _ in scopes)})
+        """, scopes)
+        stored = {row['scope']: row['version'] for row in cursor.fetchall()}
+    
+    versions = {
+        'epoch': stored.get(EPOCH_SCOPE, 0),
+        'categories': stored.get(CATEGORIES_VERSION_SCOPE, 0)
+    }
+    registry = _category_registry
+    if registry is not None and registry.categories_version != versions['categories']:
+        # 他プロセスでカテゴリ・重みが変更された（参照表を次回読み直す）
+        invalidate_category_registry()
+    if date is not None:
+        versions['date'] = stored.get(DATE_VERSION_PREFIX + date, 0)
+    return versions
+
+
+# === LLM応答キャッシュ ===
+
+def get_cached_llm_response(cache_key: str, ttl: float) -> Optional[Dict[str, Any]]:
+    """
+    保存済みのLLM応答を取得（期限切れは削除して None）
+    
+    Args:
+        cache_key: プロンプト・モデル・パラメータの指紋
+        ttl: 応答を有効とみなす最大秒数
         
+    Returns:
+        保存時の応答辞書（未保存・期限切れは None）
+    """
+    now = time.time()
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT response, created_at FROM llm_responses WHERE cache_key = ?", (cache_key,))
         row = cursor.fetchone()
-        if row:
-            return DBCategory(
-                code=row['code'],
-                label=row['label'],
-                weight=row['weight'],
-                color=row['color'],
-                order_index=row['order_index']
+        if row is None:
+            return None
+        
+        if now - row['created_at'] > ttl:
+            cursor.execute("DELETE FROM llm_responses WHERE cache_key = ?", (cache_key,))
+            conn.commit()
+            return None
+        
+        # サイズ上限での破棄順（最終利用の古い順）に使うため利用時刻を更新
+        cursor.execute("UPDATE llm_responses SET last_used_at = ? WHERE cache_key = ?", (now, cache_key))
+        conn.commit()
+        return json.loads(row['response'])
+
+
+def put_cached_llm_response(cache_key: str, model: str, response: Dict[str, Any],
+                            ttl: float, max_entries: int):
+    """
+    LLM応答を保存し、期限切れと上限超過分（最終利用の古い順）を削除
+    
+    Args:
+        cache_key: プロンプト・モデル・パラメータの指紋
+        model: 応答を生成したモデル名
+        response: 保存する応答辞書（JSONに変換できること）
+        ttl: 応答を有効とみなす最大秒数
+        max_entries: 保持する最大件数
+    """
+    now = time.time()
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute("""
+            INSERT OR REPLACE INTO llm_responses (cache_key, model, response, created_at, last_used_at)
+            VALUES (?, ?, ?, ?, ?)
+        """, (cache_key, model, json.dumps(response, ensure_ascii=False), now, now))
+        cursor.execute("DELETE FROM llm_responses WHERE created_at < ?", (now - ttl,))
+        cursor.execute("""
+            DELETE FROM llm_responses WHERE cache_key IN (
+                SELECT cache_key FROM llm_responses
+                ORDER BY last_used_at DESC
+                LIMIT -1 OFFSET ?
             )
-        return None
+        """, (max_entries,))
+        conn.commit()
+
+
+def get_llm_response_cache_size() -> int:
+    """保存済みのLLM応答の件数を取得"""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM llm_responses")
+        return cursor.fetchone()[0]
 
 
-def get_categories_weight_map() -> Dict[str, int]:
-    """カテゴリコード -> 重みのマッピングを取得"""
+# === 夜間事前計算の進捗 ===
+
+def claim_precompute_run(anchor_date: str, dates: List[str], owner: str,
+                         lease_seconds: float, force: bool = False) -> Optional[Dict[str, Any]]:
+    """
+    事前計算の実行権を取得し、未処理の日付を返す（中断された実行は続きから再開）
+    
+    Args:
+        anchor_date: 実行単位の基準日（通常は前日）
+        dates: 新規実行時に処理対象とする日付
+        owner: 実行者の識別子（ホスト名とプロセスID など）
+        lease_seconds: 他の実行者の心拍がこの秒数より新しければ実行中とみなす
+        force: 完了済みの実行もやり直す
+        
+    Returns:
+        {'pending': 未処理の日付, 'resumed': 再開か, 'attempts': 試行回数}
+        （他の実行者が実行中なら None）
+    """
+    now = time.time()
     with get_db_connection() as conn:
         cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute("SELECT status, heartbeat_at, attempts FROM precompute_runs WHERE anchor_date = ?",
+                       (anchor_date,))
+        run = cursor.fetchone()
+        
+        if run is not None and run['status'] == PRECOMPUTE_RUNNING and now - run['heartbeat_at'] < lease_seconds:
+            conn.rollback()
+            return None
         
-        cursor.execute("SELECT code, weight FROM categories")
-        return {row['code']: row['weight'] for row in cursor.fetchall()}
+        if run is None or force:
+            cursor.execute("DELETE FROM precompute_items WHERE anchor_date = ?", (anchor_date,))
+            cursor.executemany("""
+                INSERT INTO precompute_items (anchor_date, date, status) VALUES (?, ?, ?)
+            """, [(anchor_date, date, PRECOMPUTE_PENDING) for date in dates])
+            cursor.execute("""
+                INSERT OR REPLACE INTO precompute_runs
+                    (anchor_date, status, owner, started_at, heartbeat_at, finished_at, attempts)
+                VALUES (?, ?, ?, ?, ?, NULL, 1)
+            """, (anchor_date, PRECOMPUTE_RUNNING, owner, now, now))
+            conn.commit()
+            return {'pending': list(dates), 'resumed': False, 'attempts': 1}
+        
+        # 既存の実行: 完了していない日付だけを続きから処理する
+        cursor.execute("""
+            SELECT date FROM precompute_items
+            WHERE anchor_date = ? AND status != ?
+            ORDER BY date
+        """, (anchor_date, PRECOMPUTE_DONE))
+        pending = [row['date'] for row in cursor.fetchall()]
+        attempts = run['attempts'] + (1 if pending else 0)
+        cursor.execute("""
+            UPDATE precompute_runs
+            SET status = ?, owner = ?, heartbeat_at = ?, finished_at = ?, attempts = ?
+            WHERE anchor_date = ?
+        """, (PRECOMPUTE_RUNNING if pending else PRECOMPUTE_DONE, owner, now,
+              None if pending else now, attempts, anchor_date))
+        conn.commit()
+        return {'pending': pending, 'resumed': True, 'attempts': attempts}
 
 
-# === サマリ用データ取得 ===
+def record_precompute_item(anchor_date: str, date: str, status: str, error: Optional[str] = None):
+    """1日分の事前計算結果を記録し、実行の心拍を更新"""
+    now = time.time()
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute("""
+            UPDATE precompute_items SET status = ?, error = ?, updated_at = ?
+            WHERE anchor_date = ? AND date = ?
+        """, (status, error, now, anchor_date, date))
+        cursor.execute("UPDATE precompute_runs SET heartbeat_at = ? WHERE anchor_date = ?", (now, anchor_date))
+        conn.commit()
 
-def get_filled_blocks_for_date(date: str) -> List[Tuple[int, str, Optional[int]]]:
+
+def finish_precompute_run(anchor_date: str, status: str):
+    """事前計算の実行を終了状態にする"""
+    now = time.time()
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute("""
+            UPDATE precompute_runs SET status = ?, heartbeat_at = ?, finished_at = ?
+            WHERE anchor_date = ?
+        """, (status, now, now, anchor_date))
+        conn.commit()
+
+
+def get_precompute_runs(limit: int = 5) -> List[Dict[str, Any]]:
     """
-    指定日の入力済みブロック情報を取得
+    最近の事前計算の実行と日ごとの進捗件数を取得
+    
+    Returns:
+        [{anchor_date, status, owner, started_at, heartbeat_at, finished_at, attempts, items: {状態: 件数}}]
+        （基準日の新しい順）
+    """
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT anchor_date, status, owner, started_at, heartbeat_at, finished_at, attempts
+            FROM precompute_runs
+            ORDER BY anchor_date DESC
+            LIMIT ?
+        """, (limit,))
+        runs = [dict(row) for row in cursor.fetchall()]
+        
+        for run in runs:
+            cursor.execute("""
+                SELECT status, COUNT(*) AS count FROM precompute_items
+                WHERE anchor_date = ?
+                GROUP BY status
+            """, (run['anchor_date'],))
+            run['items'] = {row['status']: row['count'] for row in cursor.fetchall()}
+        
+        return runs
+
+
+# === カテゴリの重みの履歴 ===
+
+def set_category_weight(code: str, weight: int, effective_from: Optional[str] = None) -> int:
+    """
+    カテゴリの重みを適用開始日から変更（日次サマリは再計算しない）
+    適用開始日以降のサマリは古くなった印がつき、読み出し時または再計算スイーパーで計算し直される
     
     Args:
-        date: 対象日 (YYYY-MM-DD)
+        code: カテゴリコード
+        weight: 新しい重み (-4 to +4)
+        effective_from: 適用開始日 (YYYY-MM-DD, 省略時は今日)。同じ日の変更は上書きする
         
     Returns:
-        (slot_index, category, focus) のタプルリスト
+        この変更の通し番号（weight_version）
+        
+    Raises:
+        ValueError: 未登録のカテゴリ・重みが範囲外・日付形式が正しくない場合
     """
+    if not validate_weight(weight):
+        raise ValueError(f"無効な重みです: {weight} (-4 から 4 の範囲で指定してください)")
+    
+    effective_from = effective_from or get_today()
+    if not validate_date_format(effective_from) or effective_from <= WEIGHT_EPOCH:
+        raise ValueError(f"無効な適用開始日です: {effective_from}")
+    
     with get_db_connection() as conn:
         cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        category_id = _resolve_category_id(cursor, code)
         
+        cursor.execute("SELECT COALESCE(MAX(version), 0) + 1 FROM category_weights")
+        version = cursor.fetchone()[0]
         cursor.execute("""
-            SELECT slot_index, category, focus
-            FROM blocks
-            WHERE date = ? AND category IS NOT NULL
-            ORDER BY slot_index
-        """, (date,))
+            INSERT OR REPLACE INTO category_weights (category_id, effective_from, weight, version, created_at)
+            VALUES (?, ?, ?, ?, ?)
+        """, (category_id, effective_from, weight, version, time.time()))
         
-        return [(row['slot_index'], row['category'], row['focus']) 
-                for row in cursor.fetchall()]
+        # categories.weight は適用開始日が最も新しい重み
+        cursor.execute("""
+            UPDATE categories SET weight = (
+                SELECT weight FROM category_weights
+                WHERE category_id = ?
+                ORDER BY effective_from DESC
+                LIMIT 1
+            )
+            WHERE id = ?
+        """, (category_id, category_id))
+        _bump_categories_version(cursor)
+        conn.commit()
+    
+    invalidate_category_registry()
+    return version
 
 
-def get_date_range_summary_data(start_date: str, end_date: str) -> Dict[str, List[Tuple[int, str, Optional[int]]]]:
+def get_category_weight_history(code: Optional[str] = None) -> List[Dict[str, Any]]:
     """
-    日付範囲の入力済みブロック情報を取得
+    カテゴリの重みの履歴を取得
     
     Args:
-        start_date: 開始日 (YYYY-MM-DD)
-        end_date: 終了日 (YYYY-MM-DD)
+        code: カテゴリコード（省略時は全カテゴリ）
         
     Returns:
-        日付 -> [(slot_index, category, focus)] のマッピング
+        {code, effective_from, weight, version} のリスト（カテゴリの表示順・適用開始日順）
+    """
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT c.code, w.effective_from, w.weight, w.version
+            FROM category_weights w
+            JOIN categories c ON c.id = w.category_id
+            WHERE ? IS NULL OR c.code = ?
+            ORDER BY c.order_index, w.effective_from
+        """, (code, code))
+        return [dict(row) for row in cursor.fetchall()]
+
+
+def refresh_stale_summaries(start_date: Optional[str] = None, end_date: Optional[str] = None,
+                            limit: Optional[int] = None, engine: str = 'auto') -> int:
+    """
+    重みの変更前に計算された日次サマリを、その日に適用される重みで計算し直す
+    古くなっていない行（変更の適用開始日より前の日）は計算し直さずに weight_version だけ進める
+    
+    Args:
+        start_date: 開始日 (省略時は制限なし)
+        end_date: 終了日 (省略時は制限なし)
+        limit: 一度に処理する日数の上限（省略時は全て）
+        engine: スコアリングエンジン
+        
+    Returns:
+        処理した日数（計算し直した日と weight_version だけ進めた日の合計、0 なら古い行は残っていない）
+    """
+    start_date = start_date or "0000-00-00"
+    end_date = end_date or "9999-99-99"
+    query = f"""
+        SELECT date, weight_version FROM daily_summaries
+        WHERE weight_version < ? AND date BETWEEN ? AND ?
+        ORDER BY date
+        {"LIMIT ?" if limit else ""}
+    """
+    
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        registry = _current_category_registry(cursor)
+        
+        # 重みの変更後に全て計算し直していれば、weight_version のインデックスだけで終わる
+        cursor.execute("SELECT MIN(weight_version) FROM daily_summaries")
+        oldest = cursor.fetchone()[0]
+        if oldest is None or oldest >= registry.weight_version:
+            return 0
+        
+        params = (registry.weight_version, start_date, end_date) + ((limit,) if limit else ())
+        cursor.execute(query, params)
+        if cursor.fetchone() is None:
+            return 0
+        
+        cursor.execute("BEGIN IMMEDIATE")
+        registry = _current_category_registry(cursor)
+        params = (registry.weight_version, start_date, end_date) + ((limit,) if limit else ())
+        cursor.execute(query, params)
+        rows = cursor.fetchall()
+        stale = [row['date'] for row in rows if registry.is_stale(row['date'], row['weight_version'])]
+        
+        cursor.executemany("UPDATE daily_summaries SET weight_version = ? WHERE date = ?",
+                           [(registry.weight_version, row['date']) for row in rows
+                            if not registry.is_stale(row['date'], row['weight_version'])])
+        
+        changed = []
+        for i in range(0, len(stale), RESCORE_CHUNK_DAYS):
+            batch = stale[i:i + RESCORE_CHUNK_DAYS]
+            scored = _score_date_range(conn, batch[0], batch[-1], engine)
+            changed += _rewrite_daily_summaries(cursor, batch, scored)
+        
+        conn.commit()
+    
+    _notify_date_writes(changed)
+    return len(rows)
+
+
+def count_stale_summaries() -> int:
+    """重みの変更後にまだ計算し直していない日次サマリの日数"""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        registry = _current_category_registry(cursor)
+        cursor.execute("SELECT date, weight_version FROM daily_summaries WHERE weight_version < ?",
+                       (registry.weight_version,))
+        return sum(1 for row in cursor.fetchall() if registry.is_stale(row['date'], row['weight_version']))
+
+
+# === 全履歴の並列再計算 ===
+
+def start_rebuild_run(run_key: str, categories_version: int, restart: bool = False) -> Dict[str, Any]:
     """
+    再計算の実行を開始し、中断された同じ実行があれば書き込み済みのバッチを返す
+    
+    Args:
+        run_key: 実行単位のキー（対象期間）
+        categories_version: 開始時点のカテゴリのバージョン（変わっていれば再開せずやり直す）
+        restart: 中断された実行があっても最初からやり直す
+        
+    Returns:
+        {'resumed': 再開か, 'done': 書き込み済みの (最初の日付, 最後の日付) のリスト}
+    """
+    now = time.time()
     with get_db_connection() as conn:
         cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute("SELECT status, categories_version FROM rebuild_runs WHERE run_key = ?", (run_key,))
+        run = cursor.fetchone()
         
+        resumed = (run is not None and not restart and run['status'] != REBUILD_DONE
+                   and run['categories_version'] == categories_version)
+        if not resumed:
+            cursor.execute("DELETE FROM rebuild_batches WHERE run_key = ?", (run_key,))
         cursor.execute("""
-            SELECT date, slot_index, category, focus
-            FROM blocks
-            WHERE date BETWEEN ? AND ? AND category IS NOT NULL
-            ORDER BY date, slot_index
-        """, (start_date, end_date))
+            INSERT OR REPLACE INTO rebuild_runs (run_key, status, categories_version, started_at, finished_at)
+            VALUES (?, ?, ?, ?, NULL)
+        """, (run_key, REBUILD_RUNNING, categories_version, now))
         
-        result = {}
-        for row in cursor.fetchall():
-            date = row['date']
-            if date not in result:
-                result[date] = []
-            result[date].append((row['slot_index'], row['category'], row['focus']))
+        cursor.execute("""
+            SELECT first_date, last_date FROM rebuild_batches
+            WHERE run_key = ?
+            ORDER BY first_date
+        """, (run_key,))
+        done = [(row['first_date'], row['last_date']) for row in cursor.fetchall()]
+        conn.commit()
+        return {'resumed': resumed, 'done': done}
+
+
+def score_rebuild_batch(first_date: str, last_date: str,
+                        engine: str = 'auto') -> Tuple[Dict[str, Dict[str, Any]], Dict[str, int], int]:
+    """
+    期間の日次集計カウンタを、日付・カテゴリのバージョンと同じスナップショットで計算（読み取りのみ）
+    
+    Returns:
+        (日付 -> 集計カウンタ, 日付 -> バージョン, カテゴリのバージョン)
+    """
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        # 読み取りトランザクション内で読むことで、バージョンとブロックを同じ時点で揃える
+        cursor.execute("BEGIN")
+        try:
+            cursor.execute("""
+                SELECT scope, version FROM data_versions
+                WHERE scope BETWEEN ? AND ? OR scope = ?
+            """, (DATE_VERSION_PREFIX + first_date, DATE_VERSION_PREFIX + last_date, CATEGORIES_VERSION_SCOPE))
+            versions = {row['scope']: row['version'] for row in cursor.fetchall()}
+            scored = _score_date_range(conn, first_date, last_date, engine)
+        finally:
+            conn.rollback()
+    
+    categories_version = versions.pop(CATEGORIES_VERSION_SCOPE, 0)
+    date_versions = {scope[len(DATE_VERSION_PREFIX):]: version for scope, version in versions.items()}
+    return scored, date_versions, categories_version
+
+
+def write_rebuild_batch(run_key: str, dates: List[str], scored: Dict[str, Dict[str, Any]],
+                        date_versions: Dict[str, int], categories_version: int) -> int:
+    """
+    再計算したバッチを日次サマリに書き込み、書き込み済みとして記録（1トランザクション）
+    計算後にブロックが書き込まれた日は、書き込み時に更新済みのため上書きしない
+    
+    Args:
+        run_key: 実行単位のキー
+        dates: バッチの日付（日付順、入力のない日はサマリを削除する）
+        scored: score_rebuild_batch の集計カウンタ
+        date_versions: 計算時の日付ごとのバージョン
+        categories_version: 計算時のカテゴリのバージョン
         
-        return result
+    Returns:
+        上書きしなかった日数
+        
+    Raises:
+        RuntimeError: 計算後にカテゴリが変更された場合（再計算をやり直す必要がある）
+    """
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        
+        if _current_category_registry(cursor).categories_version != categories_version:
+            conn.rollback()
+            raise RuntimeError("再計算中にカテゴリが変更されました。最初からやり直してください")
+        
+        cursor.execute("""
+            SELECT scope, version FROM data_versions
+            WHERE scope BETWEEN ? AND ?
+        """, (DATE_VERSION_PREFIX + dates[0], DATE_VERSION_PREFIX + dates[-1]))
+        current = {row['scope'][len(DATE_VERSION_PREFIX):]: row['version'] for row in cursor.fetchall()}
+        
+        # バージョンの比較は書き込み前に済ませる（書き換えた日のバージョンはこの後で進める）
+        unchanged = [date for date in dates if current.get(date, 0) == date_versions.get(date, 0)]
+        skipped = len(dates) - len(unchanged)
+        changed = _rewrite_daily_summaries(cursor, unchanged, scored)
+        
+        cursor.execute("""
+            INSERT OR REPLACE INTO rebuild_batches (run_key, first_date, last_date, days, skipped, finished_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (run_key, dates[0], dates[-1], len(dates), skipped, time.time()))
+        conn.commit()
+    
+    _notify_date_writes(changed)
+    return skipped
+
+
+def finish_rebuild_run(run_key: str, status: str):
+    """再計算の実行を終了状態にする"""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute("UPDATE rebuild_runs SET status = ?, finished_at = ? WHERE run_key = ?",
+                       (status, time.time(), run_key))
+        conn.commit()
 
 
 # === データベース管理 ===
@@ -378,20 +2920,38 @@ def get_database_stats() -> Dict[str, Any]:
         cursor = conn.cursor()
         
         # ブロック統計
-        cursor.execute("SELECT COUNT(*) FROM blocks")
-        total_blocks = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM blocks WHERE category IS NOT NULL")
-        filled_blocks = cursor.fetchone()[0]
-        
-        # 日付範囲
-        cursor.execute("SELECT MIN(date), MAX(date) FROM blocks WHERE category IS NOT NULL")
-        date_range = cursor.fetchone()
+        if _use_day_vectors():
+            total_blocks = filled_blocks = 0
+            cursor.execute("SELECT categories, focus, memos FROM day_vectors")
+            for row in cursor.fetchall():
+                vector = DayVector.from_row(row['categories'], row['focus'], row['memos'])
+                total_blocks += sum(1 for slot_index in range(SLOTS_PER_DAY) if vector.has_slot(slot_index))
+                filled_blocks += len(vector.filled_slots())
+            
+            cursor.execute(f"""
+                SELECT MIN(date), MAX(date) FROM day_vectors
+                WHERE categories != zeroblob({SLOTS_PER_DAY})
+            """)
+            date_range = cursor.fetchone()
+        else:
+            cursor.execute("SELECT COUNT(*) FROM blocks")
+            total_blocks = cursor.fetchone()[0]
+            
+            cursor.execute("SELECT COUNT(*) FROM blocks WHERE category_id IS NOT NULL")
+            filled_blocks = cursor.fetchone()[0]
+            
+            # 日付範囲
+            cursor.execute("SELECT MIN(date), MAX(date) FROM blocks WHERE category_id IS NOT NULL")
+            date_range = cursor.fetchone()
         
         # カテゴリ統計
         cursor.execute("SELECT COUNT(*) FROM categories")
         total_categories = cursor.fetchone()[0]
         
+        # 日次サマリ統計
+        cursor.execute("SELECT COUNT(*) FROM daily_summaries")
+        summary_days = cursor.fetchone()[0]
+        
         return {
             'total_blocks': total_blocks,
             'filled_blocks': filled_blocks,
@@ -401,16 +2961,27 @@ def get_database_stats() -> Dict[str, Any]:
                 'end': date_range[1]
             },
             'total_categories': total_categories,
-            'db_path': DB_PATH
+            'summary_days': summary_days,
+            'storage_mode': STORAGE_MODE,
+            'db_path': DB_PATH,
+            'connection_pool': get_pool_stats()
         }
 
 
 def reset_database():
     """データベースを完全リセット（開発用）"""
+    close_connection_pool()
+    invalidate_category_registry()
+    
     if os.path.exists(DB_PATH):
         os.remove(DB_PATH)
         print("データベースファイルを削除しました。")
     
+    # WALモードの付随ファイルも削除
+    for suffix in ("-wal", "-shm"):
+        if os.path.exists(DB_PATH + suffix):
+            os.remove(DB_PATH + suffix)
+    
     init_database()
     print("データベースを再初期化しました。")
 
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+Focus Ring - LLM応答キャッシュ
+プロンプト・モデル・生成パラメータの指紋をキーに、LLMの応答をSQLiteに永続化する
+（データが変わらない日の改善提案は再表示時にLLMを呼ばない）
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, Optional
+
+from . import db
+
+
+# LLM応答キャッシュ設定（件数0で無効）
+LLM_CACHE_MAX_ENTRIES = int(os.getenv('FOCUS_RING_LLM_CACHE_MAX_ENTRIES', '1000'))
+LLM_CACHE_TTL = float(os.getenv('FOCUS_RING_LLM_CACHE_TTL', str(30 * 24 * 60 * 60)))
+
+_stats_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0, 'stores': 0, 'errors': 0}
+
+
+def is_enabled() -> bool:
+    """LLM応答キャッシュが有効か"""
+    return LLM_CACHE_MAX_ENTRIES > 0 and LLM_CACHE_TTL > 0
+
+
+def fingerprint(prompt: str, model: str, params: Dict[str, Any]) -> str:
+    """
+    LLM呼び出しの指紋を計算
+    
+    Args:
+        prompt: build_llm_context の出力（システムプロンプトを含める場合は params に入れる）
+        model: モデル名
+        params: 応答に影響する生成パラメータ
+    
+    Returns:
+        SHA-256 の16進文字列
+    """
+    payload = json.dumps({'prompt': prompt, 'model': model, 'params': params},
+                         ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _count(name: str):
+    """統計カウンタを1増やす"""
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def get(cache_key: str) -> Optional[Dict[str, Any]]:
+    """
+    保存済みの応答を取得（キャッシュ無効時・DBエラー時は None）
+    
+    Args:
+        cache_key: fingerprint の結果
+    """
+    if not is_enabled():
+        return None
+    
+    try:
+        response = db.get_cached_llm_response(cache_key, LLM_CACHE_TTL)
+    except sqlite3.Error as e:
+        # キャッシュの不調で提案自体を失敗させない
+        print(f"LLM応答キャッシュ読み込みエラー: {e}")
+        _count('errors')
+        return None
+    
+    _count('hits' if response is not None else 'misses')
+    return response
+
+
+def put(cache_key: str, model: str, response: Dict[str, Any]):
+    """
+    応答を保存（キャッシュ無効時は何もしない）
+    
+    Args:
+        cache_key: fingerprint の結果
+        model: 応答を生成したモデル名
+        response: 保存する応答辞書
+    """
+    if not is_enabled():
+        return
+    
+    try:
+        db.put_cached_llm_response(cache_key, model, response, LLM_CACHE_TTL, LLM_CACHE_MAX_ENTRIES)
+    except sqlite3.Error as e:
+        print(f"LLM応答キャッシュ書き込みエラー: {e}")
+        _count('errors')
+        return
+    
+    _count('stores')
+
+
+def get_llm_cache_stats() -> Dict[str, Any]:
+    """LLM応答キャッシュの統計情報を取得"""
+    with _stats_lock:
+        stats = dict(_stats)
+    
+    lookups = stats['hits'] + stats['misses']
+    try:
+        entries = db.get_llm_response_cache_size() if is_enabled() else 0
+    except sqlite3.Error:
+        entries = None
+    
+    return {
+        'enabled': is_enabled(),
+        'entries': entries,
+        'max_entries': LLM_CACHE_MAX_ENTRIES,
+        'ttl_seconds': LLM_CACHE_TTL,
+        'hit_rate': round(stats['hits'] / max(lookups, 1), 3),
+        **stats
+    }
@@ -0,0 +1,400 @@
+# -*- coding: utf-8 -*-
+"""
+Focus Ring - LLMクライアント
+OpenAI互換APIのクライアントを使い回し、接続・読み込みのタイムアウト、遅延時のヘッジ要求、
+連続失敗時にLLMを呼ばずルールベースへ切り替えるサーキットブレーカーを提供する
+"""
+
+import asyncio
+import os
+import threading
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+
+# LLMクライアント設定
+LLM_BASE_URL = os.getenv('LLM_BASE_URL') or None  # 省略時は OpenAI 公式エンドポイント
+LLM_CONNECT_TIMEOUT = float(os.getenv('FOCUS_RING_LLM_CONNECT_TIMEOUT', '3'))
+LLM_READ_TIMEOUT = float(os.getenv('FOCUS_RING_LLM_READ_TIMEOUT', '20'))
+LLM_HEDGE_DELAY = float(os.getenv('FOCUS_RING_LLM_HEDGE_DELAY', '0'))  # 0 でヘッジ無効
+LLM_BREAKER_THRESHOLD = int(os.getenv('FOCUS_RING_LLM_BREAKER_THRESHOLD', '3'))
+LLM_BREAKER_COOLDOWN = float(os.getenv('FOCUS_RING_LLM_BREAKER_COOLDOWN', '60'))
+
+BREAKER_CLOSED = 'closed'
+BREAKER_OPEN = 'open'
+BREAKER_HALF_OPEN = 'half_open'
+
+Messages = List[Dict[str, str]]
+
+
+class LLMUnavailableError(Exception):
+    """サーキットブレーカーが開いているためLLMを呼ばなかった"""
+
+
+# === サーキットブレーカー ===
+
+class CircuitBreaker:
+    """
+    連続失敗回数で開閉するサーキットブレーカー
+    
+    threshold 回続けて失敗すると開き、cooldown 秒間は呼び出しを拒否する。
+    cooldown 経過後は試行を1件だけ通し（half_open）、成功すれば閉じ、失敗すれば再び開く。
+    """
+    
+    def __init__(self, threshold: int = LLM_BREAKER_THRESHOLD, cooldown: float = LLM_BREAKER_COOLDOWN):
+        self.threshold = max(1, threshold)
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._state = BREAKER_CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        
+        # 統計カウンタ
+        self._opened = 0
+        self._short_circuited = 0
+    
+    def allow(self) -> bool:
+        """呼び出しを通してよいか（拒否した場合は short_circuited に数える）"""
+        with self._lock:
+            if self._state == BREAKER_OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+                self._state = BREAKER_HALF_OPEN
+                self._trial_in_flight = False
+            
+            if self._state == BREAKER_CLOSED:
+                return True
+            if self._state == BREAKER_HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            
+            self._short_circuited += 1
+            return False
+    
+    def record_success(self):
+        """成功を記録（ブレーカーを閉じる）"""
+        with self._lock:
+            self._state = BREAKER_CLOSED
+            self._consecutive_failures = 0
+            self._trial_in_flight = False
+    
+    def record_failure(self):
+        """失敗を記録（連続失敗が閾値に達するか、half_open の試行が失敗したら開く）"""
+        with self._lock:
+            self._consecutive_failures += 1
+            if self._state == BREAKER_HALF_OPEN or self._consecutive_failures >= self.threshold:
+                if self._state != BREAKER_OPEN:
+                    self._opened += 1
+                self._state = BREAKER_OPEN
+                self._opened_at = time.monotonic()
+                self._trial_in_flight = False
+    
+    def abandon(self):
+        """結果を記録せずに終わった呼び出し（キャンセル）を記録し、half_open の試行枠を戻す"""
+        with self._lock:
+            self._trial_in_flight = False
+    
+    def reset(self):
+        """状態を初期化（統計カウンタは残す）"""
+        with self._lock:
+            self._state = BREAKER_CLOSED
+            self._consecutive_failures = 0
+            self._trial_in_flight = False
+    
+    def stats(self) -> Dict[str, Any]:
+        """ブレーカーの状態と統計情報を取得"""
+        with self._lock:
+            retry_in = None
+            if self._state == BREAKER_OPEN:
+                retry_in = round(max(0.0, self.cooldown - (time.monotonic() - self._opened_at)), 1)
+            return {
+                'state': self._state,
+                'consecutive_failures': self._consecutive_failures,
+                'threshold': self.threshold,
+                'cooldown_seconds': self.cooldown,
+                'retry_in_seconds': retry_in,
+                'opened': self._opened,
+                'short_circuited': self._short_circuited
+            }
+
+
+# === LLMクライアント ===
+
+class LLMClient:
+    """
+    OpenAI互換APIのチャット補完クライアント
+    
+    SDKのクライアント（HTTP接続プールを持つ）は APIキーごとに使い回す。
+    非同期版はイベントループごとに作る。SDK内部の再試行は行わず、
+    失敗はすべてサーキットブレーカーに記録する。
+    """
+    
+    def __init__(self, base_url: Optional[str] = LLM_BASE_URL,
+                 connect_timeout: float = LLM_CONNECT_TIMEOUT,
+                 read_timeout: float = LLM_READ_TIMEOUT,
+                 hedge_delay: float = LLM_HEDGE_DELAY,
+                 breaker: Optional[CircuitBreaker] = None):
+        self.base_url = base_url
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.hedge_delay = hedge_delay
+        self.breaker = breaker or CircuitBreaker()
+        self.pid = os.getpid()
+        
+        self._sync_clients: Dict[str, Any] = {}
+        self._async_clients: Dict[Tuple[str, int], Any] = {}
+        self._lock = threading.Lock()
+        
+        # 統計カウンタ
+        self._calls = 0
+        self._failures = 0
+        self._timeouts = 0
+        self._hedges = 0
+        self._hedge_wins = 0
+        self._latency_total = 0.0
+    
+    @property
+    def budget(self) -> float:
+        """1回の問い合わせにかける最大秒数（接続 + 読み込み）"""
+        return self.connect_timeout + self.read_timeout
+    
+    def _timeout(self):
+        """SDKに渡す接続・読み込みタイムアウト"""
+        import openai
+        return openai.Timeout(self.read_timeout, connect=self.connect_timeout)
+    
+    def _sync_client(self, api_key: str):
+        """APIキーごとの同期クライアントを取得"""
+        with self._lock:
+            client = self._sync_clients.get(api_key)
+            if client is None:
+                import openai
+                client = openai.OpenAI(api_key=api_key, base_url=self.base_url,
+                                       timeout=self._timeout(), max_retries=0)
+                self._sync_clients[api_key] = client
+            return client
+    
+    def _async_client(self, api_key: str):
+        """APIキーと実行中のイベントループごとの非同期クライアントを取得"""
+        key = (api_key, id(asyncio.get_running_loop()))
+        with self._lock:
+            client = self._async_clients.get(key)
+            if client is None:
+                import openai
+                # 終了したイベントループのクライアントは使えないので捨てる
+                self._async_clients = {k: v for k, v in self._async_clients.items() if k[1] == key[1]}
+                client = openai.AsyncOpenAI(api_key=api_key, base_url=self.base_url,
+                                            timeout=self._timeout(), max_retries=0)
+                self._async_clients[key] = client
+            return client
+    
+    def complete(self, api_key: str, messages: Messages, **params: Any) -> str:
+        """
+        チャット補完を同期で実行（ヘッジなし）
+        
+        Args:
+            api_key: APIキー
+            messages: チャットメッセージ
+            **params: model, max_tokens, temperature などの生成パラメータ
+        
+        Returns:
+            応答本文
+        
+        Raises:
+            LLMUnavailableError: ブレーカーが開いている場合
+        """
+        if not self.breaker.allow():
+            raise LLMUnavailableError("LLMはサーキットブレーカーにより一時停止中です")
+        
+        started = time.perf_counter()
+        try:
+            response = self._sync_client(api_key).chat.completions.create(messages=messages, **params)
+            content = response.choices[0].message.content
+        except Exception as e:
+            self._record_failure(e)
+            raise
+        
+        self._record_success(time.perf_counter() - started)
+        return content
+    
+    async def complete_async(self, api_key: str, messages: Messages, **params: Any) -> str:
+        """
+        チャット補完を非同期で実行
+        hedge_delay 秒以内に応答がなければ同じ要求をもう1本送り、先に成功した方を使う
+        
+        Args:
+            api_key: APIキー
+            messages: チャットメッセージ
+            **params: model, max_tokens, temperature などの生成パラメータ
+        
+        Returns:
+            応答本文
+        
+        Raises:
+            LLMUnavailableError: ブレーカーが開いている場合
+            asyncio.TimeoutError: 接続 + 読み込みの予算内に応答がない場合
+        """
+        if not self.breaker.allow():
+            raise LLMUnavailableError("LLMはサーキットブレーカーにより一時停止中です")
+        
+        client = self._async_client(api_key)
+        
+        async def request() -> str:
+            response = await client.chat.completions.create(messages=messages, **params)
+            return response.choices[0].message.content
+        
+        started = time.perf_counter()
+        try:
+            content = await asyncio.wait_for(self._hedged(request), timeout=self.budget)
+        except asyncio.CancelledError:
+            # クライアント切断などで呼び出し元が打ち切った（プロバイダの失敗ではない）
+            self.breaker.abandon()
+            raise
+        except Exception as e:
+            self._record_failure(e)
+            raise
+        
+        self._record_success(time.perf_counter() - started)
+        return content
+    
+    async def stream_async(self, api_key: str, messages: Messages, **params: Any) -> AsyncIterator[str]:
+        """
+        チャット補完をストリーミングで実行し、本文の差分を順に返す（ヘッジなし）
+        
+        接続から最後の差分までを接続 + 読み込みの予算内に収める。
+        
+        Args:
+            api_key: APIキー
+            messages: チャットメッセージ
+            **params: model, max_tokens, temperature などの生成パラメータ
+            
+        Yields:
+            応答本文の差分
+            
+        Raises:
+            LLMUnavailableError: ブレーカーが開いている場合
+            asyncio.TimeoutError: 予算内に応答が終わらない場合
+        """
+        if not self.breaker.allow():
+            raise LLMUnavailableError("LLMはサーキットブレーカーにより一時停止中です")
+        
+        client = self._async_client(api_key)
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        deadline = loop.time() + self.budget
+        stream = None
+        try:
+            stream = await asyncio.wait_for(
+                client.chat.completions.create(messages=messages, stream=True, **params),
+                timeout=self.budget
+            )
+            chunks = stream.__aiter__()
+            while True:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError()
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), timeout=remaining)
+                except StopAsyncIteration:
+                    break
+                
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except (asyncio.CancelledError, GeneratorExit):
+            # 呼び出し元が途中で打ち切った（プロバイダの失敗ではない）
+            self.breaker.abandon()
+            raise
+        except Exception as e:
+            self._record_failure(e)
+            raise
+        finally:
+            if stream is not None:
+                await stream.close()
+        
+        self._record_success(time.perf_counter() - started)
+    
+    async def _hedged(self, request: Callable[[], Awaitable[str]]) -> str:
+        """遅い要求を追い越すため、hedge_delay 経過後に2本目を送る"""
+        first = asyncio.ensure_future(request())
+        if self.hedge_delay <= 0:
+            return await first
+        
+        done, _ = await asyncio.wait({first}, timeout=self.hedge_delay)
+        if done:
+            return first.result()
+        
+        with self._lock:
+            self._hedges += 1
+        second = asyncio.ensure_future(request())
+        pending = {first, second}
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is second:
+                            with self._lock:
+                                self._hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+    
+    def _record_success(self, elapsed: float):
+        """成功した問い合わせを記録"""
+        with self._lock:
+            self._calls += 1
+            self._latency_total += elapsed
+        self.breaker.record_success()
+    
+    def _record_failure(self, error: BaseException):
+        """失敗した問い合わせを記録（タイムアウトは別にも数える）"""
+        with self._lock:
+            self._calls += 1
+            self._failures += 1
+            if isinstance(error, asyncio.TimeoutError) or 'Timeout' in type(error).__name__:
+                self._timeouts += 1
+        self.breaker.record_failure()
+    
+    def stats(self) -> Dict[str, Any]:
+        """クライアントとブレーカーの統計情報を取得"""
+        with self._lock:
+            succeeded = self._calls - self._failures
+            stats = {
+                'base_url': self.base_url,
+                'connect_timeout_seconds': self.connect_timeout,
+                'read_timeout_seconds': self.read_timeout,
+                'hedge_delay_seconds': self.hedge_delay,
+                'calls': self._calls,
+                'failures': self._failures,
+                'timeouts': self._timeouts,
+                'hedges': self._hedges,
+                'hedge_wins': self._hedge_wins,
+                'avg_latency_ms': round(self._latency_total / max(succeeded, 1) * 1000, 1)
+            }
+        stats['breaker'] = self.breaker.stats()
+        return stats
+
+
+_client: Optional[LLMClient] = None
+_client_lock = threading.Lock()
+
+
+def get_llm_client() -> LLMClient:
+    """プロセス共通のLLMクライアントを取得（fork後のプロセスでは作り直す）"""
+    global _client
+    client = _client
+    if client is not None and client.pid == os.getpid():
+        return client
+    
+    with _client_lock:
+        if _client is None or _client.pid != os.getpid():
+            _client = LLMClient()
+        return _client
+
+
+def get_llm_client_stats() -> Dict[str, Any]:
+    """LLMクライアントの統計情報を取得"""
+    return get_llm_client().stats()
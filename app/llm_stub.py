@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""
+Focus Ring - ローカルLLMスタブサーバー（検証用）
+OpenAI互換の POST /v1/chat/completions を返す最小のHTTPサーバー（"stream": true にも対応）。
+応答遅延・失敗を切り替えて、タイムアウト・ヘッジ・サーキットブレーカーの動作を確認する。
+
+起動例:
+    python -m app.llm_stub --port 8765 --delay 0.5
+    LLM_BASE_URL=http://127.0.0.1:8765/v1 LLM_API_KEY=stub uvicorn app.main:app
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+
+
+STUB_CONTENT = (
+    "改善提案:\n"
+    "- 午前中に90分の集中ブロックを確保しましょう\n"
+    "- 動画・SNSは夕方以降の決めた時間だけにしましょう\n"
+    "- 同じ種類の作業を連続させて切替を減らしましょう\n"
+    "総括:\n"
+    "生産的な時間を確保できた1日でした。"
+)
+
+
+class StubState:
+    """スタブの応答設定と受信数（テストから書き換える）"""
+    
+    def __init__(self, delay: float = 0.0, fail: bool = False, status: int = 500,
+                 chunk_delay: float = 0.05):
+        self.delay = delay
+        self.chunk_delay = chunk_delay  # ストリーミング時の行ごとの間隔
+        self.fail = fail
+        self.status = status
+        self.requests = 0
+        self._lock = threading.Lock()
+    
+    def next_request(self) -> int:
+        """受信数を数えて通し番号を返す"""
+        with self._lock:
+            self.requests += 1
+            return self.requests
+
+
+def _completion(model: str, content: str) -> Dict[str, Any]:
+    """OpenAI形式のチャット補完レスポンス"""
+    return {
+        'id': 'chatcmpl-stub',
+        'object': 'chat.completion',
+        'created': int(time.time()),
+        'model': model,
+        'choices': [{
+            'index': 0,
+            'message': {'role': 'assistant', 'content': content},
+            'finish_reason': 'stop'
+        }],
+        'usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0}
+    }
+
+
+def _completion_chunk(model: str, content: Optional[str]) -> Dict[str, Any]:
+    """OpenAI形式のストリーミング差分（content が None なら終了チャンク）"""
+    return {
+        'id': 'chatcmpl-stub',
+        'object': 'chat.completion.chunk',
+        'created': int(time.time()),
+        'model': model,
+        'choices': [{
+            'index': 0,
+            'delta': {'content': content} if content is not None else {},
+            'finish_reason': None if content is not None else 'stop'
+        }]
+    }
+
+
+def _make_handler(state: StubState):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            payload = json.loads(self.rfile.read(length) or b'{}')
+            state.next_request()
+            
+            if state.delay > 0:
+                time.sleep(state.delay)
+            
+            if not self.path.endswith('/chat/completions'):
+                self._send(404, {'error': {'message': 'not found'}})
+            elif state.fail:
+                self._send(state.status, {'error': {'message': 'stub failure', 'type': 'server_error'}})
+            elif payload.get('stream'):
+                self._stream(payload.get('model', 'stub'))
+            else:
+                self._send(200, _completion(payload.get('model', 'stub'), STUB_CONTENT))
+        
+        def _send(self, status: int, body: Dict[str, Any]):
+            data = json.dumps(body, ensure_ascii=False).encode()
+            try:
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # クライアントがタイムアウトで切断済み
+        
+        def _stream(self, model: str):
+            """本文を1行ずつSSEで送る（接続を閉じて終端）"""
+            try:
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.end_headers()
+                for line in STUB_CONTENT.splitlines(keepends=True) + [None]:
+                    data = json.dumps(_completion_chunk(model, line), ensure_ascii=False)
+                    self.wfile.write(f"data: {data}\n\n".encode())
+                    self.wfile.flush()
+                    if line is not None and state.chunk_delay > 0:
+                        time.sleep(state.chunk_delay)
+                self.wfile.write(b"data: [DONE]\n\n")
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+        
+        def log_message(self, format, *args):
+            pass
+    
+    return Handler
+
+
+def start_stub_server(host: str = '127.0.0.1', port: int = 0,
+                      state: Optional[StubState] = None) -> Tuple[ThreadingHTTPServer, StubState, str]:
+    """
+    スタブサーバーをバックグラウンドスレッドで起動
+    
+    Args:
+        host: 待ち受けアドレス
+        port: 待ち受けポート（0 で空きポート）
+        state: 応答設定（省略時は即時成功）
+    
+    Returns:
+        (サーバー, 応答設定, LLM_BASE_URL に指定するURL)
+    """
+    state = state or StubState()
+    server = ThreadingHTTPServer((host, port), _make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="focus-ring-llm-stub", daemon=True).start()
+    base_url = f"http://{host}:{server.server_address[1]}/v1"
+    return server, state, base_url
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="OpenAI互換のローカルLLMスタブサーバー")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--delay', type=float, default=0.0, help="応答までの秒数")
+    parser.add_argument('--fail', action='store_true', help="常にエラーを返す")
+    parser.add_argument('--status', type=int, default=500, help="--fail 時のHTTPステータス")
+    parser.add_argument('--chunk-delay', type=float, default=0.05, help="ストリーミング時の行ごとの秒数")
+    args = parser.parse_args()
+    
+    server, _, base_url = start_stub_server(
+        args.host, args.port,
+        StubState(delay=args.delay, fail=args.fail, status=args.status, chunk_delay=args.chunk_delay)
+    )
+    print(f"LLMスタブサーバー起動: LLM_BASE_URL={base_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
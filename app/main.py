@@ -4,25 +4,50 @@ Focus Ring - FastAPI メインアプリケーション
 1日行動×集中タイムトラッカーのAPIサーバー
 """
 
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 import os
-from typing import Optional, List
+import json
+from typing import Optional, List, Dict
 from datetime import datetime
 
 from .models import (
-    BlockRequest, BlockResponse, BulkBlockRequest, CategoryModel, 
-    DailySummary, TrendResponse, AIResponse, ErrorResponse
+    BlockRequest, BlockResponse, BulkBlockRequest, BlockRangeRequest, BlockRangeClearRequest,
+    CategoryModel, DailySummary, TrendResponse, RollingResponse, RollupResponse, AIResponse, ErrorResponse, MultiDayResponse
 )
-from .db import (
-    init_database, get_day_blocks, upsert_block, bulk_upsert_blocks, 
-    get_all_categories, get_database_stats
+from .async_db import (
+    init_database, get_day_slot_rows, get_range_day_slots, upsert_block, bulk_upsert_blocks,
+    upsert_block_range, clear_block_range,
+    get_all_categories, get_data_versions, get_database_stats, calculate_daily_summary, calculate_trend_data,
+    calculate_rolling_data, calculate_rollups,
+    get_daily_suggestions, stream_daily_suggestions, get_executor_stats, get_llm_cache_stats,
+    get_llm_client_stats, get_write_buffer_stats, shutdown_db_executor, flush_writes
 )
-from .summarizer import calculate_daily_summary, calculate_trend_data
-from .suggestions import get_daily_suggestions
-from .utils import get_today, validate_date_format, get_date_range
+from .day_payload import encode_day_blocks, encode_day_columnar
+from .summarizer import to_columnar_trend
+from .db import ROLLUP_GRANULARITIES
+from .result_cache import get_result_cache_stats
+from .precompute import get_precompute_status, start_precompute_scheduler, stop_precompute_scheduler
+from .rescore import get_rescore_status, start_rescore_sweeper, stop_rescore_sweeper
+from .utils import (
+    get_today, validate_date_format, count_days_in_range, time_range_to_slots,
+    get_week_dates, get_all_time_slots
+)
+
+
+# 推移データの最大取得日数
+TREND_MAX_DAYS = 3660
+
+# 移動窓集計の窓の最大日数
+ROLLING_MAX_WINDOW = 366
+
+# 複数日スロット取得の最大日数
+DAYS_MAX_DAYS = 62
+
+# レスポンス形式（?format=）: objects は従来のオブジェクト配列、columnar は列指向の並列配列
+RESPONSE_FORMATS = ('objects', 'columnar')
 
 
 # === FastAPI アプリケーション初期化 ===
@@ -69,6 +94,33 @@ async def http_exception_handler(request, exc):
     )
 
 
+# === 条件付きリクエスト（ETag） ===
+
+def _make_etag(kind: str, versions: Dict[str, int], *variant: str) -> str:
+    """リソース種別・表現とバージョンカウンタから強いETagを作る"""
+    counters = [f"{key[0]}{versions[key]}" for key in sorted(versions)]
+    return '"' + "-".join([kind, *variant, *counters]) + '"'
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match がETagに一致するか"""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def _etag_headers(etag: str) -> Dict[str, str]:
+    """ETag付きレスポンスのヘッダー（キャッシュは毎回再検証させる）"""
+    return {"ETag": etag, "Cache-Control": "no-cache"}
+
+
+def _not_modified(etag: str) -> Response:
+    """304 Not Modified レスポンス"""
+    return Response(status_code=304, headers=_etag_headers(etag))
+
+
 # === ルートエンドポイント ===
 
 @app.get("/")
@@ -100,8 +152,8 @@ async def initialize_database():
     既存データがある場合はスキップ
     """
     try:
-        init_database()
-        stats = get_database_stats()
+        await init_database()
+        stats = await get_database_stats()
         
         return {
             "message": "データベースの初期化が完了しました",
@@ -114,38 +166,95 @@ async def initialize_database():
 # === ブロック操作エンドポイント ===
 
 @app.get("/api/day/{date}", response_model=List[BlockResponse])
-async def get_day_data(date: str):
+async def get_day_data(
+    request: Request,
+    date: str,
+    response_format: str = Query("objects", alias="format", description="objects / columnar")
+):
     """
     指定日の全ブロック（80個）を取得
-    未入力のブロックは category=null で返却
+    未入力のブロックは category=null（created_at / updated_at も null）で返却
+    format=columnar では categories / focus の80要素配列とメモの疎マップを返す
+    If-None-Match が日付のバージョンに一致すれば 304 を返す
     """
     # 日付バリデーション
     if not validate_date_format(date):
         raise HTTPException(status_code=400, detail="日付形式が正しくありません (YYYY-MM-DD)")
     
+    if response_format not in RESPONSE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format は {'/'.join(RESPONSE_FORMATS)} で指定してください")
+    
     try:
-        blocks = get_day_blocks(date)
+        etag = _make_etag("day", await get_data_versions(date), date, response_format)
+        if _etag_matches(request, etag):
+            return _not_modified(etag)
         
-        # DBBlockをBlockResponseに変換
-        response_blocks = []
-        for block in blocks:
-            response_blocks.append(BlockResponse(
-                date=block.date,
-                slot_index=block.slot_index,
-                start_time=block.start_time,
-                category=block.category,
-                focus=block.focus,
-                memo=block.memo,
-                created_at=block.created_at,
-                updated_at=block.updated_at
-            ))
+        # タプル行から直接JSONを組み立てる（response_model は仕様書用）
+        rows = await get_day_slot_rows(date)
+        encode = encode_day_columnar if response_format == 'columnar' else encode_day_blocks
+        return Response(content=encode(date, rows), media_type="application/json",
+                        headers=_etag_headers(etag))
         
-        return response_blocks
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"データ取得エラー: {str(e)}")
+
+
+@app.get("/api/days", response_model=MultiDayResponse)
+async def get_days_data(
+    from_date: str = Query(..., alias="from", description="開始日 (YYYY-MM-DD)"),
+    to_date: str = Query(..., alias="to", description="終了日 (YYYY-MM-DD)")
+):
+    """
+    期間内の全日分のスロットを1回の範囲読み出しで取得
+    日ごとに80スロットの配列（カテゴリ・集中度）とメモの疎マップを返す
+    """
+    # 日付バリデーション
+    if not validate_date_format(from_date):
+        raise HTTPException(status_code=400, detail="開始日の形式が正しくありません (YYYY-MM-DD)")
+    
+    if not validate_date_format(to_date):
+        raise HTTPException(status_code=400, detail="終了日の形式が正しくありません (YYYY-MM-DD)")
+    
+    try:
+        if count_days_in_range(from_date, to_date) > DAYS_MAX_DAYS:
+            raise HTTPException(status_code=400, detail=f"期間は{DAYS_MAX_DAYS}日以内で指定してください")
+        
+        return await _build_multi_day_response(from_date, to_date)
+        
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"データ取得エラー: {str(e)}")
+
+
+@app.get("/api/week/{date}", response_model=MultiDayResponse)
+async def get_week_data(date: str):
+    """指定日を含む週（月曜始まり）の全日分のスロットを取得"""
+    # 日付バリデーション
+    if not validate_date_format(date):
+        raise HTTPException(status_code=400, detail="日付形式が正しくありません (YYYY-MM-DD)")
+    
+    try:
+        start_date, end_date, _ = get_week_dates(date)
+        return await _build_multi_day_response(start_date, end_date)
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"データ取得エラー: {str(e)}")
 
 
+async def _build_multi_day_response(start_date: str, end_date: str) -> MultiDayResponse:
+    """期間のスロット配列をレスポンス形式にまとめる"""
+    days = await get_range_day_slots(start_date, end_date)
+    return MultiDayResponse(
+        start_date=start_date,
+        end_date=end_date,
+        start_times=[start_time for _, start_time in get_all_time_slots()],
+        days=[{'date': date, **slots} for date, slots in days.items()]
+    )
+
+
 @app.post("/api/block")
 async def update_block(request: BlockRequest):
     """単一ブロックをUpsert（挿入/更新）"""
@@ -154,7 +263,7 @@ async def update_block(request: BlockRequest):
         raise HTTPException(status_code=400, detail="日付形式が正しくありません (YYYY-MM-DD)")
     
     try:
-        success = upsert_block(
+        success = await upsert_block(
             date=request.date,
             slot_index=request.slot_index,
             category=request.category,
@@ -175,51 +284,105 @@ async def update_block(request: BlockRequest):
 
 @app.post("/api/bulk")
 async def bulk_update_blocks(request: BulkBlockRequest):
-    """複数ブロックを一括更新"""
+    """
+    複数ブロックを一括更新
+    不正な行があっても有効な行は書き込み、行ごとの結果（accepted / rejected / unchanged）を返す
+    """
     if not request.blocks:
         raise HTTPException(status_code=400, detail="更新するブロックが指定されていません")
     
     try:
-        # リクエストデータを辞書リストに変換
-        blocks_data = []
-        for block in request.blocks:
-            if not validate_date_format(block.date):
-                raise HTTPException(status_code=400, detail=f"日付形式が正しくありません: {block.date}")
-            
-            blocks_data.append({
-                'date': block.date,
-                'slot_index': block.slot_index,
-                'category': block.category,
-                'focus': block.focus,
-                'memo': block.memo
-            })
+        # 検証は行ごとに bulk_upsert_blocks で行う
+        report = await bulk_upsert_blocks([block.model_dump() for block in request.blocks])
         
-        processed_count = bulk_upsert_blocks(blocks_data)
+        return {
+            "message": (f"{report['accepted']} 件のブロックを更新しました"
+                        f"（変更なし {report['unchanged']} 件, 除外 {report['rejected']} 件）"),
+            "processed": report['accepted'],
+            "requested": len(request.blocks),
+            **report
+        }
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"一括更新エラー: {str(e)}")
+
+
+@app.post("/api/range")
+async def update_block_range(request: BlockRangeRequest):
+    """時刻範囲（終了時刻は含まない）のブロックを同じ値で一括Upsert"""
+    # 日付バリデーション
+    if not validate_date_format(request.date):
+        raise HTTPException(status_code=400, detail="日付形式が正しくありません (YYYY-MM-DD)")
+    
+    try:
+        first_slot, last_slot = time_range_to_slots(request.start_time, request.end_time)
+        updated = await upsert_block_range(
+            date=request.date,
+            first_slot=first_slot,
+            last_slot=last_slot,
+            category=request.category,
+            focus=request.focus,
+            memo=request.memo
+        )
         
         return {
-            "message": f"{processed_count} 件のブロックを更新しました",
-            "processed": processed_count,
-            "requested": len(request.blocks)
+            "message": f"{updated} 件のブロックを更新しました",
+            "success": True,
+            "start_slot": first_slot,
+            "end_slot": last_slot,
+            "updated": updated
         }
         
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"一括更新エラー: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"範囲更新エラー: {str(e)}")
+
+
+@app.post("/api/range/clear")
+async def clear_blocks_in_range(request: BlockRangeClearRequest):
+    """時刻範囲（終了時刻は含まない）のブロックを未入力に戻す"""
+    # 日付バリデーション
+    if not validate_date_format(request.date):
+        raise HTTPException(status_code=400, detail="日付形式が正しくありません (YYYY-MM-DD)")
+    
+    try:
+        first_slot, last_slot = time_range_to_slots(request.start_time, request.end_time)
+        cleared = await clear_block_range(request.date, first_slot, last_slot)
+        
+        return {
+            "message": f"{cleared} 件のブロックをクリアしました",
+            "success": True,
+            "start_slot": first_slot,
+            "end_slot": last_slot,
+            "cleared": cleared
+        }
+        
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"範囲クリアエラー: {str(e)}")
 
 
 # === サマリエンドポイント ===
 
 @app.get("/api/summary/{date}", response_model=DailySummary)
-async def get_daily_summary(date: str):
-    """指定日のフォーカスサマリを取得"""
+async def get_daily_summary(request: Request, date: str):
+    """
+    指定日のフォーカスサマリを取得
+    If-None-Match が日付・カテゴリのバージョンに一致すれば集計せずに 304 を返す
+    """
     # 日付バリデーション
     if not validate_date_format(date):
         raise HTTPException(status_code=400, detail="日付形式が正しくありません (YYYY-MM-DD)")
     
     try:
-        summary = calculate_daily_summary(date)
-        return summary
+        etag = _make_etag("summary", await get_data_versions(date), date)
+        if _etag_matches(request, etag):
+            return _not_modified(etag)
+        
+        summary = await calculate_daily_summary(date)
+        return JSONResponse(content=summary.model_dump(), headers=_etag_headers(etag))
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"サマリ計算エラー: {str(e)}")
@@ -228,9 +391,16 @@ async def get_daily_summary(date: str):
 @app.get("/api/trend", response_model=TrendResponse)
 async def get_trend_data(
     from_date: str = Query(..., alias="from", description="開始日 (YYYY-MM-DD)"),
-    to_date: str = Query(..., alias="to", description="終了日 (YYYY-MM-DD)")
+    to_date: str = Query(..., alias="to", description="終了日 (YYYY-MM-DD)"),
+    response_format: str = Query("objects", alias="format", description="objects / columnar")
 ):
-    """期間推移データを取得"""
+    """
+    期間推移データを取得
+    format=columnar では日付・各指標の並列配列を返す
+    """
+    if response_format not in RESPONSE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format は {'/'.join(RESPONSE_FORMATS)} で指定してください")
+    
     # 日付バリデーション
     if not validate_date_format(from_date):
         raise HTTPException(status_code=400, detail="開始日の形式が正しくありません (YYYY-MM-DD)")
@@ -239,27 +409,110 @@ async def get_trend_data(
         raise HTTPException(status_code=400, detail="終了日の形式が正しくありません (YYYY-MM-DD)")
     
     try:
-        # 日付範囲チェック
-        date_list = get_date_range(from_date, to_date)
-        if len(date_list) > 90:  # 最大90日間に制限
-            raise HTTPException(status_code=400, detail="期間は90日以内で指定してください")
+        # 日付範囲チェック（日次サマリ参照のため複数年でも軽量）
+        if count_days_in_range(from_date, to_date) > TREND_MAX_DAYS:
+            raise HTTPException(status_code=400, detail=f"期間は{TREND_MAX_DAYS}日以内で指定してください")
         
-        trend_data = calculate_trend_data(from_date, to_date)
+        trend_data = await calculate_trend_data(from_date, to_date)
+        if response_format == 'columnar':
+            return JSONResponse(content=to_columnar_trend(trend_data).model_dump())
         return trend_data
         
+    except HTTPException:
+        raise
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"推移データ計算エラー: {str(e)}")
 
 
+@app.get("/api/rolling", response_model=RollingResponse)
+async def get_rolling_data(
+    from_date: str = Query(..., alias="from", description="開始日 (YYYY-MM-DD)"),
+    to_date: str = Query(..., alias="to", description="終了日 (YYYY-MM-DD)"),
+    metric: Optional[str] = Query(None, description="指標名（カンマ区切り、省略時は全指標）"),
+    window: str = Query("7,30", description="窓の日数（カンマ区切り）")
+):
+    """
+    日次サマリ指標の移動合計・移動平均・前週比を取得
+    各日を終端とする直近N日の窓で集計する（累積和の差で求めるため長い窓・期間でも軽量）
+    """
+    if not validate_date_format(from_date):
+        raise HTTPException(status_code=400, detail="開始日の形式が正しくありません (YYYY-MM-DD)")
+    
+    if not validate_date_format(to_date):
+        raise HTTPException(status_code=400, detail="終了日の形式が正しくありません (YYYY-MM-DD)")
+    
+    try:
+        windows = sorted({int(value) for value in window.split(',') if value.strip()})
+    except ValueError:
+        raise HTTPException(status_code=400, detail="window は日数をカンマ区切りで指定してください")
+    if not windows or windows[0] < 1 or windows[-1] > ROLLING_MAX_WINDOW:
+        raise HTTPException(status_code=400, detail=f"window は1〜{ROLLING_MAX_WINDOW}日で指定してください")
+    
+    metrics = [value.strip() for value in metric.split(',') if value.strip()] if metric else None
+    
+    try:
+        if count_days_in_range(from_date, to_date) > TREND_MAX_DAYS:
+            raise HTTPException(status_code=400, detail=f"期間は{TREND_MAX_DAYS}日以内で指定してください")
+        
+        return await calculate_rolling_data(from_date, to_date, windows, metrics)
+        
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"移動窓集計エラー: {str(e)}")
+
+
+@app.get("/api/rollup/{granularity}", response_model=RollupResponse)
+async def get_rollup_data(
+    granularity: str,
+    from_date: str = Query(..., alias="from", description="開始日 (YYYY-MM-DD)"),
+    to_date: str = Query(..., alias="to", description="終了日 (YYYY-MM-DD)")
+):
+    """
+    週（ISO週）・月・年ごとの集計を取得
+    範囲の端にかかる期間も期間全体の値を返す
+    """
+    if granularity not in ROLLUP_GRANULARITIES:
+        raise HTTPException(status_code=400, detail=f"集計期間は {'/'.join(ROLLUP_GRANULARITIES)} で指定してください")
+    
+    if not validate_date_format(from_date):
+        raise HTTPException(status_code=400, detail="開始日の形式が正しくありません (YYYY-MM-DD)")
+    
+    if not validate_date_format(to_date):
+        raise HTTPException(status_code=400, detail="終了日の形式が正しくありません (YYYY-MM-DD)")
+    
+    try:
+        if count_days_in_range(from_date, to_date) > TREND_MAX_DAYS:
+            raise HTTPException(status_code=400, detail=f"期間は{TREND_MAX_DAYS}日以内で指定してください")
+        
+        return await calculate_rollups(granularity, from_date, to_date)
+        
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"期間集計エラー: {str(e)}")
+
+
 # === カテゴリエンドポイント ===
 
 @app.get("/api/categories", response_model=List[CategoryModel])
-async def get_categories():
-    """全カテゴリを順序付きで取得"""
+async def get_categories(request: Request):
+    """
+    全カテゴリを順序付きで取得
+    If-None-Match がカテゴリのバージョンに一致すれば 304 を返す
+    """
     try:
-        db_categories = get_all_categories()
+        etag = _make_etag("categories", await get_data_versions())
+        if _etag_matches(request, etag):
+            return _not_modified(etag)
+        
+        db_categories = await get_all_categories()
         
         # DBCategoryをCategoryModelに変換
         categories = []
@@ -272,7 +525,8 @@ async def get_categories():
                 order_index=db_cat.order_index
             ))
         
-        return categories
+        return JSONResponse(content=[category.model_dump() for category in categories],
+                            headers=_etag_headers(etag))
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"カテゴリ取得エラー: {str(e)}")
@@ -291,7 +545,7 @@ async def get_ai_suggestions(date: str):
         raise HTTPException(status_code=400, detail="日付形式が正しくありません (YYYY-MM-DD)")
     
     try:
-        suggestions = get_daily_suggestions(date)
+        suggestions = await get_daily_suggestions(date)
         return suggestions
         
     except Exception as e:
@@ -303,19 +557,57 @@ async def get_ai_suggestions(date: str):
         )
 
 
+@app.get("/api/ai/suggestions/{date}/stream")
+async def stream_ai_suggestions(date: str):
+    """
+    指定日の改善提案を Server-Sent Events で逐次返す
+    rules（ルールベース）→ token / suggestion（LLM応答の差分・確定した提案）→ done（最終的な AIResponse）
+    """
+    if not validate_date_format(date):
+        raise HTTPException(status_code=400, detail="日付形式が正しくありません (YYYY-MM-DD)")
+    
+    async def events():
+        try:
+            async for event, data in stream_daily_suggestions(date):
+                yield _sse_event(event, data)
+        except Exception as e:
+            # 提案生成エラーでも done で終える（通常エンドポイントと同じフォールバック）
+            yield _sse_event("done", AIResponse(
+                suggestions=[f"提案生成エラー: {str(e)}"],
+                summary="システムエラーにより提案を生成できませんでした。",
+                is_ai_generated=False
+            ).model_dump())
+    
+    return StreamingResponse(events(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"  # リバースプロキシでのバッファリングを止める
+    })
+
+
+def _sse_event(event: str, data: Dict) -> str:
+    """Server-Sent Events の1イベントを組み立てる"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
 # === システム情報エンドポイント ===
 
 @app.get("/api/stats")
 async def get_system_stats():
     """システム統計情報を取得"""
     try:
-        db_stats = get_database_stats()
+        db_stats = await get_database_stats()
         
         # 環境変数チェック
         has_llm_key = bool(os.getenv('LLM_API_KEY'))
         
         return {
             "database": db_stats,
+            "db_executor": get_executor_stats(),
+            "write_buffer": get_write_buffer_stats(),
+            "result_cache": get_result_cache_stats(),
+            "llm_cache": await get_llm_cache_stats(),
+            "llm_client": get_llm_client_stats(),
+            "rescore": await get_rescore_status(),
             "environment": {
                 "has_llm_api_key": has_llm_key,
                 "current_date": get_today()
@@ -327,14 +619,23 @@ async def get_system_stats():
         raise HTTPException(status_code=500, detail=f"統計取得エラー: {str(e)}")
 
 
+@app.get("/api/precompute/status")
+async def get_precompute_job_status():
+    """夜間事前計算のスケジューラー状態と最近の実行の進捗を取得"""
+    try:
+        return await get_precompute_status()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"事前計算状態取得エラー: {str(e)}")
+
+
 # === デバッグエンドポイント（開発用） ===
 
 @app.get("/api/debug/reset")
 async def debug_reset_database():
     """デバッグ用：データベースを完全リセット"""
     try:
-        from .db import reset_database
-        reset_database()
+        from .async_db import reset_database
+        await reset_database()
         
         return {
             "message": "データベースをリセットしました",
@@ -354,7 +655,7 @@ async def startup_event():
     
     # データベース初期化
     try:
-        init_database()
+        await init_database()
         print("OK: Database initialized")
     except Exception as e:
         print(f"ERROR: Database initialization failed: {e}")
@@ -366,6 +667,19 @@ async def startup_event():
     else:
         print("INFO: LLM API Key not set (rule-based suggestions only)")
     
+    # 夜間事前計算（FOCUS_RING_PRECOMPUTE_AT 設定時）
+    try:
+        scheduler = start_precompute_scheduler()
+        if scheduler:
+            print(f"OK: Precompute scheduled daily at {scheduler.at}")
+    except ValueError as e:
+        print(f"ERROR: Precompute scheduler not started: {e}")
+    
+    # 重み変更後の再計算スイーパー（FOCUS_RING_RESCORE_INTERVAL=0 で無効）
+    sweeper = start_rescore_sweeper()
+    if sweeper:
+        print(f"OK: Rescore sweeper every {sweeper.interval:g}s")
+    
     print("OK: Focus Ring API Server ready")
     print("INFO: Access http://localhost:8000 in your browser")
 
@@ -373,6 +687,10 @@ async def startup_event():
 @app.on_event("shutdown")
 async def shutdown_event():
     """アプリケーション終了時の処理"""
+    await stop_precompute_scheduler()
+    await stop_rescore_sweeper()
+    await flush_writes()
+    shutdown_db_executor()
     print("INFO: Focus Ring API Server stopped")
 
 
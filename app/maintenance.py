@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""
+Focus Ring - メンテナンスコマンド
+日次サマリの再構築・整合性チェックなどの運用タスク
+
+使い方:
+    python -m app.maintenance rebuild-summaries [--from YYYY-MM-DD] [--to YYYY-MM-DD] [--engine ENGINE]
+    python -m app.maintenance check-summaries [--from YYYY-MM-DD] [--to YYYY-MM-DD] [--engine ENGINE] [--fix]
+    python -m app.maintenance rebuild-rollups
+    python -m app.maintenance convert-storage --to {rows,vector}
+    python -m app.maintenance precompute [--date YYYY-MM-DD] [--days N] [--concurrency N] [--force]
+    python -m app.maintenance set-weight CODE WEIGHT [--from YYYY-MM-DD]
+    python -m app.maintenance weight-history [--code CODE]
+    python -m app.maintenance rescore-stale [--engine ENGINE]
+"""
+
+import argparse
+import asyncio
+import sys
+from typing import List, Optional
+
+from .db import (init_database, rebuild_daily_summaries, rebuild_summary_rollups, convert_storage, STORAGE_MODES,
+                 set_category_weight, get_category_weight_history, refresh_stale_summaries, count_stale_summaries)
+from .summarizer import check_daily_summaries, SCORING_ENGINES
+from .precompute import PRECOMPUTE_DAYS, PRECOMPUTE_CONCURRENCY
+from .utils import validate_date_format
+
+
+# === コマンド実装 ===
+
+def command_rebuild_summaries(args: argparse.Namespace) -> int:
+    """日次サマリを blocks から再構築"""
+    rebuilt = rebuild_daily_summaries(args.from_date, args.to_date, engine=args.engine)
+    print(f"日次サマリ {rebuilt} 日分を再構築しました。")
+    return 0
+
+
+def command_check_summaries(args: argparse.Namespace) -> int:
+    """日次サマリの整合性をチェック（--fix で不一致日を再構築）"""
+    mismatches = check_daily_summaries(args.from_date, args.to_date, engine=args.engine)
+    
+    if not mismatches:
+        print("日次サマリは全て整合しています。")
+        return 0
+    
+    for mismatch in mismatches:
+        print(f"  {mismatch['date']} {mismatch['field']}: "
+              f"保存値={mismatch['stored']} 再計算値={mismatch['expected']}")
+    
+    dates = sorted({mismatch['date'] for mismatch in mismatches})
+    print(f"不一致: {len(mismatches)} 件（{len(dates)} 日）")
+    
+    if args.fix:
+        for date in dates:
+            rebuild_daily_summaries(date, date, engine=args.engine)
+        print(f"{len(dates)} 日分を再構築しました。")
+        return 0
+    
+    return 1
+
+
+def command_rebuild_rollups(args: argparse.Namespace) -> int:
+    """週・月・年の集計を日次サマリから作り直す"""
+    periods = rebuild_summary_rollups()
+    print(f"週・月・年集計 {periods} 期間分を再構築しました。")
+    return 0
+
+
+def command_convert_storage(args: argparse.Namespace) -> int:
+    """ブロックデータの保存形式を変換"""
+    converted = convert_storage(args.target)
+    print(f"{converted} 日分を {args.target} 形式に変換しました。")
+    print(f"以後は FOCUS_RING_STORAGE={args.target} を設定して起動してください。")
+    return 0
+
+
+def command_precompute(args: argparse.Namespace) -> int:
+    """最近入力のあった日のサマリ・改善提案を事前計算（中断された実行は続きから再開）"""
+    from .async_db import shutdown_db_executor
+    from .precompute import run_precompute
+    
+    try:
+        result = asyncio.run(run_precompute(args.date, days=args.days,
+                                            concurrency=args.concurrency, force=args.force))
+    finally:
+        shutdown_db_executor()
+    
+    if result['status'] == 'skipped':
+        print(f"{result['anchor_date']}: {result['reason']}")
+        return 1
+    
+    if result['resumed'] and result['processed'] == 0:
+        print(f"{result['anchor_date']}: 事前計算は完了済みです（やり直す場合は --force）")
+        return 0
+    
+    resumed = "（前回の続きから再開）" if result['resumed'] else ""
+    print(f"{result['anchor_date']} までの {result['processed']} 日分を事前計算しました"
+          f"{resumed}: {result['elapsed_seconds']}秒")
+    for date, reason in result['failed'].items():
+        print(f"  失敗 {date}: {reason}")
+    return 1 if result['failed'] else 0
+
+
+def command_set_weight(args: argparse.Namespace) -> int:
+    """カテゴリの重みを適用開始日から変更（日次サマリは後から計算し直す）"""
+    try:
+        version = set_category_weight(args.code, args.weight, args.from_date)
+    except ValueError as e:
+        print(f"エラー: {e}")
+        return 1
+    
+    print(f"{args.code} の重みを {args.weight} に変更しました（変更番号 {version}）。")
+    print(f"計算し直しが必要な日次サマリ: {count_stale_summaries()} 日"
+          f"（読み出し時・再計算スイーパー・rescore-stale で計算し直されます）")
+    return 0
+
+
+def command_weight_history(args: argparse.Namespace) -> int:
+    """カテゴリの重みの履歴を表示"""
+    for entry in get_category_weight_history(args.code):
+        print(f"  {entry['code']}: {entry['effective_from']} から {entry['weight']} (変更番号 {entry['version']})")
+    return 0
+
+
+def command_rescore_stale(args: argparse.Namespace) -> int:
+    """重みの変更前に計算された日次サマリを全て計算し直す"""
+    stale = count_stale_summaries()
+    while refresh_stale_summaries(limit=200, engine=args.engine):
+        pass
+    print(f"日次サマリ {stale} 日分を計算し直しました。")
+    return 0
+
+
+# === エントリポイント ===
+
+def build_parser() -> argparse.ArgumentParser:
+    """コマンドライン引数パーサーを構築"""
+    parser = argparse.ArgumentParser(prog="python -m app.maintenance",
+                                     description="Focus Ring メンテナンスコマンド")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    rebuild = subparsers.add_parser("rebuild-summaries", help="日次サマリを再構築")
+    check = subparsers.add_parser("check-summaries", help="日次サマリの整合性をチェック")
+    check.add_argument("--fix", action="store_true", help="不一致日を再構築する")
+    rollups = subparsers.add_parser("rebuild-rollups", help="週・月・年の集計を日次サマリから再構築")
+    convert = subparsers.add_parser("convert-storage", help="ブロックデータの保存形式を変換")
+    convert.add_argument("--to", dest="target", choices=STORAGE_MODES, required=True,
+                         help="変換先の保存形式 (vector: 1日1行の圧縮形式)")
+    precompute = subparsers.add_parser("precompute", help="最近の日のサマリ・改善提案を事前計算")
+    precompute.add_argument("--date", default=None, help="基準日 (YYYY-MM-DD, 省略時は前日)")
+    precompute.add_argument("--days", type=int, default=PRECOMPUTE_DAYS, help="基準日から遡る日数")
+    precompute.add_argument("--concurrency", type=int, default=PRECOMPUTE_CONCURRENCY,
+                            help="同時に処理する日数の上限")
+    precompute.add_argument("--force", action="store_true", help="完了済みの実行もやり直す")
+    set_weight = subparsers.add_parser("set-weight", help="カテゴリの重みを適用開始日から変更")
+    set_weight.add_argument("code", help="カテゴリコード")
+    set_weight.add_argument("weight", type=int, help="新しい重み (-4 から 4)")
+    set_weight.add_argument("--from", dest="from_date", default=None, help="適用開始日 (YYYY-MM-DD, 省略時は今日)")
+    history = subparsers.add_parser("weight-history", help="カテゴリの重みの履歴を表示")
+    history.add_argument("--code", default=None, help="カテゴリコード（省略時は全カテゴリ）")
+    rescore = subparsers.add_parser("rescore-stale", help="重みの変更前に計算された日次サマリを計算し直す")
+    rescore.add_argument("--engine", choices=SCORING_ENGINES, default="auto",
+                         help="スコアリングエンジン (auto: NumPyがあればベクトル化版)")
+    
+    for sub in (rebuild, check):
+        sub.add_argument("--from", dest="from_date", default=None, help="開始日 (YYYY-MM-DD)")
+        sub.add_argument("--to", dest="to_date", default=None, help="終了日 (YYYY-MM-DD)")
+        sub.add_argument("--engine", choices=SCORING_ENGINES, default="auto",
+                         help="スコアリングエンジン (auto: NumPyがあればベクトル化版)")
+    
+    rebuild.set_defaults(handler=command_rebuild_summaries)
+    check.set_defaults(handler=command_check_summaries)
+    rollups.set_defaults(handler=command_rebuild_rollups)
+    convert.set_defaults(handler=command_convert_storage)
+    precompute.set_defaults(handler=command_precompute)
+    set_weight.set_defaults(handler=command_set_weight)
+    history.set_defaults(handler=command_weight_history)
+    rescore.set_defaults(handler=command_rescore_stale)
+    
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    
+    for value in (getattr(args, 'from_date', None), getattr(args, 'to_date', None), getattr(args, 'date', None)):
+        if value is not None and not validate_date_format(value):
+            parser.error(f"日付形式が正しくありません: {value} (YYYY-MM-DD)")
+    
+    init_database()
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,10 +5,14 @@ Focus Ring - Pydanticモデル定義
 """
 
 from datetime import datetime, date
-from typing import Optional, List
+from typing import Optional, List, Dict
 from pydantic import BaseModel, Field
 
 
+# メモの最大文字数
+MEMO_MAX_LENGTH = 200
+
+
 # === APIリクエスト/レスポンスモデル ===
 
 class BlockRequest(BaseModel):
@@ -17,7 +21,24 @@ class BlockRequest(BaseModel):
     slot_index: int = Field(..., ge=0, le=79, description="スロットインデックス (0-79)")
     category: Optional[str] = Field(None, description="カテゴリコード")
     focus: Optional[int] = Field(None, ge=1, le=5, description="集中度 (1-5)")
-    memo: Optional[str] = Field(None, max_length=200, description="メモ")
+    memo: Optional[str] = Field(None, max_length=MEMO_MAX_LENGTH, description="メモ")
+
+
+class BlockRangeRequest(BaseModel):
+    """スロット範囲更新リクエストモデル（終了時刻は含まない）"""
+    date: str = Field(..., description="日付 (YYYY-MM-DD)")
+    start_time: str = Field(..., description="開始時刻 (HH:MM)")
+    end_time: str = Field(..., description="終了時刻 (HH:MM, 24:00 まで)")
+    category: Optional[str] = Field(None, description="カテゴリコード")
+    focus: Optional[int] = Field(None, ge=1, le=5, description="集中度 (1-5)")
+    memo: Optional[str] = Field(None, max_length=MEMO_MAX_LENGTH, description="メモ")
+
+
+class BlockRangeClearRequest(BaseModel):
+    """スロット範囲クリアリクエストモデル（終了時刻は含まない）"""
+    date: str = Field(..., description="日付 (YYYY-MM-DD)")
+    start_time: str = Field(..., description="開始時刻 (HH:MM)")
+    end_time: str = Field(..., description="終了時刻 (HH:MM, 24:00 まで)")
 
 
 class BlockResponse(BaseModel):
@@ -32,9 +53,34 @@ class BlockResponse(BaseModel):
     updated_at: Optional[datetime]
 
 
+class DaySlots(BaseModel):
+    """1日分のスロット配列（複数日取得用の圧縮形式）"""
+    date: str
+    category: List[Optional[str]] = Field(..., description="スロット順のカテゴリコード（80個、未入力は null）")
+    focus: List[Optional[int]] = Field(..., description="スロット順の集中度（80個、未設定は null）")
+    memo: Dict[int, str] = Field(..., description="スロット番号 -> メモ（メモのあるスロットのみ）")
+
+
+class MultiDayResponse(BaseModel):
+    """複数日のスロット配列レスポンス"""
+    start_date: str
+    end_date: str
+    start_times: List[str] = Field(..., description="スロット順の開始時刻（80個）")
+    days: List[DaySlots] = Field(..., description="日付順の日ごとのスロット配列")
+
+
+class BulkBlockItem(BaseModel):
+    """一括更新の1行（値の範囲は行ごとに検証し、不正な行は結果レポートで除外する）"""
+    date: str = Field(..., description="日付 (YYYY-MM-DD)")
+    slot_index: int = Field(..., description="スロットインデックス (0-79)")
+    category: Optional[str] = Field(None, description="カテゴリコード")
+    focus: Optional[int] = Field(None, description="集中度 (1-5)")
+    memo: Optional[str] = Field(None, description=f"メモ（{MEMO_MAX_LENGTH}文字以内）")
+
+
 class BulkBlockRequest(BaseModel):
     """複数ブロック一括更新リクエストモデル"""
-    blocks: List[BlockRequest] = Field(..., description="ブロックリスト")
+    blocks: List[BulkBlockItem] = Field(..., description="ブロックリスト")
 
 
 class CategoryModel(BaseModel):
@@ -81,6 +127,67 @@ class TrendResponse(BaseModel):
     period_avg_productive: float = Field(..., description="期間平均生産的時間")
 
 
+class TrendColumnarResponse(BaseModel):
+    """推移データレスポンス（列指向の圧縮形式: 日付順の並列配列）"""
+    format: str = "columnar"
+    dates: List[str]
+    focus_score: List[float]
+    productive_hours: List[float]
+    distract_hours: List[float]
+    period_avg_score: float = Field(..., description="期間平均フォーカススコア")
+    period_avg_productive: float = Field(..., description="期間平均生産的時間")
+
+
+class RollingMetricSeries(BaseModel):
+    """移動窓集計の1指標分（日付順の並列配列）"""
+    moving_sum: Dict[int, List[float]] = Field(..., description="窓の日数 -> 移動合計")
+    moving_avg: Dict[int, List[Optional[float]]] = Field(
+        ..., description="窓の日数 -> 移動平均（入力のある日で平均、窓内に入力がなければ null）"
+    )
+    wow_delta: List[Optional[float]] = Field(
+        ..., description="直近7日の平均と前の7日の平均の差（どちらかに入力がなければ null）"
+    )
+
+
+class RollingResponse(BaseModel):
+    """移動窓集計レスポンス（列指向: 日付順の並列配列）"""
+    start_date: str
+    end_date: str
+    windows: List[int] = Field(..., description="窓の日数（終了日を含む直近N日）")
+    dates: List[str]
+    days_with_data: Dict[int, List[int]] = Field(..., description="窓の日数 -> 窓内の入力のある日数")
+    metrics: Dict[str, RollingMetricSeries] = Field(..., description="指標名 -> 移動窓集計")
+
+
+class RollupPeriod(BaseModel):
+    """週・月・年の1期間分の集計"""
+    period: str = Field(..., description="期間キー (2024-W03 / 2024-01 / 2024)")
+    start_date: str
+    end_date: str
+    days: int = Field(..., description="入力のあった日数")
+    avg_focus_score: float = Field(..., description="入力のあった日の平均フォーカススコア")
+    raw_score: float = Field(..., description="重み合計の生スコア")
+    deep_streak_max: int = Field(..., description="期間内の最大連続集中ブロック数")
+    context_switches: int = Field(..., description="カテゴリ切替回数")
+    productive_blocks: int = Field(..., description="生産的ブロック数 (weight > 0)")
+    distract_blocks: int = Field(..., description="妨害ブロック数 (weight < 0)")
+    neutral_blocks: int = Field(..., description="中性ブロック数 (weight = 0)")
+    total_filled: int = Field(..., description="入力済み総ブロック数")
+    productive_hours: float = Field(..., description="生産的時間 (時)")
+    distract_hours: float = Field(..., description="妨害時間 (時)")
+    distract_ratio: float = Field(..., description="妨害時間割合")
+    avg_focus_productive: Optional[float] = Field(None, description="生産的ブロックの平均集中度")
+    category_hours: Dict[str, float] = Field(..., description="カテゴリコード -> 時間")
+
+
+class RollupResponse(BaseModel):
+    """週・月・年集計レスポンス"""
+    granularity: str = Field(..., description="week / month / year")
+    start_date: str
+    end_date: str
+    periods: List[RollupPeriod] = Field(..., description="日付範囲と重なる期間（入力のない期間は含まない）")
+
+
 class AIResponse(BaseModel):
     """AI提案レスポンス"""
     suggestions: List[str] = Field(..., description="改善提案リスト")
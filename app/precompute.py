@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+"""
+Focus Ring - 夜間事前計算
+朝に前日の振り返りを開くアクセスが集中する前に、最近入力のあった日の日次サマリと改善提案を計算しておく。
+LLMの応答は永続キャッシュ（llm_responses）に、サマリ・提案の結果はプロセス内の結果キャッシュに載る。
+
+進捗は precompute_runs / precompute_items に日ごとに記録し、中断された実行は次回の起動で続きから再開する。
+"""
+
+import asyncio
+import os
+import socket
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from . import db
+from .async_db import run_db, calculate_daily_summary, get_daily_suggestions
+from .summarizer import check_daily_summaries
+from .utils import get_yesterday, parse_date, format_date
+from .write_buffer import flushed
+
+
+# 事前計算設定（実行時刻が空なら定期実行しない）
+PRECOMPUTE_AT = os.getenv('FOCUS_RING_PRECOMPUTE_AT', '')  # 毎日の実行時刻 "HH:MM"（ローカル時刻）
+PRECOMPUTE_DAYS = int(os.getenv('FOCUS_RING_PRECOMPUTE_DAYS', '7'))
+PRECOMPUTE_CONCURRENCY = int(os.getenv('FOCUS_RING_PRECOMPUTE_CONCURRENCY', '2'))
+PRECOMPUTE_LEASE = float(os.getenv('FOCUS_RING_PRECOMPUTE_LEASE', '300'))
+
+
+# === 事前計算ジョブ ===
+
+def _owner() -> str:
+    """実行者の識別子（ホスト名:プロセスID）"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+async def run_precompute(anchor_date: Optional[str] = None, days: int = PRECOMPUTE_DAYS,
+                         concurrency: int = PRECOMPUTE_CONCURRENCY, force: bool = False) -> Dict[str, Any]:
+    """
+    基準日までの最近入力のあった日を事前計算
+    
+    Args:
+        anchor_date: 基準日 (YYYY-MM-DD, 省略時は前日)
+        days: 基準日から遡る日数（基準日を含む）
+        concurrency: 同時に処理する日数の上限
+        force: 完了済みの実行もやり直す
+    
+    Returns:
+        {anchor_date, status, resumed, processed, failed: {日付: 理由}, elapsed_seconds}
+        （他のプロセスが実行中なら status='skipped'）
+    """
+    anchor_date = anchor_date or get_yesterday()
+    start_date = format_date(parse_date(anchor_date) - timedelta(days=max(1, days) - 1))
+    started = time.perf_counter()
+    
+    dates = await run_db(flushed(db.get_summary_dates), start_date, anchor_date)
+    claim = await run_db(db.claim_precompute_run, anchor_date, dates, _owner(), PRECOMPUTE_LEASE, force)
+    if claim is None:
+        return {'anchor_date': anchor_date, 'status': 'skipped', 'reason': "他のプロセスが実行中です"}
+    
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    failed: Dict[str, str] = {}
+    
+    async def process(date: str):
+        async with semaphore:
+            status, error = await _precompute_date(date)
+            await run_db(db.record_precompute_item, anchor_date, date, status, error)
+            if error:
+                failed[date] = error
+    
+    try:
+        await asyncio.gather(*(process(date) for date in claim['pending']))
+    except asyncio.CancelledError:
+        # 停止時は未処理の日付を残して中断（次回の実行で続きから再開する）
+        # 終了状態の記録はキャンセルされないよう保護し、DB専用スレッドで行う
+        await asyncio.shield(run_db(db.finish_precompute_run, anchor_date, db.PRECOMPUTE_FAILED))
+        raise
+    
+    status = db.PRECOMPUTE_FAILED if failed else db.PRECOMPUTE_DONE
+    await run_db(db.finish_precompute_run, anchor_date, status)
+    
+    return {
+        'anchor_date': anchor_date,
+        'status': status,
+        'resumed': claim['resumed'],
+        'attempts': claim['attempts'],
+        'processed': len(claim['pending']),
+        'failed': failed,
+        'elapsed_seconds': round(time.perf_counter() - started, 2)
+    }
+
+
+async def _precompute_date(date: str) -> Tuple[str, Optional[str]]:
+    """
+    1日分を事前計算
+    
+    Returns:
+        (状態, 失敗理由)
+    """
+    try:
+        # 推移・サマリが参照するマテリアライズ済みサマリを検証し、ずれていれば再構築
+        # （値が変わった日はバージョンが進むため、直後の計算は結果キャッシュの古い値を返さない）
+        if await run_db(flushed(check_daily_summaries), date, date):
+            await run_db(db.rebuild_daily_summaries, date, date)
+        
+        await calculate_daily_summary(date)
+        response = await get_daily_suggestions(date)
+    except Exception as e:
+        return db.PRECOMPUTE_FAILED, str(e)
+    
+    if os.getenv('LLM_API_KEY') and not response.is_ai_generated:
+        # ルールベースに落ちた日は次回の実行で再試行する
+        return db.PRECOMPUTE_FAILED, "LLMが利用できずルールベースの提案になりました"
+    return db.PRECOMPUTE_DONE, None
+
+
+# === 定期実行 ===
+
+def parse_schedule_time(value: str) -> Tuple[int, int]:
+    """
+    "HH:MM" を (時, 分) に変換
+    
+    Raises:
+        ValueError: 形式が正しくない場合
+    """
+    try:
+        hour, minute = (int(part) for part in value.split(':'))
+    except ValueError:
+        raise ValueError(f"実行時刻の形式が正しくありません: {value} (HH:MM)")
+    if not (0 <= hour < 24 and 0 <= minute < 60):
+        raise ValueError(f"実行時刻の形式が正しくありません: {value} (HH:MM)")
+    return hour, minute
+
+
+class PrecomputeScheduler:
+    """
+    毎日決まった時刻に run_precompute を実行する asyncio タスク
+    
+    複数ワーカーで起動しても、同じ基準日の実行は DB 上の実行権で1プロセスに絞られる。
+    """
+    
+    def __init__(self, at: str = PRECOMPUTE_AT):
+        self.at = at
+        self.hour, self.minute = parse_schedule_time(at)
+        self.next_run_at: Optional[datetime] = None
+        self.running = False
+        self.last_result: Optional[Dict[str, Any]] = None
+        self._task: Optional[asyncio.Task] = None
+    
+    def start(self):
+        """定期実行を開始（実行中のイベントループ上で呼ぶ）"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
+    
+    async def stop(self):
+        """定期実行を停止（実行中のジョブは中断され、次回再開される）"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    def _next_run(self, now: datetime) -> datetime:
+        """now より後の次回実行時刻"""
+        next_run = now.replace(hour=self.hour, minute=self.minute, second=0, microsecond=0)
+        if next_run <= now:
+            next_run += timedelta(days=1)
+        return next_run
+    
+    async def _loop(self):
+        """次回実行時刻まで待って実行する、を繰り返す"""
+        while True:
+            self.next_run_at = self._next_run(datetime.now())
+            await asyncio.sleep((self.next_run_at - datetime.now()).total_seconds())
+            
+            self.running = True
+            try:
+                self.last_result = await run_precompute()
+            except Exception as e:
+                print(f"事前計算エラー: {e}")
+                self.last_result = {'status': 'error', 'error': str(e)}
+            finally:
+                self.running = False
+    
+    def status(self) -> Dict[str, Any]:
+        """スケジューラーの状態"""
+        return {
+            'enabled': True,
+            'at': self.at,
+            'next_run_at': self.next_run_at.isoformat() if self.next_run_at else None,
+            'running': self.running,
+            'last_result': self.last_result
+        }
+
+
+_scheduler: Optional[PrecomputeScheduler] = None
+
+
+def start_precompute_scheduler() -> Optional[PrecomputeScheduler]:
+    """FOCUS_RING_PRECOMPUTE_AT が設定されていれば定期実行を開始（アプリケーション起動時に呼ぶ）"""
+    global _scheduler
+    if not PRECOMPUTE_AT:
+        return None
+    
+    if _scheduler is None:
+        _scheduler = PrecomputeScheduler(PRECOMPUTE_AT)
+    _scheduler.start()
+    return _scheduler
+
+
+async def stop_precompute_scheduler():
+    """定期実行を停止（アプリケーション終了時に呼ぶ）"""
+    if _scheduler is not None:
+        await _scheduler.stop()
+
+
+async def get_precompute_status(limit: int = 5) -> Dict[str, Any]:
+    """スケジューラーの状態と最近の実行の進捗を取得"""
+    runs: List[Dict[str, Any]] = await run_db(db.get_precompute_runs, limit)
+    for run in runs:
+        for key in ('started_at', 'heartbeat_at', 'finished_at'):
+            if run[key] is not None:
+                run[key] = datetime.fromtimestamp(run[key]).isoformat(timespec='seconds')
+    
+    return {
+        'scheduler': _scheduler.status() if _scheduler is not None else {'enabled': False},
+        'runs': runs
+    }
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+Focus Ring - 全履歴の並列再計算
+カテゴリの重みやスコアリングの変更後に、全期間の日次サマリを複数プロセスで計算し直す。
+
+日付を一定日数ずつのバッチに分け、ワーカープロセスが読み取り専用でスコアを計算し、
+メインプロセスだけがバッチ単位で書き込む（SQLiteの書き込みは1プロセスに絞る）。
+書き込んだバッチは rebuild_batches に記録し、中断しても同じ期間で再実行すれば続きから再開する。
+
+使い方:
+    python -m app.rebuild [--from YYYY-MM-DD] [--to YYYY-MM-DD] [--workers N] [--batch-days N]
+                          [--engine ENGINE] [--restart]
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional, Tuple
+
+from . import db
+from .summarizer import SCORING_ENGINES
+from .utils import validate_date_format
+
+
+REBUILD_BATCH_DAYS = 200
+
+
+# === ワーカープロセス ===
+
+def _init_worker(db_path: str):
+    """ワーカープロセスの初期化（親プロセスと同じデータベースを読む）"""
+    db.DB_PATH = db_path
+
+
+def _score_batch(dates: List[str], engine: str) -> Tuple[List[str], Dict[str, Dict[str, Any]], Dict[str, int], int]:
+    """バッチの日次集計カウンタを計算（ワーカープロセスで実行、書き込まない）"""
+    scored, date_versions, categories_version = db.score_rebuild_batch(dates[0], dates[-1], engine)
+    return dates, scored, date_versions, categories_version
+
+
+# === 再計算ジョブ ===
+
+def _pending_batches(dates: List[str], done: List[Tuple[str, str]], batch_days: int) -> List[List[str]]:
+    """書き込み済みのバッチに含まれない日付を batch_days 日ずつに分ける"""
+    pending = [date for date in dates if not any(first <= date <= last for first, last in done)]
+    return [pending[i:i + batch_days] for i in range(0, len(pending), batch_days)]
+
+
+def _format_progress(done_days: int, total_days: int, done_batches: int, total_batches: int,
+                     elapsed: float) -> str:
+    """進捗・処理速度・残り時間の表示"""
+    rate = done_days / elapsed if elapsed > 0 else 0.0
+    remaining = (total_days - done_days) / rate if rate > 0 else 0.0
+    percent = 100.0 * done_days / total_days if total_days else 100.0
+    return (f"[{done_batches}/{total_batches}] {done_days}/{total_days} 日 ({percent:.1f}%) "
+            f"{rate:.0f} 日/秒 残り約 {remaining:.0f} 秒")
+
+
+def run_rebuild(start_date: Optional[str] = None, end_date: Optional[str] = None,
+                workers: Optional[int] = None, batch_days: int = REBUILD_BATCH_DAYS,
+                engine: str = 'auto', restart: bool = False, quiet: bool = False) -> Dict[str, Any]:
+    """
+    期間の日次サマリを複数プロセスで再計算
+    
+    Args:
+        start_date: 開始日 (省略時は全期間)
+        end_date: 終了日 (省略時は全期間)
+        workers: ワーカープロセス数 (省略時はCPU数)
+        batch_days: 1バッチ（1トランザクション）あたりの日数
+        engine: スコアリングエンジン
+        restart: 中断された実行があっても最初からやり直す
+        quiet: 進捗を表示しない
+    
+    Returns:
+        {run_key, resumed, rebuilt, skipped, batches, elapsed_seconds, days_per_second}
+        （計算中にブロックが書き込まれた日は書き込み時に更新済みのため skipped に数える）
+    
+    Raises:
+        RuntimeError: 再計算中にカテゴリが変更された場合
+    """
+    run_key = f"{start_date or 'all'}:{end_date or 'all'}"
+    workers = max(1, workers or os.cpu_count() or 1)
+    started = time.perf_counter()
+    
+    categories_version = db.get_data_versions()['categories']
+    run = db.start_rebuild_run(run_key, categories_version, restart)
+    batches = _pending_batches(db.get_summary_dates(start_date, end_date), run['done'], max(1, batch_days))
+    total_days = sum(len(batch) for batch in batches)
+    
+    rebuilt = skipped = done_batches = 0
+    if not quiet and run['resumed'] and run['done']:
+        print(f"前回の続きから再開します（書き込み済み {len(run['done'])} バッチ）")
+    
+    executor = ProcessPoolExecutor(max_workers=min(workers, len(batches) or 1),
+                                   initializer=_init_worker, initargs=(db.DB_PATH,))
+    try:
+        futures = [executor.submit(_score_batch, batch, engine) for batch in batches]
+        for future in as_completed(futures):
+            dates, scored, date_versions, batch_categories_version = future.result()
+            if batch_categories_version != categories_version:
+                raise RuntimeError("再計算中にカテゴリが変更されました。最初からやり直してください")
+            
+            batch_skipped = db.write_rebuild_batch(run_key, dates, scored, date_versions, categories_version)
+            rebuilt += len(dates) - batch_skipped
+            skipped += batch_skipped
+            done_batches += 1
+            
+            if not quiet:
+                print(_format_progress(rebuilt + skipped, total_days, done_batches, len(batches),
+                                       time.perf_counter() - started), flush=True)
+    except KeyboardInterrupt:
+        # 書き込み済みのバッチは残し、実行中のまま終了する（同じ期間の再実行で続きから再開）
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise
+    except Exception:
+        executor.shutdown(wait=False, cancel_futures=True)
+        db.finish_rebuild_run(run_key, db.REBUILD_FAILED)
+        raise
+    executor.shutdown()
+    
+    db.finish_rebuild_run(run_key, db.REBUILD_DONE)
+    elapsed = time.perf_counter() - started
+    return {
+        'run_key': run_key,
+        'resumed': run['resumed'],
+        'rebuilt': rebuilt,
+        'skipped': skipped,
+        'batches': len(batches),
+        'elapsed_seconds': round(elapsed, 2),
+        'days_per_second': round((rebuilt + skipped) / elapsed, 1) if elapsed > 0 else 0.0
+    }
+
+
+# === エントリポイント ===
+
+def build_parser() -> argparse.ArgumentParser:
+    """コマンドライン引数パーサーを構築"""
+    parser = argparse.ArgumentParser(prog="python -m app.rebuild",
+                                     description="日次サマリを複数プロセスで再計算（中断しても続きから再開）")
+    parser.add_argument("--from", dest="from_date", default=None, help="開始日 (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="to_date", default=None, help="終了日 (YYYY-MM-DD)")
+    parser.add_argument("--workers", type=int, default=None, help="ワーカープロセス数 (省略時はCPU数)")
+    parser.add_argument("--batch-days", type=int, default=REBUILD_BATCH_DAYS,
+                        help="1バッチ（1トランザクション）あたりの日数")
+    parser.add_argument("--engine", choices=SCORING_ENGINES, default="auto",
+                        help="スコアリングエンジン (auto: NumPyがあればベクトル化版)")
+    parser.add_argument("--restart", action="store_true", help="中断された実行があっても最初からやり直す")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    
+    for value in (args.from_date, args.to_date):
+        if value is not None and not validate_date_format(value):
+            parser.error(f"日付形式が正しくありません: {value} (YYYY-MM-DD)")
+    
+    db.init_database()
+    try:
+        result = run_rebuild(args.from_date, args.to_date, workers=args.workers,
+                             batch_days=args.batch_days, engine=args.engine, restart=args.restart)
+    except KeyboardInterrupt:
+        print("\n中断しました。同じ期間で再実行すると続きから再開します。")
+        return 130
+    except RuntimeError as e:
+        print(f"再計算エラー: {e}")
+        return 1
+    
+    skipped = f"（計算中に更新された {result['skipped']} 日は書き込み時の値を保持）" if result['skipped'] else ""
+    print(f"日次サマリ {result['rebuilt']} 日分を再計算しました{skipped}: "
+          f"{result['elapsed_seconds']}秒 ({result['days_per_second']} 日/秒)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+Focus Ring - 重み変更後の再計算スイーパー
+カテゴリの重みの変更（db.set_category_weight）は履歴に1行追加するだけで、日次サマリは計算し直さない。
+古くなったサマリは読み出し時に計算し直されるほか、このスイーパーが空き時間に少しずつ計算し直す。
+"""
+
+import asyncio
+import os
+from typing import Any, Dict, Optional
+
+from . import db
+from .async_db import run_db
+
+
+# スイーパー設定（間隔が 0 なら定期実行しない）
+RESCORE_INTERVAL = float(os.getenv('FOCUS_RING_RESCORE_INTERVAL', '60'))  # 確認間隔（秒）
+RESCORE_BATCH_DAYS = int(os.getenv('FOCUS_RING_RESCORE_BATCH_DAYS', '100'))  # 1トランザクションの日数
+
+
+class RescoreSweeper:
+    """
+    一定間隔で古くなった日次サマリを探し、batch_days 日ずつ計算し直す asyncio タスク
+    
+    バッチの間でイベントループに制御を返し、リクエストの処理を妨げないようにする。
+    """
+    
+    def __init__(self, interval: float = RESCORE_INTERVAL, batch_days: int = RESCORE_BATCH_DAYS):
+        self.interval = interval
+        self.batch_days = max(1, batch_days)
+        self.processed = 0
+        self.last_error: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+    
+    def start(self):
+        """定期実行を開始（実行中のイベントループ上で呼ぶ）"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
+    
+    async def stop(self):
+        """定期実行を停止（書き込み済みのバッチはそのまま残る）"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    async def sweep(self) -> int:
+        """
+        古くなった日次サマリがなくなるまで計算し直す
+        
+        Returns:
+            処理した日数
+        """
+        processed = 0
+        while True:
+            batch = await run_db(db.refresh_stale_summaries, limit=self.batch_days)
+            if batch == 0:
+                return processed
+            processed += batch
+            self.processed += batch
+            await asyncio.sleep(0)
+    
+    async def _loop(self):
+        """間隔を空けて sweep を繰り返す"""
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.sweep()
+                self.last_error = None
+            except Exception as e:
+                print(f"再計算スイーパーエラー: {e}")
+                self.last_error = str(e)
+    
+    def status(self) -> Dict[str, Any]:
+        """スイーパーの状態"""
+        return {
+            'enabled': True,
+            'interval_seconds': self.interval,
+            'batch_days': self.batch_days,
+            'processed': self.processed,
+            'last_error': self.last_error
+        }
+
+
+_sweeper: Optional[RescoreSweeper] = None
+
+
+def start_rescore_sweeper() -> Optional[RescoreSweeper]:
+    """FOCUS_RING_RESCORE_INTERVAL が正なら定期実行を開始（アプリケーション起動時に呼ぶ）"""
+    global _sweeper
+    if RESCORE_INTERVAL <= 0:
+        return None
+    
+    if _sweeper is None:
+        _sweeper = RescoreSweeper()
+    _sweeper.start()
+    return _sweeper
+
+
+async def stop_rescore_sweeper():
+    """定期実行を停止（アプリケーション終了時に呼ぶ）"""
+    if _sweeper is not None:
+        await _sweeper.stop()
+
+
+async def get_rescore_status() -> Dict[str, Any]:
+    """スイーパーの状態と、まだ計算し直していない日次サマリの日数を取得"""
+    return {
+        'sweeper': _sweeper.status() if _sweeper is not None else {'enabled': False},
+        'stale_summaries': await run_db(db.count_stale_summaries)
+    }
@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+"""
+Focus Ring - 集計・提案結果キャッシュ
+日次サマリ・分布・改善提案の計算結果を (日付, 日付のバージョン, カテゴリのバージョン) をキーに
+プロセス内LRUで保持する
+"""
+
+import copy
+import functools
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, TypeVar
+
+from . import db
+
+
+# 結果キャッシュ設定（サイズ0で無効）
+RESULT_CACHE_SIZE = int(os.getenv('FOCUS_RING_RESULT_CACHE_SIZE', '512'))
+RESULT_CACHE_TTL = float(os.getenv('FOCUS_RING_RESULT_CACHE_TTL', '600'))
+
+T = TypeVar('T')
+
+# (種別, 日付, エポック, 日付のバージョン, カテゴリのバージョン)
+CacheKey = Tuple[str, str, int, int, int]
+
+
+# === 結果キャッシュ ===
+
+class ResultCache:
+    """
+    サイズ・TTL上限付きのLRUキャッシュ
+    
+    キーに日付・カテゴリのバージョンを含むため、他プロセスの書き込み後も古い結果は返さない。
+    同一プロセス内の書き込みでは該当日のエントリだけを即時に破棄する。
+    """
+    
+    def __init__(self, max_size: int = RESULT_CACHE_SIZE, ttl: float = RESULT_CACHE_TTL):
+        self.max_size = max(0, max_size)
+        self.ttl = ttl
+        self.pid = os.getpid()
+        
+        self._entries: "OrderedDict[CacheKey, Tuple[float, Any]]" = OrderedDict()
+        self._keys_by_date: Dict[str, Set[CacheKey]] = {}
+        self._lock = threading.Lock()
+        
+        # 統計カウンタ
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._invalidations = 0
+    
+    def get(self, key: CacheKey) -> Tuple[bool, Any]:
+        """
+        キャッシュを参照
+        
+        Returns:
+            (ヒットしたか, 値のコピー)
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return False, None
+            
+            stored_at, value = entry
+            if time.monotonic() - stored_at > self.ttl:
+                self._remove(key)
+                self._expirations += 1
+                self._misses += 1
+                return False, None
+            
+            self._entries.move_to_end(key)
+            self._hits += 1
+        # 呼び出し側が結果を書き換えてもキャッシュに影響しないようコピーを返す
+        return True, copy.deepcopy(value)
+    
+    def put(self, key: CacheKey, value: Any):
+        """結果を保存（上限を超えたら最も古く使われたものから破棄）"""
+        if self.max_size == 0:
+            return
+        
+        value = copy.deepcopy(value)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            self._entries[key] = (time.monotonic(), value)
+            self._keys_by_date.setdefault(key[1], set()).add(key)
+            
+            while len(self._entries) > self.max_size:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._evictions += 1
+    
+    def invalidate_dates(self, dates: List[str]):
+        """指定日のエントリを全種別まとめて破棄"""
+        with self._lock:
+            for date in dates:
+                for key in self._keys_by_date.pop(date, ()):
+                    if self._entries.pop(key, None) is not None:
+                        self._invalidations += 1
+    
+    def clear(self):
+        """全エントリを破棄"""
+        with self._lock:
+            self._invalidations += len(self._entries)
+            self._entries.clear()
+            self._keys_by_date.clear()
+    
+    def _remove(self, key: CacheKey):
+        """エントリと日付索引を削除（ロック内で呼ぶ）"""
+        self._entries.pop(key, None)
+        keys = self._keys_by_date.get(key[1])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_date[key[1]]
+    
+    def stats(self) -> Dict[str, Any]:
+        """キャッシュの統計情報を取得"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'enabled': self.max_size > 0,
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl_seconds': self.ttl,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': round(self._hits / max(lookups, 1), 3),
+                'evictions': self._evictions,
+                'expirations': self._expirations,
+                'invalidations': self._invalidations
+            }
+
+
+_cache: Optional[ResultCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> ResultCache:
+    """プロセス共通の結果キャッシュを取得（fork後のプロセスでは作り直す）"""
+    global _cache
+    cache = _cache
+    if cache is not None and cache.pid == os.getpid():
+        return cache
+    
+    with _cache_lock:
+        if _cache is None or _cache.pid != os.getpid():
+            _cache = ResultCache()
+        return _cache
+
+
+def get_result_cache_stats() -> Dict[str, Any]:
+    """結果キャッシュの統計情報を取得"""
+    return get_result_cache().stats()
+
+
+def _invalidate_written_dates(dates: List[str]):
+    """ブロック書き込み後に該当日のエントリを破棄（db の書き込み通知から呼ばれる）"""
+    cache = _cache
+    if cache is not None and cache.pid == os.getpid():
+        cache.invalidate_dates(dates)
+
+
+db.add_date_write_listener(_invalidate_written_dates)
+
+
+def lookup(kind: str, date: str) -> Tuple[Optional[CacheKey], bool, Any]:
+    """
+    現在のバージョンで結果を参照（非同期処理などデコレータを使えない呼び出し元用）
+    
+    Args:
+        kind: キャッシュキーの種別
+        date: 対象日 (YYYY-MM-DD)
+        
+    Returns:
+        (保存に使うキー（キャッシュ無効時は None）, ヒットしたか, 値)
+    """
+    cache = get_result_cache()
+    if cache.max_size == 0:
+        return None, False, None
+    
+    # バージョンは計算前に読む（計算中に書き込まれたら次回は別キーになる）
+    versions = db.get_data_versions(date)
+    key = (kind, date, versions['epoch'], versions['date'], versions['categories'])
+    hit, value = cache.get(key)
+    return key, hit, value
+
+
+def store(key: Optional[CacheKey], value: Any):
+    """lookup で得たキーに結果を保存（キーが None なら何もしない）"""
+    if key is not None:
+        get_result_cache().put(key, value)
+
+
+def cached_by_date(kind: str) -> Callable[[Callable[..., T]], Callable[..., T]]:
+    """
+    日付を第1引数に取る関数の結果を日付・カテゴリのバージョン付きでキャッシュする
+    
+    Args:
+        kind: キャッシュキーの種別（関数ごとに一意な名前）
+    """
+    def decorator(func: Callable[..., T]) -> Callable[..., T]:
+        @functools.wraps(func)
+        def wrapper(date: str, *args: Any, **kwargs: Any) -> T:
+            if args or kwargs:
+                return func(date, *args, **kwargs)
+            
+            key, hit, value = lookup(kind, date)
+            if hit:
+                return value
+            
+            value = func(date)
+            store(key, value)
+            return value
+        return wrapper
+    return decorator
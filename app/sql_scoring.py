@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+Focus Ring - SQLスコアリングエンジン
+ウィンドウ関数（LAG）と gaps-and-islands のグループ化で、日次集計カウンタを SQLite 内で計算する
+（スロット単位の行をPythonに読み出さず、1日1行の集計結果だけを受け取る）
+"""
+
+import json
+import sqlite3
+from typing import Dict, Any
+
+from .day_vector import SLOTS_PER_DAY
+
+
+# ウィンドウ関数は SQLite 3.25 以降
+MIN_SQLITE_VERSION = (3, 25, 0)
+
+_HEX_DIGITS = "'0123456789ABCDEF'"
+
+
+def is_available() -> bool:
+    """SQLエンジンが利用可能か（SQLiteがウィンドウ関数に対応しているか）"""
+    return sqlite3.sqlite_version_info >= MIN_SQLITE_VERSION
+
+
+def _byte_at(column: str) -> str:
+    """ブロブの slot_index 番目の1バイトを整数として取り出すSQL式"""
+    hex_byte = f"hex(substr({column}, s.slot_index + 1, 1))"
+    return (f"((instr({_HEX_DIGITS}, substr({hex_byte}, 1, 1)) - 1) * 16"
+            f" + instr({_HEX_DIGITS}, substr({hex_byte}, 2, 1)) - 1)")
+
+
+# 入力済みブロック (date, slot_index, category_id, focus) の読み出し（保存形式ごと）
+_FILLED_ROWS_SQL = """
+    SELECT date, slot_index, category_id, focus
+    FROM blocks
+    WHERE date BETWEEN ? AND ? AND category_id IS NOT NULL
+"""
+
+_FILLED_VECTORS_SQL = f"""
+    SELECT date, slot_index, category_id, focus
+    FROM (
+        SELECT v.date, s.slot_index,
+               {_byte_at('v.categories')} AS category_id,
+               NULLIF({_byte_at('v.focus')}, 0) AS focus
+        FROM day_vectors v
+        CROSS JOIN slots s
+        WHERE v.date BETWEEN ? AND ?
+    )
+    WHERE category_id != 0
+"""
+
+# calculate_summary_counters / calculate_streak_runs と同じ規則の集計
+# - 生産的ランは「生産的ブロックで、直前の入力済みブロックが非生産的・空きスロットを挟む・その日の先頭」で始まる
+# - ランの先頭は、その日の先頭か直前の入力済みブロックと隣接している場合だけ最大値に数える
+#   （空きスロットの後の1ブロック目は数えない）ので、ランの値は 長さ（先頭を数えない1ブロックのランは0）
+_SCORE_SQL = """
+    WITH RECURSIVE
+    weights(category_id, weight) AS (
+        SELECT CAST(key AS INTEGER), value FROM json_each(?)
+    ),
+    slots(slot_index) AS (
+        SELECT 0 UNION ALL SELECT slot_index + 1 FROM slots WHERE slot_index < {last_slot}
+    ),
+    filled AS (
+        SELECT f.date, f.slot_index, f.category_id, f.focus, COALESCE(c.weight, 0) AS weight
+        FROM ({filled_sql}) f
+        LEFT JOIN weights c ON c.category_id = f.category_id
+    ),
+    ordered AS (
+        SELECT date, slot_index, category_id, focus, weight,
+               LAG(slot_index) OVER w AS prev_slot,
+               LAG(category_id) OVER w AS prev_category,
+               LAG(weight) OVER w AS prev_weight
+        FROM filled
+        WINDOW w AS (PARTITION BY date ORDER BY slot_index)
+    ),
+    heads AS (
+        SELECT date, slot_index, category_id, focus, weight, prev_category,
+               CASE WHEN weight > 0 AND (prev_slot IS NULL OR prev_weight <= 0
+                                         OR prev_slot != slot_index - 1)
+                    THEN 1 ELSE 0 END AS run_head,
+               CASE WHEN prev_slot IS NULL OR prev_slot = slot_index - 1
+                    THEN 1 ELSE 0 END AS head_counts
+        FROM ordered
+    ),
+    islands AS (
+        -- ランの先頭の累積数をラン番号にする（gaps-and-islands）
+        SELECT date, category_id, focus, weight, prev_category, run_head, head_counts,
+               SUM(run_head) OVER (PARTITION BY date ORDER BY slot_index) AS run_id
+        FROM heads
+    ),
+    run_values AS (
+        SELECT date,
+               CASE WHEN MAX(run_head * head_counts) = 1 OR COUNT(*) > 1 THEN COUNT(*) ELSE 0 END AS value
+        FROM islands
+        WHERE weight > 0
+        GROUP BY date, run_id
+    ),
+    streaks AS (
+        SELECT date, MAX(value) AS deep_streak_max, json_group_object(value, runs) AS streak_runs
+        FROM (
+            SELECT date, value, COUNT(*) AS runs
+            FROM run_values
+            WHERE value > 0
+            GROUP BY date, value
+        )
+        GROUP BY date
+    ),
+    category_counts AS (
+        SELECT date, json_group_object(category_id, blocks) AS category_blocks
+        FROM (
+            SELECT date, category_id, COUNT(*) AS blocks
+            FROM islands
+            GROUP BY date, category_id
+        )
+        GROUP BY date
+    ),
+    day_counters AS (
+        SELECT date,
+               SUM(weight) AS raw_score,
+               SUM(CASE WHEN prev_category IS NOT NULL AND category_id != prev_category
+                        THEN 1 ELSE 0 END) AS context_switches,
+               SUM(weight > 0) AS productive_blocks,
+               SUM(weight < 0) AS distract_blocks,
+               SUM(weight = 0) AS neutral_blocks,
+               COUNT(*) AS total_filled,
+               SUM(CASE WHEN weight > 0 AND focus IS NOT NULL THEN focus ELSE 0 END) AS focus_sum_productive,
+               SUM(weight > 0 AND focus IS NOT NULL) AS focus_count_productive
+        FROM islands
+        GROUP BY date
+    )
+    SELECT d.date, d.raw_score, COALESCE(s.deep_streak_max, 0) AS deep_streak_max, d.context_switches,
+           d.productive_blocks, d.distract_blocks, d.neutral_blocks, d.total_filled,
+           d.focus_sum_productive, d.focus_count_productive,
+           s.streak_runs, k.category_blocks
+    FROM day_counters d
+    LEFT JOIN streaks s ON s.date = d.date
+    LEFT JOIN category_counts k ON k.date = d.date
+    ORDER BY d.date
+"""
+
+
+def score_date_range(conn: sqlite3.Connection, start_date: str, end_date: str,
+                     day_vectors: bool, weight_map: Dict[int, int]) -> Dict[str, Dict[str, Any]]:
+    """
+    期間内の日次集計カウンタを SQLite 内で計算
+    
+    Args:
+        conn: 接続
+        start_date: 開始日 (YYYY-MM-DD)
+        end_date: 終了日 (YYYY-MM-DD)
+        day_vectors: 日次ベクトル形式（day_vectors テーブル）から読むか
+        weight_map: カテゴリID -> 重み（期間内に適用される重み、含まれないIDは重み0）
+    
+    Returns:
+        日付 -> 集計カウンタ（streak_runs・category_blocks を含む）のマッピング（入力済みの日のみ）
+    """
+    if not is_available():
+        raise RuntimeError(f"SQLエンジンには SQLite {'.'.join(map(str, MIN_SQLITE_VERSION))} 以降が必要です "
+                           f"(現在: {sqlite3.sqlite_version})")
+    
+    sql = _SCORE_SQL.format(last_slot=SLOTS_PER_DAY - 1,
+                            filled_sql=_FILLED_VECTORS_SQL if day_vectors else _FILLED_ROWS_SQL)
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    cursor.execute(sql, (json.dumps(weight_map), start_date, end_date))
+    
+    result = {}
+    for (date, raw_score, deep_streak_max, context_switches, productive_blocks, distract_blocks,
+         neutral_blocks, total_filled, focus_sum_productive, focus_count_productive,
+         streak_runs, category_blocks) in cursor:
+        result[date] = {
+            'raw_score': raw_score,
+            'deep_streak_max': deep_streak_max,
+            'context_switches': context_switches,
+            'productive_blocks': productive_blocks,
+            'distract_blocks': distract_blocks,
+            'neutral_blocks': neutral_blocks,
+            'total_filled': total_filled,
+            'focus_sum_productive': focus_sum_productive,
+            'focus_count_productive': focus_count_productive,
+            'streak_runs': {int(value): runs for value, runs in json.loads(streak_runs or '{}').items()},
+            'category_blocks': {int(category_id): blocks
+                                for category_id, blocks in json.loads(category_blocks).items()}
+        }
+    
+    return result
@@ -10,6 +10,7 @@ let categories = []; // カテゴリ一覧
 let recentCategories = []; // 最近使用カテゴリ
 let currentChart = null; // Chart.jsインスタンス
 let currentSlotIndex = null; // 現在編集中のスロット
+let suggestionStream = null; // 改善提案のストリーミング接続（EventSource）
 
 // DOM要素キャッシュ
 const elements = {};
@@ -123,7 +124,16 @@ class FocusRingAPI {
     }
     
     static async getDayData(date) {
-        return this.request(`/api/day/${date}`);
+        const payload = await this.request(`/api/day/${date}?format=columnar`);
+        return decodeColumnarDay(payload);
+    }
+    
+    static async getDaysData(fromDate, toDate) {
+        return this.request(`/api/days?from=${fromDate}&to=${toDate}`);
+    }
+    
+    static async getWeekData(date) {
+        return this.request(`/api/week/${date}`);
     }
     
     static async updateBlock(blockData) {
@@ -138,7 +148,8 @@ class FocusRingAPI {
     }
     
     static async getTrendData(fromDate, toDate) {
-        return this.request(`/api/trend?from=${fromDate}&to=${toDate}`);
+        const payload = await this.request(`/api/trend?from=${fromDate}&to=${toDate}&format=columnar`);
+        return decodeColumnarTrend(payload);
     }
     
     static async getCategories() {
@@ -150,6 +161,42 @@ class FocusRingAPI {
     }
 }
 
+// === 列指向レスポンスのデコード ===
+// ?format=columnar の並列配列を従来のオブジェクト配列の形に戻す
+
+function slotStartTime(slotIndex) {
+    const totalMinutes = 4 * 60 + slotIndex * 15;
+    const hours = String(Math.floor(totalMinutes / 60)).padStart(2, '0');
+    const minutes = String(totalMinutes % 60).padStart(2, '0');
+    return `${hours}:${minutes}`;
+}
+
+function decodeColumnarDay(payload) {
+    return payload.categories.map((category, slotIndex) => ({
+        date: payload.date,
+        slot_index: slotIndex,
+        start_time: slotStartTime(slotIndex),
+        category: category,
+        focus: payload.focus[slotIndex],
+        memo: payload.memos[slotIndex] ?? null,
+        created_at: null,
+        updated_at: null
+    }));
+}
+
+function decodeColumnarTrend(payload) {
+    return {
+        trend_data: payload.dates.map((date, i) => ({
+            date: date,
+            focus_score: payload.focus_score[i],
+            productive_hours: payload.productive_hours[i],
+            distract_hours: payload.distract_hours[i]
+        })),
+        period_avg_score: payload.period_avg_score,
+        period_avg_productive: payload.period_avg_productive
+    };
+}
+
 // === API初期化 ===
 async function initializeAPI() {
     try {
@@ -617,20 +664,74 @@ function switchChart(type) {
 }
 
 // === 改善提案 ===
+function renderSuggestions(response) {
+    // 総括表示
+    elements.suggestionSummary.textContent = response.summary;
+    
+    // 提案リスト表示
+    elements.suggestionsList.innerHTML = '';
+    response.suggestions.forEach(appendSuggestion);
+}
+
+function appendSuggestion(suggestion) {
+    const li = document.createElement('li');
+    li.textContent = suggestion;
+    elements.suggestionsList.appendChild(li);
+}
+
 async function loadSuggestions() {
-    try {
-        const response = await FocusRingAPI.getSuggestions(currentDate);
+    // ストリーミング非対応の環境では従来の一括取得
+    if (typeof EventSource === 'undefined') {
+        return loadSuggestionsOnce();
+    }
+    
+    if (suggestionStream) {
+        suggestionStream.close();
+    }
+    
+    // ルールベースの提案を即時表示し、LLMの提案は確定した行から差し替える
+    const stream = new EventSource(`/api/ai/suggestions/${currentDate}/stream`);
+    suggestionStream = stream;
+    let streamedCount = 0;
+    
+    stream.addEventListener('rules', event => {
+        renderSuggestions(JSON.parse(event.data));
+    });
+    
+    stream.addEventListener('suggestion', event => {
+        if (streamedCount === 0) {
+            elements.suggestionsList.innerHTML = '';
+        }
+        streamedCount += 1;
+        appendSuggestion(JSON.parse(event.data).text);
+    });
+    
+    stream.addEventListener('done', event => {
+        stream.close();
+        suggestionStream = null;
         
-        // 総括表示
-        elements.suggestionSummary.textContent = response.summary;
+        const response = JSON.parse(event.data);
+        renderSuggestions(response);
         
-        // 提案リスト表示
-        elements.suggestionsList.innerHTML = '';
-        response.suggestions.forEach(suggestion => {
-            const li = document.createElement('li');
-            li.textContent = suggestion;
-            elements.suggestionsList.appendChild(li);
-        });
+        // AI生成かどうかの表示
+        const aiIndicator = response.is_ai_generated ? '🤖 AI' : '📋 ルール';
+        console.log(`💡 改善提案更新完了 (${aiIndicator})`);
+    });
+    
+    stream.onerror = () => {
+        // 接続エラー時は一括取得に切り替える（EventSource の自動再接続はしない）
+        stream.close();
+        if (suggestionStream === stream) {
+            suggestionStream = null;
+            loadSuggestionsOnce();
+        }
+    };
+}
+
+async function loadSuggestionsOnce() {
+    try {
+        const response = await FocusRingAPI.getSuggestions(currentDate);
+        renderSuggestions(response);
         
         // AI生成かどうかの表示
         const aiIndicator = response.is_ai_generated ? '🤖 AI' : '📋 ルール';
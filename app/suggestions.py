@@ -4,13 +4,39 @@ Focus Ring - 改善提案エンジン
 ルールベース分析とLLM連携による行動改善アドバイス
 """
 
+import asyncio
 import os
-from typing import List, Dict, Optional
+from typing import Any, AsyncIterator, Awaitable, Callable, List, Dict, Optional, Tuple
 from datetime import datetime
 
-from .models import DailySummary, AIResponse
-from .summarizer import calculate_daily_summary, get_category_distribution, get_time_of_day_productivity
-from .db import get_filled_blocks_for_date, get_all_categories
+from .models import DailySummary, AIResponse, DBCategory
+from .summarizer import (
+    DayContext, calculate_daily_summary, get_category_distribution, get_time_of_day_productivity
+)
+from .db import get_all_categories
+from .result_cache import cached_by_date
+from .llm_client import LLMUnavailableError, get_llm_client
+from . import llm_cache, result_cache
+
+
+# LLM呼び出し設定（応答キャッシュの指紋にも含める）
+LLM_MODEL = "gpt-3.5-turbo"
+LLM_MAX_TOKENS = 500
+LLM_TEMPERATURE = 0.7
+LLM_SYSTEM_PROMPT = (
+    "あなたは生産性向上のコーチです。ユーザーの1日の行動データを分析し、"
+    "具体的で実行可能な改善提案を日本語で提供してください。"
+)
+LLM_PARSE_ERROR = "LLMレスポンス解析エラー"
+
+# 同期のDB処理を実行する関数（async_db.run_db など。既定は既定のスレッドプール）
+RunSync = Callable[..., Awaitable[Any]]
+
+# ストリーミング提案のイベント名
+STREAM_EVENT_RULES = 'rules'            # ルールベースの提案（最初に即時送信）
+STREAM_EVENT_TOKEN = 'token'            # LLM応答本文の差分
+STREAM_EVENT_SUGGESTION = 'suggestion'  # LLM応答から確定した提案1件
+STREAM_EVENT_DONE = 'done'              # 最終的な AIResponse（最後のイベント）
 
 
 # === ルールベース改善提案 ===
@@ -136,60 +162,103 @@ def generate_summary_comment(summary: DailySummary, positive_points: List[str])
 
 # === LLM連携改善提案 ===
 
-def generate_ai_suggestions(date: str) -> AIResponse:
+def generate_ai_suggestions(date: str, day_context: Optional[DayContext] = None) -> AIResponse:
     """
     LLMを使用した詳細な改善提案を生成
     
     Args:
         date: 対象日 (YYYY-MM-DD)
+        day_context: 読み込み済みの DayContext（省略時はここで1回だけ読み込む）
         
     Returns:
         AIResponseオブジェクト
     """
+    if day_context is None:
+        day_context = DayContext.load(date)
+    
     # 環境変数からAPI キーを取得
     api_key = os.getenv('LLM_API_KEY')
     
     if not api_key:
         # API キーがない場合はルールベースにフォールバック
-        summary = calculate_daily_summary(date)
-        return generate_rule_based_suggestions(summary)
+        return generate_rule_based_suggestions(calculate_daily_summary(date, day_context))
     
     try:
-        # データ収集
-        summary = calculate_daily_summary(date)
-        category_dist = get_category_distribution(date)
-        time_productivity = get_time_of_day_productivity(date)
-        filled_blocks = get_filled_blocks_for_date(date)
-        
-        # LLM用のコンテキスト構築
-        context = build_llm_context(date, summary, category_dist, time_productivity, filled_blocks)
-        
-        # LLM API呼び出し
-        response = call_llm_api(context, api_key)
-        
-        return AIResponse(
-            suggestions=response.get('suggestions', []),
-            summary=response.get('summary', ''),
-            is_ai_generated=True
-        )
+        response = call_llm_api(_build_day_prompt(date, day_context), api_key)
+    except Exception as e:
+        return _llm_fallback(date, day_context, e)
+    
+    return _ai_response(response)
+
+
+async def generate_ai_suggestions_async(date: str, day_context: DayContext,
+                                        run_sync: RunSync = asyncio.to_thread) -> AIResponse:
+    """
+    generate_ai_suggestions の async 版（LLMは非同期クライアントで待ち、イベントループを塞がない）
+    
+    Args:
+        date: 対象日 (YYYY-MM-DD)
+        day_context: 読み込み済みの DayContext
+        run_sync: 応答キャッシュの読み書きに使う実行関数
         
+    Returns:
+        AIResponseオブジェクト
+    """
+    api_key = os.getenv('LLM_API_KEY')
+    
+    if not api_key:
+        return generate_rule_based_suggestions(calculate_daily_summary(date, day_context))
+    
+    try:
+        response = await call_llm_api_async(_build_day_prompt(date, day_context), api_key, run_sync)
     except Exception as e:
-        print(f"LLM API エラー: {e}")
-        # エラー時はルールベースにフォールバック
-        summary = calculate_daily_summary(date)
-        fallback_response = generate_rule_based_suggestions(summary)
+        return _llm_fallback(date, day_context, e)
+    
+    return _ai_response(response)
+
+
+def _build_day_prompt(date: str, day_context: DayContext) -> str:
+    """読み込み済みのブロック・カテゴリから LLM 用のコンテキストを構築"""
+    summary = calculate_daily_summary(date, day_context)
+    category_dist = get_category_distribution(date, day_context)
+    time_productivity = get_time_of_day_productivity(date, day_context)
+    
+    return build_llm_context(date, summary, category_dist, time_productivity,
+                             day_context.filled_blocks, day_context.categories)
+
+
+def _ai_response(response: Dict) -> AIResponse:
+    """LLMの解析結果を AIResponse に変換"""
+    return AIResponse(
+        suggestions=response.get('suggestions', []),
+        summary=response.get('summary', ''),
+        is_ai_generated=True
+    )
+
+
+def _llm_fallback(date: str, day_context: DayContext, error: Exception) -> AIResponse:
+    """LLMが使えなかった場合のルールベース提案（サマリは計算済みのものを使う）"""
+    fallback_response = generate_rule_based_suggestions(calculate_daily_summary(date, day_context))
+    
+    if isinstance(error, LLMUnavailableError):
+        # ブレーカーが開いている間はLLMを呼ばずに即座に返す
+        fallback_response.summary += " (LLM一時停止中のためルールベース分析)"
+    else:
+        print(f"LLM API エラー: {error}")
         fallback_response.summary += " (LLM接続エラーのためルールベース分析)"
-        return fallback_response
+    return fallback_response
 
 
 def build_llm_context(date: str, summary: DailySummary, 
                      category_dist: Dict[str, Dict[str, float]], 
                      time_productivity: Dict[str, float],
-                     filled_blocks: List) -> str:
-    """LLM用のコンテキストデータを構築"""
+                     filled_blocks: List,
+                     categories: Optional[List[DBCategory]] = None) -> str:
+    """LLM用のコンテキストデータを構築（categories 省略時はDBから取得）"""
     
     # カテゴリ情報取得
-    categories = get_all_categories()
+    if categories is None:
+        categories = get_all_categories()
     category_info = {cat.code: f"{cat.label} (重み: {cat.weight})" for cat in categories}
     
     context = f"""
@@ -227,65 +296,153 @@ def build_llm_context(date: str, summary: DailySummary,
 
 
 def call_llm_api(context: str, api_key: str) -> Dict:
-    """LLM APIを呼び出し（OpenAI形式を想定）"""
+    """
+    LLM APIを呼び出し（OpenAI形式を想定）
+    同じプロンプト・モデル・パラメータの応答は永続キャッシュから返す
+    """
+    cache_key = _llm_cache_key(context)
+    cached = llm_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
     try:
-        import openai
-        
-        client = openai.OpenAI(api_key=api_key)
-        
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "あなたは生産性向上のコーチです。ユーザーの1日の行動データを分析し、具体的で実行可能な改善提案を日本語で提供してください。"
-                },
-                {
-                    "role": "user", 
-                    "content": context
-                }
-            ],
-            max_tokens=500,
-            temperature=0.7
-        )
-        
-        # レスポンスをパース（簡易的な実装）
-        content = response.choices[0].message.content
-        
-        # 提案と総括を分離（簡易的な実装）
-        lines = content.split('\n')
-        suggestions = []
-        summary = ""
+        content = get_llm_client().complete(api_key, _llm_messages(context), **_llm_params())
+    except LLMUnavailableError:
+        raise
+    except Exception as e:
+        raise Exception(f"OpenAI API呼び出しエラー: {e}")
+    
+    result = parse_llm_content(content)
+    if _is_parsed(result):
+        llm_cache.put(cache_key, LLM_MODEL, result)
+    return result
+
+
+async def call_llm_api_async(context: str, api_key: str, run_sync: RunSync = asyncio.to_thread) -> Dict:
+    """
+    call_llm_api の async 版（接続・読み込みタイムアウトとヘッジ付きの非同期クライアントを使う）
+    
+    Args:
+        context: build_llm_context の出力
+        api_key: APIキー
+        run_sync: 応答キャッシュ（SQLite）の読み書きに使う実行関数
+    """
+    cache_key = _llm_cache_key(context)
+    cached = await run_sync(llm_cache.get, cache_key)
+    if cached is not None:
+        return cached
+    
+    try:
+        content = await get_llm_client().complete_async(api_key, _llm_messages(context), **_llm_params())
+    except LLMUnavailableError:
+        raise
+    except Exception as e:
+        raise Exception(f"OpenAI API呼び出しエラー: {e!r}")
+    
+    result = parse_llm_content(content)
+    if _is_parsed(result):
+        await run_sync(llm_cache.put, cache_key, LLM_MODEL, result)
+    return result
+
+
+def _llm_params() -> Dict[str, Any]:
+    """チャット補完の生成パラメータ"""
+    return {'model': LLM_MODEL, 'max_tokens': LLM_MAX_TOKENS, 'temperature': LLM_TEMPERATURE}
+
+
+def _llm_messages(context: str) -> List[Dict[str, str]]:
+    """チャット補完に送るメッセージ"""
+    return [
+        {
+            "role": "system",
+            "content": LLM_SYSTEM_PROMPT
+        },
+        {
+            "role": "user", 
+            "content": context
+        }
+    ]
+
+
+def _llm_cache_key(context: str) -> str:
+    """応答キャッシュのキー（プロンプト・モデル・生成パラメータの指紋）"""
+    params = {'system': LLM_SYSTEM_PROMPT, 'max_tokens': LLM_MAX_TOKENS, 'temperature': LLM_TEMPERATURE}
+    return llm_cache.fingerprint(context, LLM_MODEL, params)
+
+
+def _is_parsed(result: Dict) -> bool:
+    """解析に成功した応答か（失敗した応答はキャッシュしない）"""
+    return LLM_PARSE_ERROR not in result['suggestions'] and result['summary'] != LLM_PARSE_ERROR
+
+
+class LLMContentParser:
+    """
+    LLMの応答本文を行単位で提案と総括に振り分ける（ストリーミング中の逐次解析にも使う）
+    """
+    
+    def __init__(self):
+        self.suggestions: List[str] = []
+        self.summary = ""
+        self._in_suggestions = False
+        self._partial = ""
+    
+    def feed(self, text: str) -> List[Tuple[int, str]]:
+        """
+        本文の断片を追加し、行が確定して新たに見つかった提案を返す
         
-        in_suggestions = False
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-            
-            if '提案' in line or '改善' in line:
-                in_suggestions = True
-                continue
-            elif '総括' in line or 'まとめ' in line:
-                in_suggestions = False
-                continue
+        Args:
+            text: 応答本文の断片（行の途中で切れていてよい）
             
-            if in_suggestions and (line.startswith('-') or line.startswith('•') or line.startswith('1.')):
-                suggestions.append(line.lstrip('-•1234567890. '))
-            elif not in_suggestions:
-                summary += line + " "
+        Returns:
+            この断片で確定した (提案の番号, 提案) のリスト（1つの断片で複数行が確定しても番号は行ごと）
+        """
+        lines = (self._partial + text).split('\n')
+        self._partial = lines.pop()
+        return [suggestion for suggestion in map(self._feed_line, lines) if suggestion]
+    
+    def finish(self) -> Dict:
+        """残りの行を解析して {suggestions, summary} を返す（提案は最大5つ）"""
+        if self._partial:
+            self._feed_line(self._partial)
+            self._partial = ""
         
         return {
-            'suggestions': suggestions[:5] if suggestions else ["LLMレスポンス解析エラー"],
-            'summary': summary.strip() or "LLMレスポンス解析エラー"
+            'suggestions': self.suggestions[:5] if self.suggestions else [LLM_PARSE_ERROR],
+            'summary': self.summary.strip() or LLM_PARSE_ERROR
         }
+    
+    def _feed_line(self, line: str) -> Optional[Tuple[int, str]]:
+        """1行を解析（提案行なら (提案の番号, 本文) を返す）"""
+        line = line.strip()
+        if not line:
+            return None
         
-    except Exception as e:
-        raise Exception(f"OpenAI API呼び出しエラー: {e}")
+        if '提案' in line or '改善' in line:
+            self._in_suggestions = True
+            return None
+        elif '総括' in line or 'まとめ' in line:
+            self._in_suggestions = False
+            return None
+        
+        if self._in_suggestions and (line.startswith('-') or line.startswith('•') or line.startswith('1.')):
+            suggestion = line.lstrip('-•1234567890. ')
+            self.suggestions.append(suggestion)
+            return (len(self.suggestions) - 1, suggestion) if len(self.suggestions) <= 5 else None
+        elif not self._in_suggestions:
+            self.summary += line + " "
+        return None
+
+
+def parse_llm_content(content: str) -> Dict:
+    """LLMの応答本文を提案と総括に分解（簡易的な実装）"""
+    parser = LLMContentParser()
+    parser.feed(content or '')
+    return parser.finish()
 
 
 # === 公開API ===
 
+@cached_by_date('get_daily_suggestions')
 def get_daily_suggestions(date: str) -> AIResponse:
     """
     指定日の改善提案を取得（LLM or ルールベース）
@@ -296,15 +453,103 @@ def get_daily_suggestions(date: str) -> AIResponse:
     Returns:
         AIResponseオブジェクト
     """
+    day_context = None
     try:
-        return generate_ai_suggestions(date)
+        day_context = DayContext.load(date)
+        return generate_ai_suggestions(date, day_context)
     except Exception as e:
         print(f"提案生成エラー: {e}")
         # エラー時は基本的なルールベース提案
-        summary = calculate_daily_summary(date)
+        summary = day_context.summary if day_context else calculate_daily_summary(date)
         return generate_rule_based_suggestions(summary)
 
 
+async def get_daily_suggestions_async(date: str, run_sync: RunSync = asyncio.to_thread) -> AIResponse:
+    """
+    get_daily_suggestions の async 版
+    DB処理（結果キャッシュの参照・1日分の読み込み）は run_sync で、LLM呼び出しは非同期クライアントで待つ
+    
+    Args:
+        date: 対象日 (YYYY-MM-DD)
+        run_sync: 同期のDB処理を実行する関数
+        
+    Returns:
+        AIResponseオブジェクト
+    """
+    key, hit, value = await run_sync(result_cache.lookup, 'get_daily_suggestions', date)
+    if hit:
+        return value
+    
+    day_context = None
+    try:
+        day_context = await run_sync(DayContext.load, date)
+        response = await generate_ai_suggestions_async(date, day_context, run_sync)
+    except Exception as e:
+        print(f"提案生成エラー: {e}")
+        if day_context is None:
+            day_context = await run_sync(DayContext.load, date)
+        return generate_rule_based_suggestions(day_context.summary)
+    
+    # LLMが使えずルールベースに落ちた結果は保存しない（復旧後の表示でLLMを再試行する）
+    if response.is_ai_generated or not os.getenv('LLM_API_KEY'):
+        result_cache.store(key, response)
+    return response
+
+
+async def stream_daily_suggestions(date: str, run_sync: RunSync = asyncio.to_thread
+                                   ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """
+    改善提案をイベント列として逐次生成（Server-Sent Events 用）
+    
+    まずルールベースの提案を返し、LLMが使える場合は応答本文の差分と確定した提案を届くたびに返す。
+    最後のイベントは常に最終的な AIResponse（LLMが失敗した場合はルールベース）。
+    結果キャッシュにある日はそれだけを返す。
+    
+    Args:
+        date: 対象日 (YYYY-MM-DD)
+        run_sync: 同期のDB処理を実行する関数
+        
+    Yields:
+        (イベント名, データ) のタプル
+    """
+    key, hit, value = await run_sync(result_cache.lookup, 'get_daily_suggestions', date)
+    if hit:
+        yield STREAM_EVENT_DONE, value.model_dump()
+        return
+    
+    day_context = await run_sync(DayContext.load, date)
+    rule_response = generate_rule_based_suggestions(day_context.summary)
+    yield STREAM_EVENT_RULES, rule_response.model_dump()
+    
+    api_key = os.getenv('LLM_API_KEY')
+    if not api_key:
+        result_cache.store(key, rule_response)
+        yield STREAM_EVENT_DONE, rule_response.model_dump()
+        return
+    
+    context = _build_day_prompt(date, day_context)
+    cache_key = _llm_cache_key(context)
+    try:
+        result = await run_sync(llm_cache.get, cache_key)
+        if result is None:
+            parser = LLMContentParser()
+            async for text in get_llm_client().stream_async(api_key, _llm_messages(context), **_llm_params()):
+                yield STREAM_EVENT_TOKEN, {'text': text}
+                for index, suggestion in parser.feed(text):
+                    yield STREAM_EVENT_SUGGESTION, {'index': index, 'text': suggestion}
+            
+            result = parser.finish()
+            if _is_parsed(result):
+                await run_sync(llm_cache.put, cache_key, LLM_MODEL, result)
+    except Exception as e:
+        yield STREAM_EVENT_DONE, _llm_fallback(date, day_context, e).model_dump()
+        return
+    
+    response = _ai_response(result)
+    result_cache.store(key, response)
+    yield STREAM_EVENT_DONE, response.model_dump()
+
+
 def get_quick_tips() -> List[str]:
     """一般的な生産性向上のクイックティップを取得"""
     return [
@@ -4,19 +4,111 @@ Focus Ring - フォーカススコア計算とサマリ機能
 1日の行動データから総合的な集中度指標を算出
 """
 
-from typing import List, Tuple, Dict, Optional
+from datetime import timedelta
+from typing import List, Tuple, Dict, Optional, Any, Iterable, Sequence
 from collections import defaultdict
 
-from .models import DailySummary, TrendDataPoint, TrendResponse
-from .db import get_filled_blocks_for_date, get_categories_weight_map, get_date_range_summary_data
-from .utils import safe_divide
+from .models import (
+    DailySummary, DBCategory, TrendDataPoint, TrendResponse, TrendColumnarResponse,
+    RollingMetricSeries, RollingResponse, RollupPeriod, RollupResponse
+)
+from .db import (
+    get_filled_blocks_for_date, get_categories_weight_map, get_day_context_data, score_date_range,
+    get_summary_counters, get_summary_counters_range, get_summary_dates, get_summary_prefix_range,
+    get_summary_rollups,
+    DAILY_SUMMARY_COLUMNS, SUMMARY_PREFIX_METRICS
+)
+from .utils import safe_divide, parse_date, format_date, get_date_range
+from .result_cache import cached_by_date
+from . import vectorized
+
+
+# スコアリングエンジン（auto: NumPyがあればベクトル化版、なければPython版、
+# sql: ウィンドウ関数でSQLite内で計算。期間を指定する calculate_range_counters などでのみ選べる）
+SCORING_ENGINES = ('auto', 'python', 'numpy', 'sql')
+
+
+# === 1日分の集計コンテキスト ===
+
+class DayContext:
+    """
+    1日分の入力済みブロックとカテゴリ情報
+    
+    改善提案のように同じ日のサマリ・分布・時間帯別生産性をまとめて使う処理で、
+    DBからの読み込みを1回に抑えるために各関数へ渡す。
+    """
+    
+    def __init__(self, date: str, filled_blocks: List[Tuple[int, str, Optional[int]]],
+                 categories: List[DBCategory]):
+        self.date = date
+        self.filled_blocks = filled_blocks  # (slot_index, category, focus) のリスト（slot_index順）
+        self.categories = categories
+        self.weight_map = get_categories_weight_map(date)  # その日に適用される重み
+        self._summary: Optional[DailySummary] = None
+    
+    @classmethod
+    def load(cls, date: str) -> "DayContext":
+        """指定日のブロックとカテゴリをDBから読み込む"""
+        filled_blocks, categories = get_day_context_data(date)
+        return cls(date, filled_blocks, categories)
+    
+    @property
+    def summary(self) -> DailySummary:
+        """読み込み済みのブロックから計算した日次サマリ（初回のみ計算）"""
+        if self._summary is None:
+            if self.filled_blocks:
+                counters = calculate_summary_counters(self.filled_blocks, self.weight_map)
+                self._summary = summary_from_counters(self.date, counters)
+            else:
+                self._summary = _empty_summary(self.date)
+        return self._summary
+
+
+def _check_context_date(date: str, context: DayContext):
+    """コンテキストが対象日のものか確認"""
+    if context.date != date:
+        raise ValueError(f"コンテキストの日付が一致しません: {context.date} != {date}")
+
+
+def _day_blocks(date: str, context: Optional[DayContext]) -> List[Tuple[int, str, Optional[int]]]:
+    """コンテキストがあればその入力済みブロックを、なければDBから取得"""
+    if context is None:
+        return get_filled_blocks_for_date(date)
+    _check_context_date(date, context)
+    return context.filled_blocks
 
 
 # === フォーカススコア計算 ===
 
-def calculate_daily_summary(date: str) -> DailySummary:
+@cached_by_date('calculate_daily_summary')
+def calculate_daily_summary(date: str, context: Optional[DayContext] = None) -> DailySummary:
+    """
+    指定日の詳細サマリを取得
+    ブロック書き込み時に更新される daily_summaries を参照する
+    
+    Args:
+        date: 対象日 (YYYY-MM-DD)
+        context: 読み込み済みの DayContext（指定時はDBを参照せずに計算）
+        
+    Returns:
+        DailySummaryオブジェクト
+    """
+    if context is not None:
+        _check_context_date(date, context)
+        return context.summary
+    
+    counters = get_summary_counters(date)
+    
+    if counters is None:
+        # 未入力の場合はゼロサマリを返す
+        return _empty_summary(date)
+    
+    return summary_from_counters(date, counters)
+
+
+def compute_daily_summary(date: str) -> DailySummary:
     """
-    指定日の詳細サマリを計算
+    指定日のサマリを blocks から直接計算（マテリアライズを使わない）
     
     Args:
         date: 対象日 (YYYY-MM-DD)
@@ -24,36 +116,32 @@ def calculate_daily_summary(date: str) -> DailySummary:
     Returns:
         DailySummaryオブジェクト
     """
-    # データ取得
     filled_blocks = get_filled_blocks_for_date(date)
-    weight_map = get_categories_weight_map()
     
     if not filled_blocks:
-        # 未入力の場合はゼロサマリを返す
-        return DailySummary(
-            date=date,
-            focus_score=0.0,
-            raw_score=0.0,
-            deep_streak_max=0,
-            context_switches=0,
-            penalty=0.0,
-            productive_blocks=0,
-            distract_blocks=0,
-            neutral_blocks=0,
-            total_filled=0,
-            productive_hours=0.0,
-            distract_hours=0.0,
-            distract_ratio=0.0,
-            avg_focus_productive=None
-        )
+        return _empty_summary(date)
     
-    # 基本指標計算
-    total_filled = len(filled_blocks)
-    raw_score = 0.0
+    weight_map = get_categories_weight_map(date)
+    return summary_from_counters(date, calculate_summary_counters(filled_blocks, weight_map))
+
+
+def calculate_summary_counters(filled_blocks: List[Tuple[int, str, Optional[int]]],
+                               weight_map: Dict[str, int]) -> Dict[str, int]:
+    """
+    入力済みブロックから日次サマリの集計カウンタを計算
+    
+    Args:
+        filled_blocks: (slot_index, category, focus) のリスト（slot_index順）
+        weight_map: カテゴリ -> 重みのマッピング
+        
+    Returns:
+        DAILY_SUMMARY_COLUMNS をキーとする集計カウンタ
+    """
+    raw_score = 0
     productive_blocks = 0
     distract_blocks = 0
     neutral_blocks = 0
-    focus_sum_productive = 0.0
+    focus_sum_productive = 0
     focus_count_productive = 0
     
     categories = []  # カテゴリ遷移追跡用
@@ -73,17 +161,37 @@ def calculate_daily_summary(date: str) -> DailySummary:
         else:
             neutral_blocks += 1
     
-    # 深い集中ストリーク計算
-    deep_streak_max = calculate_deep_streak_max(filled_blocks, weight_map)
-    
-    # カテゴリ切替回数計算
-    context_switches = calculate_context_switches(categories)
+    return {
+        'raw_score': raw_score,
+        'deep_streak_max': calculate_deep_streak_max(filled_blocks, weight_map),
+        'context_switches': calculate_context_switches(categories),
+        'productive_blocks': productive_blocks,
+        'distract_blocks': distract_blocks,
+        'neutral_blocks': neutral_blocks,
+        'total_filled': len(filled_blocks),
+        'focus_sum_productive': focus_sum_productive,
+        'focus_count_productive': focus_count_productive,
+    }
+
+
+def summary_from_counters(date: str, counters: Dict[str, int]) -> DailySummary:
+    """
+    集計カウンタから DailySummary を組み立てる
     
-    # ペナルティ計算
-    penalty = max(0, context_switches - total_filled / 8) * 0.5
+    Args:
+        date: 対象日 (YYYY-MM-DD)
+        counters: calculate_summary_counters の戻り値
+        
+    Returns:
+        DailySummaryオブジェクト
+    """
+    total_filled = counters['total_filled']
+    productive_blocks = counters['productive_blocks']
+    distract_blocks = counters['distract_blocks']
     
-    # 最終フォーカススコア
-    focus_score = raw_score + deep_streak_max - penalty
+    # ペナルティと最終フォーカススコア
+    penalty = _calculate_penalty(counters['context_switches'], total_filled)
+    focus_score = _calculate_focus_score(counters)
     
     # 時間計算（15分 = 0.25時間）
     productive_hours = productive_blocks * 0.25
@@ -95,19 +203,19 @@ def calculate_daily_summary(date: str) -> DailySummary:
     
     # 平均集中度（生産的ブロックのみ）
     avg_focus_productive = None
-    if focus_count_productive > 0:
-        avg_focus_productive = focus_sum_productive / focus_count_productive
+    if counters['focus_count_productive'] > 0:
+        avg_focus_productive = counters['focus_sum_productive'] / counters['focus_count_productive']
     
     return DailySummary(
         date=date,
         focus_score=round(focus_score, 2),
-        raw_score=round(raw_score, 2),
-        deep_streak_max=deep_streak_max,
-        context_switches=context_switches,
+        raw_score=round(float(counters['raw_score']), 2),
+        deep_streak_max=counters['deep_streak_max'],
+        context_switches=counters['context_switches'],
         penalty=round(penalty, 2),
         productive_blocks=productive_blocks,
         distract_blocks=distract_blocks,
-        neutral_blocks=neutral_blocks,
+        neutral_blocks=counters['neutral_blocks'],
         total_filled=total_filled,
         productive_hours=round(productive_hours, 2),
         distract_hours=round(distract_hours, 2),
@@ -116,6 +224,37 @@ def calculate_daily_summary(date: str) -> DailySummary:
     )
 
 
+def _calculate_penalty(context_switches: int, total_filled: int) -> float:
+    """切替ペナルティを計算（8ブロックに1回の切替は許容）"""
+    return max(0, context_switches - total_filled / 8) * 0.5
+
+
+def _calculate_focus_score(counters: Dict[str, int]) -> float:
+    """集計カウンタから丸め前のフォーカススコアを計算"""
+    penalty = _calculate_penalty(counters['context_switches'], counters['total_filled'])
+    return float(counters['raw_score']) + counters['deep_streak_max'] - penalty
+
+
+def _empty_summary(date: str) -> DailySummary:
+    """未入力日のゼロサマリ"""
+    return DailySummary(
+        date=date,
+        focus_score=0.0,
+        raw_score=0.0,
+        deep_streak_max=0,
+        context_switches=0,
+        penalty=0.0,
+        productive_blocks=0,
+        distract_blocks=0,
+        neutral_blocks=0,
+        total_filled=0,
+        productive_hours=0.0,
+        distract_hours=0.0,
+        distract_ratio=0.0,
+        avg_focus_productive=None
+    )
+
+
 def calculate_deep_streak_max(filled_blocks: List[Tuple[int, str, Optional[int]]], 
                             weight_map: Dict[str, int]) -> int:
     """
@@ -176,6 +315,205 @@ def calculate_context_switches(categories: List[str]) -> int:
     return switches
 
 
+# === 増分サマリ更新 ===
+# 1スロットの変更時に、前後の入力済みブロックと影響を受ける生産的ランだけを見て
+# 保存済みの集計カウンタを差分更新する。
+# deep_streak_max の差分更新のため、各生産的ランの「ストリーク値」のヒストグラム
+# （値 -> ラン数）を streak_runs として保持する。
+
+def calculate_streak_runs(filled_blocks: List[Tuple[int, str, Optional[int]]],
+                          weight_map: Dict[str, int]) -> Dict[int, int]:
+    """
+    生産的ランごとのストリーク値のヒストグラムを計算
+    max(キー) は calculate_deep_streak_max の結果と一致する
+    
+    Args:
+        filled_blocks: (slot_index, category, focus) のリスト（slot_index順）
+        weight_map: カテゴリ -> 重みのマッピング
+        
+    Returns:
+        ストリーク値 -> ラン数 のマッピング（値0のランは含まない）
+    """
+    return _streak_run_values(filled_blocks, weight_map, None)
+
+
+def _streak_run_values(blocks: List[Tuple[int, str, Optional[int]]],
+                       weight_map: Dict[str, int],
+                       last_slot: Optional[int]) -> Dict[int, int]:
+    """
+    calculate_deep_streak_max と同じ規則でランごとのストリーク値を集計
+    
+    Args:
+        blocks: 入力済みブロックの連続した部分列
+        weight_map: カテゴリ -> 重みのマッピング
+        last_slot: 部分列の直前の入力済みスロット（先頭からの場合は None）
+    """
+    runs = defaultdict(int)
+    current_streak = 0
+    run_value = 0
+    last_slot = -1 if last_slot is None else last_slot
+    
+    for slot_index, category, _ in blocks:
+        if weight_map.get(category, 0) > 0:
+            if last_slot == -1 or slot_index == last_slot + 1:
+                current_streak += 1
+                run_value = current_streak
+            else:
+                # 空きスロットを挟んだ新しいラン（1ブロック目は最大値に数えない）
+                if run_value > 0:
+                    runs[run_value] += 1
+                current_streak = 1
+                run_value = 0
+        else:
+            if run_value > 0:
+                runs[run_value] += 1
+            current_streak = 0
+            run_value = 0
+        
+        last_slot = slot_index
+    
+    if run_value > 0:
+        runs[run_value] += 1
+    
+    return dict(runs)
+
+
+def take_left_context(blocks_desc: Iterable[Tuple[int, str, Optional[int]]],
+                      weight_map: Dict[str, int]) -> List[Tuple[int, str, Optional[int]]]:
+    """
+    変更スロットより前の入力済みブロック（slot降順）から増分更新に必要な分だけ取り出す
+    直前のブロックが生産的なら、そのランの先頭とさらに1つ前のブロックまで読む
+    
+    Returns:
+        取り出したブロック（slot昇順）
+    """
+    taken = []
+    for block in blocks_desc:
+        taken.append(block)
+        if weight_map.get(block[1], 0) <= 0:
+            break
+        if len(taken) > 1 and block[0] != taken[-2][0] - 1:
+            break
+    
+    taken.reverse()
+    return taken
+
+
+def take_right_context(blocks_asc: Iterable[Tuple[int, str, Optional[int]]],
+                       weight_map: Dict[str, int]) -> List[Tuple[int, str, Optional[int]]]:
+    """
+    変更スロットより後の入力済みブロック（slot昇順）から増分更新に必要な分だけ取り出す
+    直後のブロックが生産的なら、そのランの末尾まで読む
+    
+    Returns:
+        取り出したブロック（slot昇順）
+    """
+    taken = []
+    for block in blocks_asc:
+        productive = weight_map.get(block[1], 0) > 0
+        if taken and (not productive or block[0] != taken[-1][0] + 1):
+            break
+        taken.append(block)
+        if not productive:
+            break
+    
+    return taken
+
+
+def patch_summary_counters(counters: Dict[str, int], streak_runs: Dict[int, int],
+                           before: List[Tuple[int, str, Optional[int]]],
+                           old_block: Optional[Tuple[int, str, Optional[int]]],
+                           new_block: Optional[Tuple[int, str, Optional[int]]],
+                           after: List[Tuple[int, str, Optional[int]]],
+                           weight_map: Dict[str, int]) -> Tuple[Dict[str, int], Dict[int, int]]:
+    """
+    1スロットの変更を保存済みの集計カウンタに反映
+    
+    Args:
+        counters: 変更前の集計カウンタ
+        streak_runs: 変更前のストリーク値ヒストグラム
+        before: 変更スロットより前の入力済みブロック（take_left_context の範囲を含むこと）
+        old_block: 変更前のブロック（未入力なら None）
+        new_block: 変更後のブロック（未入力なら None）
+        after: 変更スロットより後の入力済みブロック（take_right_context の範囲を含むこと）
+        weight_map: カテゴリ -> 重みのマッピング
+        
+    Returns:
+        (変更後の集計カウンタ, 変更後のストリーク値ヒストグラム)
+        
+    Raises:
+        ValueError: 保存済みヒストグラムが変更前の状態と矛盾する場合
+    """
+    def is_productive(block):
+        return weight_map.get(block[1], 0) > 0
+    
+    # 影響範囲の左端: 直前ブロックが生産的ならそのランの先頭
+    start = len(before)
+    if before:
+        start = len(before) - 1
+        if is_productive(before[start]):
+            while (start > 0 and is_productive(before[start - 1])
+                   and before[start - 1][0] == before[start][0] - 1):
+                start -= 1
+    left = before[start:]
+    left_last_slot = before[start - 1][0] if start > 0 else None
+    
+    # 影響範囲の右端: 直後ブロックが生産的ならそのランの末尾
+    right = []
+    if after:
+        end = 0
+        if is_productive(after[0]):
+            while (end + 1 < len(after) and is_productive(after[end + 1])
+                   and after[end + 1][0] == after[end][0] + 1):
+                end += 1
+        right = after[:end + 1]
+    
+    old_window = left + ([old_block] if old_block else []) + right
+    new_window = left + ([new_block] if new_block else []) + right
+    
+    # ストリーク値ヒストグラムの差し替え
+    runs = dict(streak_runs)
+    for value, count in _streak_run_values(old_window, weight_map, left_last_slot).items():
+        remaining = runs.get(value, 0) - count
+        if remaining < 0:
+            raise ValueError(f"streak_runs が保存データと矛盾しています: {value}")
+        if remaining:
+            runs[value] = remaining
+        else:
+            runs.pop(value, None)
+    for value, count in _streak_run_values(new_window, weight_map, left_last_slot).items():
+        runs[value] = runs.get(value, 0) + count
+    
+    # 重み別カウンタの差分
+    patched = dict(counters)
+    for block, sign in ((old_block, -1), (new_block, 1)):
+        if block is None:
+            continue
+        _, category, focus = block
+        weight = weight_map.get(category, 0)
+        patched['raw_score'] += sign * weight
+        patched['total_filled'] += sign
+        
+        if weight > 0:
+            patched['productive_blocks'] += sign
+            if focus is not None:
+                patched['focus_sum_productive'] += sign * focus
+                patched['focus_count_productive'] += sign
+        elif weight < 0:
+            patched['distract_blocks'] += sign
+        else:
+            patched['neutral_blocks'] += sign
+    
+    # 切替回数は影響範囲内の隣接ペアだけが変化する
+    patched['context_switches'] += (
+        calculate_context_switches([category for _, category, _ in new_window])
+        - calculate_context_switches([category for _, category, _ in old_window])
+    )
+    patched['deep_streak_max'] = max(runs) if runs else 0
+    
+    return patched, runs
+
+
 # === 推移データ計算 ===
 
 def calculate_trend_data(start_date: str, end_date: str) -> TrendResponse:
@@ -189,32 +527,21 @@ def calculate_trend_data(start_date: str, end_date: str) -> TrendResponse:
     Returns:
         TrendResponseオブジェクト
     """
-    # 期間内の全データを取得
-    date_blocks_map = get_date_range_summary_data(start_date, end_date)
-    weight_map = get_categories_weight_map()
+    # 期間内のマテリアライズ済みサマリを取得（未入力日は行を持たない）
+    counters_map = get_summary_counters_range(start_date, end_date)
     
     trend_data = []
     total_score = 0.0
     total_productive = 0.0
     valid_days = 0
     
-    # 各日のサマリを計算
-    for date, blocks in date_blocks_map.items():
-        if not blocks:
+    for date, counters in counters_map.items():
+        if counters['total_filled'] == 0:
             continue
         
-        # 簡易サマリ計算（計算量削減のため）
-        raw_score = sum(weight_map.get(category, 0) for _, category, _ in blocks)
-        deep_streak = calculate_deep_streak_max(blocks, weight_map)
-        context_switches = calculate_context_switches([cat for _, cat, _ in blocks])
-        penalty = max(0, context_switches - len(blocks) / 8) * 0.5
-        focus_score = raw_score + deep_streak - penalty
-        
-        productive_blocks = sum(1 for _, cat, _ in blocks if weight_map.get(cat, 0) > 0)
-        distract_blocks = sum(1 for _, cat, _ in blocks if weight_map.get(cat, 0) < 0)
-        
-        productive_hours = productive_blocks * 0.25
-        distract_hours = distract_blocks * 0.25
+        focus_score = _calculate_focus_score(counters)
+        productive_hours = counters['productive_blocks'] * 0.25
+        distract_hours = counters['distract_blocks'] * 0.25
         
         trend_data.append(TrendDataPoint(
             date=date,
@@ -231,9 +558,6 @@ def calculate_trend_data(start_date: str, end_date: str) -> TrendResponse:
     period_avg_score = safe_divide(total_score, valid_days, 0.0)
     period_avg_productive = safe_divide(total_productive, valid_days, 0.0)
     
-    # 日付順にソート
-    trend_data.sort(key=lambda x: x.date)
-    
     return TrendResponse(
         trend_data=trend_data,
         period_avg_score=round(period_avg_score, 2),
@@ -241,19 +565,265 @@ def calculate_trend_data(start_date: str, end_date: str) -> TrendResponse:
     )
 
 
+def to_columnar_trend(trend: TrendResponse) -> TrendColumnarResponse:
+    """推移データを列指向の圧縮形式（日付順の並列配列）に変換"""
+    points = trend.trend_data
+    return TrendColumnarResponse(
+        dates=[point.date for point in points],
+        focus_score=[point.focus_score for point in points],
+        productive_hours=[point.productive_hours for point in points],
+        distract_hours=[point.distract_hours for point in points],
+        period_avg_score=trend.period_avg_score,
+        period_avg_productive=trend.period_avg_productive
+    )
+
+
+# === 移動窓集計 ===
+
+# 前週比に使う窓の日数
+WEEK_OVER_WEEK_DAYS = 7
+
+
+def calculate_rolling_data(start_date: str, end_date: str, windows: List[int],
+                           metrics: Optional[List[str]] = None) -> RollingResponse:
+    """
+    期間内の各日について、日次サマリ指標の移動合計・移動平均・前週比を計算
+    累積和（summary_prefix）の差で求めるため、窓の長さによらず1点あたり定数時間
+    
+    Args:
+        start_date: 開始日 (YYYY-MM-DD)
+        end_date: 終了日 (YYYY-MM-DD)
+        windows: 窓の日数のリスト（各日を終端とする直近N日）
+        metrics: 対象の指標（省略時は DailySummary の全数値項目）
+        
+    Returns:
+        RollingResponseオブジェクト
+        
+    Raises:
+        ValueError: 未知の指標・不正な窓・期間の場合
+    """
+    metrics = list(metrics or SUMMARY_PREFIX_METRICS)
+    for metric in metrics:
+        if metric not in SUMMARY_PREFIX_METRICS:
+            raise ValueError(f"無効な指標: {metric}")
+    if not windows or min(windows) < 1:
+        raise ValueError("窓の日数は1以上で指定してください")
+    
+    dates = get_date_range(start_date, end_date)
+    
+    # 最長の窓・前週比の比較対象まで遡って累積和を読む
+    lookback = max(max(windows), WEEK_OVER_WEEK_DAYS * 2)
+    origin = format_date(parse_date(start_date) - timedelta(days=lookback))
+    base, rows = get_summary_prefix_range(origin, end_date)
+    
+    # 暦日ごとの累積和（日次サマリのない日は前日の値を引き継ぐ）
+    current = base or dict.fromkeys(('days', 'avg_focus_days') + SUMMARY_PREFIX_METRICS, 0)
+    by_date = {row['date']: row for row in rows}
+    cumulative = []
+    for date in get_date_range(origin, end_date):
+        current = by_date.get(date, current)
+        cumulative.append(current)
+    
+    def window_sum(end: int, days: int, column: str) -> float:
+        return cumulative[end][column] - cumulative[end - days][column]
+    
+    def window_avg(end: int, days: int, metric: str) -> Optional[float]:
+        count_column = 'avg_focus_days' if metric == 'avg_focus_productive' else 'days'
+        count = window_sum(end, days, count_column)
+        return window_sum(end, days, metric) / count if count else None
+    
+    points = range(lookback, len(cumulative))
+    result = {}
+    for metric in metrics:
+        moving_avg = {w: [_round_optional(window_avg(i, w, metric)) for i in points] for w in windows}
+        wow_delta = []
+        for i in points:
+            this_week = window_avg(i, WEEK_OVER_WEEK_DAYS, metric)
+            last_week = window_avg(i - WEEK_OVER_WEEK_DAYS, WEEK_OVER_WEEK_DAYS, metric)
+            wow_delta.append(_round_optional(this_week - last_week)
+                             if this_week is not None and last_week is not None else None)
+        
+        result[metric] = RollingMetricSeries(
+            moving_sum={w: [round(window_sum(i, w, metric), 3) for i in points] for w in windows},
+            moving_avg=moving_avg,
+            wow_delta=wow_delta
+        )
+    
+    return RollingResponse(
+        start_date=start_date,
+        end_date=end_date,
+        windows=windows,
+        dates=dates,
+        days_with_data={w: [int(window_sum(i, w, 'days')) for i in points] for w in windows},
+        metrics=result
+    )
+
+
+def _round_optional(value: Optional[float]) -> Optional[float]:
+    """None 以外を小数第3位に丸める"""
+    return round(value, 3) if value is not None else None
+
+
+# === 週・月・年集計 ===
+
+def calculate_rollups(granularity: str, start_date: str, end_date: str) -> RollupResponse:
+    """
+    日付範囲と重なる週・月・年の集計を取得（期間ごとの集計行を読むだけで blocks は走査しない）
+    
+    Args:
+        granularity: 'week'（ISO週） / 'month' / 'year'
+        start_date: 開始日 (YYYY-MM-DD)
+        end_date: 終了日 (YYYY-MM-DD)
+        
+    Returns:
+        RollupResponseオブジェクト（範囲の端にかかる期間も期間全体の値）
+    """
+    periods = []
+    for rollup in get_summary_rollups(granularity, start_date, end_date):
+        productive_blocks = rollup['productive_blocks']
+        distract_blocks = rollup['distract_blocks']
+        
+        avg_focus_productive = None
+        if rollup['focus_count_productive'] > 0:
+            avg_focus_productive = round(rollup['focus_sum_productive'] / rollup['focus_count_productive'], 2)
+        
+        periods.append(RollupPeriod(
+            period=rollup['period'],
+            start_date=rollup['start_date'],
+            end_date=rollup['end_date'],
+            days=rollup['days'],
+            avg_focus_score=round(safe_divide(rollup['focus_score_sum'], rollup['days'], 0.0), 2),
+            raw_score=round(float(rollup['raw_score']), 2),
+            deep_streak_max=rollup['deep_streak_max'],
+            context_switches=rollup['context_switches'],
+            productive_blocks=productive_blocks,
+            distract_blocks=distract_blocks,
+            neutral_blocks=rollup['neutral_blocks'],
+            total_filled=rollup['total_filled'],
+            productive_hours=round(productive_blocks * 0.25, 2),
+            distract_hours=round(distract_blocks * 0.25, 2),
+            distract_ratio=round(safe_divide(distract_blocks, productive_blocks + distract_blocks, 0.0), 3),
+            avg_focus_productive=avg_focus_productive,
+            category_hours={code: blocks * 0.25 for code, blocks in rollup['category_blocks'].items()}
+        ))
+    
+    return RollupResponse(granularity=granularity, start_date=start_date, end_date=end_date, periods=periods)
+
+
+# === 期間一括スコア計算 ===
+
+def score_block_rows(rows: Sequence[Tuple[str, int, Any, Optional[int]]],
+                     weight_map: Dict[Any, int], engine: str = 'auto') -> Dict[str, Dict[str, Any]]:
+    """
+    入力済みブロックの行から日次集計カウンタを一括計算
+    
+    Args:
+        rows: (date, slot_index, category, focus) のシーケンス（date, slot_index順）
+              category はカテゴリコードまたはカテゴリID（weight_map のキーと揃える）
+        weight_map: カテゴリ -> 重みのマッピング
+        engine: 'auto' / 'python' / 'numpy'
+        
+    Returns:
+        日付 -> 集計カウンタ（streak_runs を含む）のマッピング（入力済みの日のみ）
+    """
+    if engine not in SCORING_ENGINES:
+        raise ValueError(f"無効なスコアリングエンジン: {engine}")
+    if engine == 'sql':
+        raise ValueError("sql エンジンは読み出し済みの行には使えません（calculate_range_counters を使ってください）")
+    
+    if engine == 'numpy' or (engine == 'auto' and vectorized.is_available()):
+        return vectorized.score_block_rows(rows, weight_map)
+    
+    date_blocks = defaultdict(list)
+    for date, slot_index, category, focus in rows:
+        date_blocks[date].append((slot_index, category, focus))
+    
+    result = {}
+    for date, blocks in date_blocks.items():
+        counters = calculate_summary_counters(blocks, weight_map)
+        counters['streak_runs'] = calculate_streak_runs(blocks, weight_map)
+        result[date] = counters
+    
+    return result
+
+
+def calculate_range_counters(start_date: str, end_date: str,
+                             engine: str = 'auto') -> Dict[str, Dict[str, Any]]:
+    """
+    期間内の日次集計カウンタを blocks から直接計算（マテリアライズを使わない）
+    
+    Args:
+        start_date: 開始日 (YYYY-MM-DD)
+        end_date: 終了日 (YYYY-MM-DD)
+        engine: 'auto' / 'python' / 'numpy' / 'sql'
+        
+    Returns:
+        日付 -> 集計カウンタ（streak_runs・category_blocks を含む）のマッピング（入力済みの日のみ）
+    """
+    if engine not in SCORING_ENGINES:
+        raise ValueError(f"無効なスコアリングエンジン: {engine}")
+    return score_date_range(start_date, end_date, engine)
+
+
+# === 日次サマリ整合性チェック ===
+
+def check_daily_summaries(start_date: Optional[str] = None, end_date: Optional[str] = None,
+                          engine: str = 'auto') -> List[Dict[str, Any]]:
+    """
+    マテリアライズ済みサマリと blocks からの再計算結果を比較
+    
+    Args:
+        start_date: 開始日 (省略時は全期間)
+        end_date: 終了日 (省略時は全期間)
+        engine: 再計算に使うスコアリングエンジン
+        
+    Returns:
+        不一致の一覧 [{date, field, stored, expected}]（整合時は空リスト）
+    """
+    dates = get_summary_dates(start_date, end_date)
+    if not dates:
+        return []
+    
+    stored_map = get_summary_counters_range(dates[0], dates[-1], include_streak_runs=True)
+    expected_map = calculate_range_counters(dates[0], dates[-1], engine)
+    mismatches = []
+    
+    for date in dates:
+        stored = stored_map.get(date)
+        expected = expected_map.get(date)
+        
+        if stored is None or expected is None:
+            if stored != expected:
+                mismatches.append({'date': date, 'field': '*', 'stored': stored, 'expected': expected})
+            continue
+        
+        for field in DAILY_SUMMARY_COLUMNS + ('streak_runs',):
+            if stored[field] != expected[field]:
+                mismatches.append({
+                    'date': date,
+                    'field': field,
+                    'stored': stored[field],
+                    'expected': expected[field]
+                })
+    
+    return mismatches
+
+
 # === 推移分析ユーティリティ ===
 
-def get_category_distribution(date: str) -> Dict[str, Dict[str, float]]:
+@cached_by_date('get_category_distribution')
+def get_category_distribution(date: str, context: Optional[DayContext] = None) -> Dict[str, Dict[str, float]]:
     """
     指定日のカテゴリ別時間分布を取得
     
     Args:
         date: 対象日 (YYYY-MM-DD)
+        context: 読み込み済みの DayContext（省略時はDBから取得）
         
     Returns:
         カテゴリ -> {hours, blocks, percentage} のマッピング
     """
-    filled_blocks = get_filled_blocks_for_date(date)
+    filled_blocks = _day_blocks(date, context)
     
     if not filled_blocks:
         return {}
@@ -278,18 +848,20 @@ def get_category_distribution(date: str) -> Dict[str, Dict[str, float]]:
     return result
 
 
-def get_time_of_day_productivity(date: str) -> Dict[str, float]:
+@cached_by_date('get_time_of_day_productivity')
+def get_time_of_day_productivity(date: str, context: Optional[DayContext] = None) -> Dict[str, float]:
     """
     時間帯別生産性を計算
     
     Args:
         date: 対象日 (YYYY-MM-DD)
+        context: 読み込み済みの DayContext（省略時はDBから取得）
         
     Returns:
         時間帯 -> 生産性スコアのマッピング
     """
-    filled_blocks = get_filled_blocks_for_date(date)
-    weight_map = get_categories_weight_map()
+    filled_blocks = _day_blocks(date, context)
+    weight_map = context.weight_map if context is not None else get_categories_weight_map(date)
     
     if not filled_blocks:
         return {}
@@ -323,17 +895,18 @@ def get_time_of_day_productivity(date: str) -> Dict[str, float]:
     return period_scores
 
 
-def get_focus_level_distribution(date: str) -> Dict[int, int]:
+def get_focus_level_distribution(date: str, context: Optional[DayContext] = None) -> Dict[int, int]:
     """
     集中度レベル別の分布を取得
     
     Args:
         date: 対象日 (YYYY-MM-DD)
+        context: 読み込み済みの DayContext（省略時はDBから取得）
         
     Returns:
         集中度 -> ブロック数のマッピング
     """
-    filled_blocks = get_filled_blocks_for_date(date)
+    filled_blocks = _day_blocks(date, context)
     
     focus_counts = defaultdict(int)
     for _, _, focus in filled_blocks:
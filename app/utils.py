@@ -75,6 +75,42 @@ def time_to_slot_index(time_str: str) -> int:
     return slot_index
 
 
+def time_range_to_slots(start_time: str, end_time: str) -> Tuple[int, int]:
+    """
+    時刻範囲をスロット範囲に変換（終了時刻は含まない）
+    
+    Args:
+        start_time: 開始時刻 "HH:MM" 形式
+        end_time: 終了時刻 "HH:MM" 形式（"24:00" で1日の終わりまで）
+        
+    Returns:
+        (最初のスロット番号, 最後のスロット番号)
+        
+    Examples:
+        time_range_to_slots("09:00", "11:30") -> (20, 29)
+        time_range_to_slots("23:00", "24:00") -> (76, 79)
+    """
+    first_slot = time_to_slot_index(start_time)
+    
+    try:
+        hour, minute = map(int, end_time.split(':'))
+    except ValueError:
+        raise ValueError(f"時刻形式が正しくありません: {end_time} (HH:MM形式で入力してください)")
+    
+    # 終了時刻の直前の1分を含むスロットが最後のスロット
+    end_minutes = hour * 60 + minute
+    if end_minutes <= 4 * 60:
+        end_minutes += 24 * 60
+    last_slot = (end_minutes - 4 * 60 - 1) // 15
+    
+    if not 0 <= last_slot <= 79:
+        raise ValueError(f"対応範囲外の時刻です: {end_time} (04:15-24:00)")
+    if last_slot < first_slot:
+        raise ValueError(f"終了時刻は開始時刻より後にしてください: {start_time}-{end_time}")
+    
+    return first_slot, last_slot
+
+
 def get_all_time_slots() -> List[Tuple[int, str]]:
     """
     全タイムスロットのリストを取得
@@ -149,6 +185,26 @@ def get_date_range(start_date: str, end_date: str) -> List[str]:
     return dates
 
 
+def count_days_in_range(start_date: str, end_date: str) -> int:
+    """
+    開始日から終了日までの日数を取得（両端を含む）
+    
+    Args:
+        start_date: 開始日 (YYYY-MM-DD)
+        end_date: 終了日 (YYYY-MM-DD)
+        
+    Returns:
+        日数
+    """
+    start = parse_date(start_date)
+    end = parse_date(end_date)
+    
+    if start > end:
+        raise ValueError(f"開始日が終了日より後です: {start_date} > {end_date}")
+    
+    return (end - start).days + 1
+
+
 def get_week_dates(target_date: str) -> Tuple[str, str, List[str]]:
     """
     指定日を含む週の開始日、終了日、全日付を取得
@@ -172,6 +228,36 @@ def get_week_dates(target_date: str) -> Tuple[str, str, List[str]]:
     return start_str, end_str, week_dates
 
 
+def get_period_bounds(granularity: str, target_date: str) -> Tuple[str, str, str]:
+    """
+    指定日を含む集計期間のキーと開始日・終了日を取得
+    
+    Args:
+        granularity: 'week'（ISO週、月曜始まり） / 'month' / 'year'
+        target_date: 対象日 (YYYY-MM-DD)
+        
+    Returns:
+        (期間キー, 開始日, 終了日) のタプル
+        期間キーは week: "2024-W03", month: "2024-01", year: "2024"
+    """
+    target = parse_date(target_date)
+    
+    if granularity == 'week':
+        iso_year, iso_week, _ = target.isocalendar()
+        start = target - timedelta(days=target.weekday())
+        return f"{iso_year}-W{iso_week:02d}", format_date(start), format_date(start + timedelta(days=6))
+    
+    if granularity == 'month':
+        start = target.replace(day=1)
+        next_month = (start + timedelta(days=32)).replace(day=1)
+        return f"{target.year}-{target.month:02d}", format_date(start), format_date(next_month - timedelta(days=1))
+    
+    if granularity == 'year':
+        return str(target.year), f"{target.year}-01-01", f"{target.year}-12-31"
+    
+    raise ValueError(f"無効な集計期間: {granularity}")
+
+
 # === 文字列ユーティリティ ===
 
 def truncate_text(text: str, max_length: int = 50) -> str:
@@ -225,6 +311,11 @@ def validate_focus_level(focus: Optional[int]) -> bool:
     return 1 <= focus <= 5
 
 
+def validate_weight(weight: int) -> bool:
+    """カテゴリの重みの妥当性チェック"""
+    return -4 <= weight <= 4
+
+
 def validate_date_format(date_str: str) -> bool:
     """日付形式の妥当性チェック"""
     try:
@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+"""
+Focus Ring - NumPyベクトル化スコアリングエンジン
+期間内の全日を (日数 × 80スロット) の行列にまとめて一括でスコア計算
+"""
+
+from typing import List, Tuple, Dict, Optional, Any, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # NumPy はオプション依存（未インストール時はPython実装を使用）
+    np = None
+
+
+SLOTS_PER_DAY = 80
+
+
+def is_available() -> bool:
+    """NumPyエンジンが利用可能か"""
+    return np is not None
+
+
+# === 行列の構築 ===
+
+def build_day_matrix(rows: Sequence[Tuple[str, int, Any, Optional[int]]],
+                     weight_map: Dict[Any, int]) -> Tuple[List[str], "np.ndarray", "np.ndarray", "np.ndarray"]:
+    """
+    入力済みブロックの行を (日数 × 80) の行列に展開
+    
+    Args:
+        rows: (date, slot_index, category, focus) のシーケンス（category はコードまたはカテゴリID）
+        weight_map: カテゴリ（コードまたはID）-> 重みのマッピング
+        
+    Returns:
+        (日付リスト, カテゴリID行列 int16, 重み行列 int8, 集中度行列 int8)
+        カテゴリID 0 と集中度 0 は未入力を表す
+    """
+    # 列ごとに取り出す（zip(*rows) は大量行で遅いため内包表記を使う）
+    date_col = [row[0] for row in rows]
+    category_col = [row[2] for row in rows]
+    
+    dates = sorted(set(date_col))
+    date_rows = {date: row for row, date in enumerate(dates)}
+    
+    if isinstance(category_col[0], int):
+        # カテゴリID（categories.id, 1以上）はそのまま行列の値に使い、重みはIDを添字に引く
+        category_values = category_col
+        weight_lut = np.zeros(max(max(category_col), max(weight_map, default=0)) + 1, dtype=np.int8)
+        for category_id, weight in weight_map.items():
+            weight_lut[category_id] = weight
+    else:
+        # カテゴリコードは出現順に連番IDを振る（未知カテゴリは重み0）
+        category_ids = {code: i + 1 for i, code in enumerate(set(category_col))}
+        category_values = [category_ids[code] for code in category_col]
+        weight_lut = np.zeros(len(category_ids) + 1, dtype=np.int8)
+        for code, category_id in category_ids.items():
+            weight_lut[category_id] = weight_map.get(code, 0)
+    
+    row_index = np.array([date_rows[date] for date in date_col], dtype=np.int32)
+    slot_index = np.array([row[1] for row in rows], dtype=np.int32)
+    
+    categories = np.zeros((len(dates), SLOTS_PER_DAY), dtype=np.int16)
+    focus = np.zeros((len(dates), SLOTS_PER_DAY), dtype=np.int8)
+    categories[row_index, slot_index] = np.array(category_values, dtype=np.int16)
+    focus[row_index, slot_index] = np.array([row[3] or 0 for row in rows], dtype=np.int8)
+    
+    return dates, categories, weight_lut[categories], focus
+
+
+# === 一括スコア計算 ===
+
+def score_day_matrix(categories: "np.ndarray", weights: "np.ndarray",
+                     focus: "np.ndarray") -> Dict[str, "np.ndarray"]:
+    """
+    行列全体の日次集計カウンタを一括計算
+    calculate_summary_counters / calculate_deep_streak_max と同じ規則で計算する
+    
+    Args:
+        categories: カテゴリID行列 (日数 × 80, 0=未入力)
+        weights: 重み行列 (日数 × 80)
+        focus: 集中度行列 (日数 × 80, 0=未設定)
+        
+    Returns:
+        カウンタ名 -> 日ごとの値の配列
+    """
+    slots = np.arange(SLOTS_PER_DAY)
+    filled = categories > 0
+    productive = filled & (weights > 0)
+    productive_focus = productive & (focus > 0)
+    
+    # 直前の入力済みスロット（なければ -1）
+    last_filled = np.maximum.accumulate(np.where(filled, slots, -1), axis=1)
+    prev_filled = np.empty_like(last_filled)
+    prev_filled[:, 0] = -1
+    prev_filled[:, 1:] = last_filled[:, :-1]
+    has_prev = prev_filled >= 0
+    
+    # カテゴリ切替: 入力済みブロック同士で直前と異なるカテゴリ
+    prev_categories = np.take_along_axis(categories, np.maximum(prev_filled, 0), axis=1)
+    switches = filled & has_prev & (categories != prev_categories)
+    
+    # 生産的ランの連続数（空きスロットや非生産的ブロックでリセット）
+    last_break = np.maximum.accumulate(np.where(productive, -1, slots), axis=1)
+    run_length = slots - last_break
+    
+    # 空きスロットを挟んで始まったランの1ブロック目は最大値に数えない
+    gap_start = has_prev & (prev_filled != slots - 1) & (run_length == 1)
+    streak = np.where(productive & ~gap_start, run_length, 0)
+    
+    return {
+        'raw_score': weights.sum(axis=1, dtype=np.int64),
+        'deep_streak_max': streak.max(axis=1, initial=0),
+        'context_switches': switches.sum(axis=1),
+        'productive_blocks': productive.sum(axis=1),
+        'distract_blocks': (filled & (weights < 0)).sum(axis=1),
+        'neutral_blocks': (filled & (weights == 0)).sum(axis=1),
+        'total_filled': filled.sum(axis=1),
+        'focus_sum_productive': np.where(productive_focus, focus, 0).sum(axis=1, dtype=np.int64),
+        'focus_count_productive': productive_focus.sum(axis=1),
+        # ラン末尾のストリーク値（ヒストグラム用）
+        '_run_end_values': np.where(
+            productive & ~np.pad(productive[:, 1:], ((0, 0), (0, 1)), constant_values=False),
+            streak, 0
+        ),
+    }
+
+
+def score_block_rows(rows: Sequence[Tuple[str, int, Any, Optional[int]]],
+                     weight_map: Dict[Any, int]) -> Dict[str, Dict[str, Any]]:
+    """
+    入力済みブロックの行から日次集計カウンタを一括計算
+    
+    Args:
+        rows: (date, slot_index, category, focus) のシーケンス（category はコードまたはカテゴリID、非NULL）
+        weight_map: カテゴリ（コードまたはID）-> 重みのマッピング
+        
+    Returns:
+        日付 -> 集計カウンタ（streak_runs を含む）のマッピング（日付順）
+    """
+    if np is None:
+        raise RuntimeError("NumPyがインストールされていません (pip install numpy)")
+    
+    if not rows:
+        return {}
+    
+    dates, categories, weights, focus = build_day_matrix(rows, weight_map)
+    scores = score_day_matrix(categories, weights, focus)
+    run_end_values = scores.pop('_run_end_values')
+    
+    columns = {name: values.tolist() for name, values in scores.items()}
+    counters_list = [
+        {name: values[row] for name, values in columns.items()}
+        for row in range(len(dates))
+    ]
+    
+    # ストリーク値ヒストグラム（ラン末尾の値を日ごとに数える）
+    histograms: List[Dict[int, int]] = [{} for _ in dates]
+    run_rows, run_slots = np.nonzero(run_end_values)
+    for row, value in zip(run_rows.tolist(), run_end_values[run_rows, run_slots].tolist()):
+        histogram = histograms[row]
+        histogram[value] = histogram.get(value, 0) + 1
+    
+    result = {}
+    for row, date in enumerate(dates):
+        counters = counters_list[row]
+        counters['streak_runs'] = histograms[row]
+        result[date] = counters
+    
+    return result
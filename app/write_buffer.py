@@ -0,0 +1,372 @@
+# -*- coding: utf-8 -*-
+"""
+Focus Ring - 書き込みバッファ（オプション）
+ドラッグ塗りなどで連続する単一ブロック更新を (date, slot_index) ごとにまとめ、
+短い間隔で1トランザクションに集約して書き込む
+
+制限: put() は受付時に upsert_block と同じ検証を行うが、反映時の一括書き込みで拒否される行
+（受付後の状態の変化で反映時の検証に通らなかった場合など）はクライアントに成功を返した後のため通知できない。
+このような行は警告ログに残して破棄し、/api/stats の write_buffer.rejected_rows と
+recent_rejected（直近の破棄分）で確認できるようにしている。
+"""
+
+import atexit
+import functools
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from . import db
+from .models import DBBlock, MEMO_MAX_LENGTH
+from .utils import validate_slot_index, validate_focus_level
+
+
+# 書き込みバッファ設定（既定は無効: 書き込みは即時コミット）
+WRITE_BUFFER_ENABLED = os.getenv('FOCUS_RING_WRITE_BUFFER', '0').lower() in ('1', 'true', 'yes', 'on')
+WRITE_BUFFER_FLUSH_MS = int(os.getenv('FOCUS_RING_WRITE_BUFFER_FLUSH_MS', '200'))
+WRITE_BUFFER_MAX_PENDING = int(os.getenv('FOCUS_RING_WRITE_BUFFER_MAX_PENDING', '200'))
+RECENT_REJECTED_SIZE = 20  # 統計に残す直近の破棄行数
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+# (date, slot_index) -> (category, focus, memo, 受付時刻)
+PendingWrites = Dict[Tuple[str, int], Tuple[Optional[str], Optional[int], Optional[str], datetime]]
+
+
+# === 書き込みバッファ ===
+
+class WriteBuffer:
+    """
+    単一ブロック更新の書き込み遅延バッファ
+    
+    同じスロットへの書き込みは後勝ちで1件にまとめ、最初の書き込みから
+    flush_interval 秒後、または未反映件数が max_pending に達した時点で
+    bulk_upsert_blocks により1トランザクションで反映する。
+    反映待ち・反映中の値は get_day_blocks で読み出しに重ねる。
+    """
+    
+    def __init__(self, flush_interval: float = WRITE_BUFFER_FLUSH_MS / 1000,
+                 max_pending: int = WRITE_BUFFER_MAX_PENDING):
+        self.flush_interval = flush_interval
+        self.max_pending = max(1, max_pending)
+        self.pid = os.getpid()
+        
+        self._pending: PendingWrites = {}
+        self._inflight: PendingWrites = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # 反映順序を保つため同時に1回だけ反映する
+        self._timer: Optional[threading.Timer] = None
+        
+        # 統計カウンタ
+        self._accepted = 0
+        self._coalesced = 0
+        self._flushes = 0
+        self._flushed_rows = 0
+        self._flush_time = 0.0
+        self._flush_errors = 0
+        self._rejected_rows = 0
+        self._recent_rejected: deque = deque(maxlen=RECENT_REJECTED_SIZE)
+    
+    def put(self, date: str, slot_index: int, category: Optional[str] = None,
+            focus: Optional[int] = None, memo: Optional[str] = None) -> bool:
+        """
+        ブロック更新をバッファに追加（upsert_block と同じ検証を即時に行う）
+        
+        Returns:
+            受付時True
+        """
+        if not validate_slot_index(slot_index):
+            raise ValueError(f"無効なスロットインデックス: {slot_index}")
+        
+        if not validate_focus_level(focus):
+            raise ValueError(f"無効な集中度: {focus}")
+        
+        if memo is not None and len(memo) > MEMO_MAX_LENGTH:
+            raise ValueError(f"メモは{MEMO_MAX_LENGTH}文字以内で入力してください")
+        
+        if category is not None and not db.category_exists(category):
+            raise ValueError(f"未登録のカテゴリです: {category}")
+        
+        with self._lock:
+            key = (date, slot_index)
+            if key in self._pending:
+                self._coalesced += 1
+            self._pending[key] = (category, focus, memo, datetime.now())
+            self._accepted += 1
+            
+            flush_now = len(self._pending) >= self.max_pending
+            if not flush_now and self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        
+        if flush_now:
+            self.flush()
+        return True
+    
+    def flush(self) -> int:
+        """
+        反映待ちの書き込みを1トランザクションで反映
+        書き込み（トランザクション）に失敗した場合だけ全件を戻して再試行し、
+        検証で拒否された行は再試行しても通らないためログに残して破棄する
+        
+        Returns:
+            反映した件数（拒否された行を除く）
+        """
+        with self._flush_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                if not self._pending:
+                    return 0
+                self._inflight, self._pending = self._pending, {}
+                batch = self._inflight
+            
+            started_at = time.perf_counter()
+            try:
+                # 1チャンクで書くため、書き込みエラー時は1行もコミットされていない
+                report = db.bulk_upsert_blocks([
+                    {'date': date, 'slot_index': slot_index,
+                     'category': category, 'focus': focus, 'memo': memo}
+                    for (date, slot_index), (category, focus, memo, _) in batch.items()
+                ], chunk_size=len(batch), raise_write_errors=True)
+            except sqlite3.Error as e:
+                print(f"書き込みバッファ反映エラー（再試行します）: {e}")
+                with self._lock:
+                    # 反映中に届いた新しい書き込みを優先して戻す
+                    self._pending = {**batch, **self._pending}
+                    self._inflight = {}
+                    self._flush_errors += 1
+                    if self._timer is None:
+                        self._timer = threading.Timer(self.flush_interval, self.flush)
+                        self._timer.daemon = True
+                        self._timer.start()
+                raise
+            except Exception as e:
+                with self._lock:
+                    self._inflight = {}
+                    self._flush_errors += 1
+                self._reject([(key, str(e)) for key in batch], batch)
+                raise
+            
+            rejected = [((result['date'], result['slot_index']), result['reason'])
+                        for result in report['results'] if result['status'] == db.BULK_REJECTED]
+            self._reject(rejected, batch)
+            
+            with self._lock:
+                self._inflight = {}
+                self._flushes += 1
+                self._flushed_rows += len(batch) - len(rejected)
+                self._flush_time += time.perf_counter() - started_at
+            return len(batch) - len(rejected)
+    
+    def _reject(self, rows: List[Tuple[Tuple[str, int], str]], batch: PendingWrites):
+        """反映できなかった行を警告ログと統計に残して破棄（クライアントには成功を返し済み）"""
+        if not rows:
+            return
+        
+        for (date, slot_index), reason in rows:
+            logger.warning("書き込みバッファ: %s slot %d の書き込みを破棄しました（受付 %s）: %s",
+                           date, slot_index, batch[(date, slot_index)][3].isoformat(), reason)
+        with self._lock:
+            self._rejected_rows += len(rows)
+            self._recent_rejected.extend(
+                {'date': date, 'slot_index': slot_index, 'reason': reason,
+                 'accepted_at': batch[(date, slot_index)][3].isoformat()}
+                for (date, slot_index), reason in rows
+            )
+    
+    def has_pending(self) -> bool:
+        """反映待ち・反映中の書き込みがあるか"""
+        with self._lock:
+            return bool(self._pending or self._inflight)
+    
+    def _buffered_slots(self, date: str) -> Dict[int, Tuple[Optional[str], Optional[int], Optional[str], datetime]]:
+        """指定日の反映待ち・反映中の値（スロット番号 -> 値、新しい方が優先）"""
+        with self._lock:
+            return {
+                slot_index: value
+                for source in (self._inflight, self._pending)  # 新しい方を後に重ねる
+                for (buffered_date, slot_index), value in source.items()
+                if buffered_date == date
+            }
+    
+    def pending_marker(self, date: str) -> Optional[int]:
+        """
+        指定日に未反映の書き込みがあれば受付通番を返す（ETag用、書き込みを受け付けるたびに変わる）
+        
+        Returns:
+            受付件数の通算値（未反映の書き込みがなければ None）
+        """
+        with self._lock:
+            for source in (self._pending, self._inflight):
+                if any(buffered_date == date for buffered_date, _ in source):
+                    return self._accepted
+            return None
+    
+    def get_day_blocks(self, date: str) -> List[DBBlock]:
+        """
+        DBから読んだ1日分のブロックに未反映の書き込みを重ねる（read-your-writes）
+        
+        Args:
+            date: 対象日 (YYYY-MM-DD)
+            
+        Returns:
+            80個のDBBlockリスト（slot_index順）
+        """
+        # DBより先にバッファを読む（読み出し中に反映が完了しても取りこぼさない）
+        buffered = self._buffered_slots(date)
+        
+        blocks = db.get_day_blocks(date)
+        if not buffered:
+            return blocks
+        
+        result = list(blocks)
+        for slot_index, (category, focus, memo, received_at) in buffered.items():
+            result[slot_index] = result[slot_index].model_copy(update={
+                'category': category,
+                'focus': focus,
+                'memo': memo,
+                'updated_at': received_at
+            })
+        return result
+    
+    def get_day_slot_rows(self, date: str) -> List[Tuple[int, Optional[str], Optional[int], Optional[str], Any, Any]]:
+        """
+        db.get_day_slot_rows の結果に未反映の書き込みを重ねる（read-your-writes）
+        
+        Args:
+            date: 対象日 (YYYY-MM-DD)
+            
+        Returns:
+            (slot_index, category, focus, memo, created_at, updated_at) のタプルリスト（スロット順）
+        """
+        buffered = self._buffered_slots(date)
+        
+        rows = db.get_day_slot_rows(date)
+        if not buffered:
+            return rows
+        
+        by_slot = {row[0]: row for row in rows}
+        for slot_index, (category, focus, memo, received_at) in buffered.items():
+            created_at = by_slot[slot_index][4] if slot_index in by_slot else received_at
+            by_slot[slot_index] = (slot_index, category, focus, memo, created_at, received_at)
+        return [by_slot[slot_index] for slot_index in sorted(by_slot)]
+    
+    def stats(self) -> Dict[str, Any]:
+        """バッファの統計情報を取得"""
+        with self._lock:
+            return {
+                'enabled': True,
+                'pending': len(self._pending),
+                'inflight': len(self._inflight),
+                'accepted': self._accepted,
+                'coalesced': self._coalesced,
+                'flushes': self._flushes,
+                'flushed_rows': self._flushed_rows,
+                'avg_batch_size': round(self._flushed_rows / max(self._flushes, 1), 2),
+                'avg_flush_ms': round(self._flush_time / max(self._flushes, 1) * 1000, 2),
+                'flush_errors': self._flush_errors,
+                'rejected_rows': self._rejected_rows,
+                'recent_rejected': list(self._recent_rejected)
+            }
+
+
+_buffer: Optional[WriteBuffer] = None
+_buffer_lock = threading.Lock()
+
+
+def is_enabled() -> bool:
+    """書き込みバッファが有効か"""
+    return WRITE_BUFFER_ENABLED
+
+
+def get_write_buffer() -> WriteBuffer:
+    """プロセス共通の書き込みバッファを取得（fork後のプロセスでは作り直す）"""
+    global _buffer
+    buffer = _buffer
+    if buffer is not None and buffer.pid == os.getpid():
+        return buffer
+    
+    with _buffer_lock:
+        if _buffer is None or _buffer.pid != os.getpid():
+            _buffer = WriteBuffer()
+            atexit.register(_buffer.flush)  # 終了時に取りこぼさない
+        return _buffer
+
+
+def flush_pending_writes() -> int:
+    """未反映の書き込みを反映（無効時・未使用時は何もしない）"""
+    if _buffer is None or _buffer.pid != os.getpid():
+        return 0
+    return _buffer.flush()
+
+
+def get_write_buffer_stats() -> Dict[str, Any]:
+    """書き込みバッファの統計情報を取得"""
+    if not is_enabled():
+        return {'enabled': False}
+    return get_write_buffer().stats()
+
+
+# === バッファ経由のデータアクセス ===
+
+def upsert_block(date: str, slot_index: int, category: Optional[str] = None,
+                 focus: Optional[int] = None, memo: Optional[str] = None) -> bool:
+    """ブロックをUpsert（バッファ有効時は遅延書き込み）"""
+    if is_enabled():
+        return get_write_buffer().put(date, slot_index, category, focus, memo)
+    return db.upsert_block(date, slot_index, category, focus, memo)
+
+
+def get_day_blocks(date: str) -> List[DBBlock]:
+    """指定日の全ブロックを取得（バッファ有効時は未反映の書き込みを重ねる）"""
+    if is_enabled() and _buffer is not None and _buffer.pid == os.getpid():
+        return _buffer.get_day_blocks(date)
+    return db.get_day_blocks(date)
+
+
+def get_day_slot_rows(date: str) -> List[Tuple[int, Optional[str], Optional[int], Optional[str], Any, Any]]:
+    """指定日の保存済みスロットをタプルで取得（バッファ有効時は未反映の書き込みを重ねる）"""
+    if is_enabled() and _buffer is not None and _buffer.pid == os.getpid():
+        return _buffer.get_day_slot_rows(date)
+    return db.get_day_slot_rows(date)
+
+
+def get_data_versions(date: Optional[str] = None) -> Dict[str, int]:
+    """
+    ETag用のバージョンを取得（バッファ有効時は未反映の書き込みも 'pending' として反映）
+    
+    Args:
+        date: 対象日 (YYYY-MM-DD, 省略時は日付のバージョンを含めない)
+        
+    Returns:
+        db.get_data_versions の結果（未反映の書き込みがあれば 'pending' を追加）
+    """
+    # DBより先にバッファを読む（読み出し中に反映が完了しても古いバージョンを返さない）
+    marker = None
+    if date is not None and is_enabled() and _buffer is not None and _buffer.pid == os.getpid():
+        marker = _buffer.pending_marker(date)
+    
+    versions = db.get_data_versions(date)
+    if marker is not None:
+        versions['pending'] = marker
+    return versions
+
+
+def flushed(func: Callable[..., T]) -> Callable[..., T]:
+    """呼び出し前に未反映の書き込みを反映する（日次サマリ参照・一括更新用）"""
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> T:
+        if _buffer is not None and _buffer.has_pending():
+            flush_pending_writes()
+        return func(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+カテゴリの重み変更のテスト
+範囲外の重みを受け付けないこと、範囲内の重みで古くなったサマリを計算し直せることを検証
+"""
+
+import pytest
+
+from app import db
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    """一時ファイルのデータベースを初期化"""
+    monkeypatch.setattr(db, 'DB_PATH', str(tmp_path / 'focus_ring.db'))
+    db.init_database()
+    return db
+
+
+@pytest.mark.parametrize('weight', [-5, 5, 200, -200])
+def test_set_category_weight_rejects_out_of_range(database, weight):
+    code = database.get_all_categories()[0].code
+    with pytest.raises(ValueError):
+        database.set_category_weight(code, weight, '2026-01-01')
+    assert database.count_stale_summaries() == 0
+
+
+@pytest.mark.parametrize('weight', [-4, 4])
+def test_refresh_stale_summaries_after_weight_change(database, weight):
+    code = database.get_all_categories()[0].code
+    database.upsert_block('2026-01-02', 10, code, 3)
+    
+    database.set_category_weight(code, weight, '2026-01-01')
+    assert database.count_stale_summaries() == 1
+    assert database.refresh_stale_summaries() == 1
+    assert database.count_stale_summaries() == 0
+    assert database.get_summary_counters('2026-01-02')['raw_score'] == weight
+
+
+def test_refresh_stale_summaries_bumps_changed_dates(database, monkeypatch):
+    code = database.get_all_categories()[0].code
+    database.upsert_block('2026-01-02', 10, code, 3)
+    database.upsert_block('2025-12-31', 10, code, 3)
+    before = {date: database.get_data_versions(date)['date'] for date in ('2026-01-02', '2025-12-31')}
+    
+    notified = []
+    monkeypatch.setattr(database, '_date_write_listeners', [notified.extend])
+    database.set_category_weight(code, -4, '2026-01-01')
+    database.refresh_stale_summaries()
+    
+    # 値が変わった日だけバージョンが進み、コミット後に通知される
+    assert notified == ['2026-01-02']
+    assert database.get_data_versions('2026-01-02')['date'] > before['2026-01-02']
+    assert database.get_data_versions('2025-12-31')['date'] == before['2025-12-31']
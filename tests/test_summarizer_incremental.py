@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+増分更新のプロパティテスト
+ランダムな日データで patch_summary_counters の結果がフル再計算と一致することを検証（DB不要）
+"""
+
+import random
+
+import pytest
+
+from app.summarizer import (
+    calculate_summary_counters, calculate_streak_runs, patch_summary_counters,
+    take_left_context, take_right_context
+)
+
+
+WEIGHT_MAP = {'P1': 3, 'P2': 1, 'N': 0, 'D1': -2, 'D2': -4}
+CODES = list(WEIGHT_MAP) + ['UNKNOWN']
+SLOTS = 80
+
+
+def _random_case(rng: random.Random):
+    """密度の異なる日と、書き換えるスロットを生成（None は未入力スロット）"""
+    density = rng.random()
+    day = [None] * SLOTS
+    for slot in range(SLOTS):
+        if rng.random() < density:
+            day[slot] = (slot, rng.choice(CODES), rng.choice([None, 1, 2, 3, 4, 5]))
+    
+    slot = rng.randrange(SLOTS)
+    new_block = None if rng.random() < 0.2 else (slot, rng.choice(CODES), rng.choice([None, 3, 5]))
+    return day, slot, new_block
+
+
+@pytest.mark.parametrize('minimal_context', [False, True], ids=['full', 'minimal'])
+def test_patch_matches_full_recompute(minimal_context):
+    """全文脈を渡す場合と、DB側と同じく必要最小限の文脈だけを渡す場合の両方で一致する"""
+    rng = random.Random(20240301)
+    mismatches = []
+    
+    for _ in range(2000):
+        day, slot, new_block = _random_case(rng)
+        old_block = day[slot]
+        
+        filled = [block for block in day if block]
+        counters = calculate_summary_counters(filled, WEIGHT_MAP)
+        runs = calculate_streak_runs(filled, WEIGHT_MAP)
+        
+        before = [block for block in day[:slot] if block]
+        after = [block for block in day[slot + 1:] if block]
+        if minimal_context:
+            before = take_left_context(reversed(before), WEIGHT_MAP)
+            after = take_right_context(after, WEIGHT_MAP)
+        
+        day[slot] = new_block
+        expected_filled = [block for block in day if block]
+        expected = calculate_summary_counters(expected_filled, WEIGHT_MAP)
+        expected_runs = calculate_streak_runs(expected_filled, WEIGHT_MAP)
+        
+        patched, patched_runs = patch_summary_counters(
+            counters, runs, before, old_block, new_block, after, WEIGHT_MAP
+        )
+        if patched != expected or patched_runs != expected_runs:
+            mismatches.append((slot, old_block, new_block))
+    
+    assert mismatches == []
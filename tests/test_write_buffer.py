@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+書き込みバッファのテスト
+反映時の失敗の扱い（書き込みエラーは再試行、検証で拒否された行は記録して破棄）を検証
+"""
+
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+from app import db
+from app.models import MEMO_MAX_LENGTH
+from app.write_buffer import WriteBuffer
+
+
+@pytest.fixture
+def buffer(tmp_path, monkeypatch):
+    """一時ファイルのデータベースと、タイマーで反映しないバッファ"""
+    monkeypatch.setattr(db, 'DB_PATH', str(tmp_path / 'focus_ring.db'))
+    db.init_database()
+    write_buffer = WriteBuffer(flush_interval=3600)
+    yield write_buffer
+    if write_buffer._timer is not None:
+        write_buffer._timer.cancel()
+
+
+def test_put_rejects_long_memo(buffer):
+    with pytest.raises(ValueError):
+        buffer.put('2026-01-01', 0, None, 3, 'x' * (MEMO_MAX_LENGTH + 1))
+    assert not buffer.has_pending()
+
+
+def test_flush_drops_and_records_rejected_rows(buffer):
+    buffer.put('2026-01-01', 1, None, 3, 'a')
+    # 受付後に検証に通らなくなった行（受付時の検証を経ずに直接積む）
+    buffer._pending[('2026-01-01', 2)] = (None, 99, None, datetime.now())
+    
+    assert buffer.flush() == 1
+    assert not buffer.has_pending()
+    
+    stats = buffer.stats()
+    assert stats['rejected_rows'] == 1
+    assert stats['flush_errors'] == 0
+    assert [(row['date'], row['slot_index']) for row in stats['recent_rejected']] == [('2026-01-01', 2)]
+    assert [block.slot_index for block in db.get_day_blocks('2026-01-01') if block.focus is not None] == [1]
+
+
+def test_flush_requeues_on_write_error(buffer, monkeypatch):
+    buffer.put('2026-01-01', 1, None, 3, 'a')
+    
+    def locked(*args, **kwargs):
+        raise sqlite3.OperationalError('database is locked')
+    
+    bulk_upsert_blocks = db.bulk_upsert_blocks
+    monkeypatch.setattr(db, 'bulk_upsert_blocks', locked)
+    with pytest.raises(sqlite3.Error):
+        buffer.flush()
+    assert buffer.has_pending()
+    assert buffer.stats()['flush_errors'] == 1
+    assert buffer.stats()['rejected_rows'] == 0
+    
+    monkeypatch.setattr(db, 'bulk_upsert_blocks', bulk_upsert_blocks)
+    assert buffer.flush() == 1
+    assert [block.slot_index for block in db.get_day_blocks('2026-01-01') if block.focus is not None] == [1]